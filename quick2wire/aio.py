@@ -0,0 +1,151 @@
+"""Waiting for GPIO edges, timers and semaphores in asyncio coroutines.
+
+The functions in this module return awaitables that complete when an
+event source is ready, without blocking the event loop's thread:
+
+    async def blink(led):
+        with Timer(interval=0.5, clock=CLOCK_MONOTONIC) as timer:
+            timer.start()
+            while True:
+                await timer.tick()
+                led.value = not led.value
+
+    async def watch(button):
+        while True:
+            value = await button.edge()
+            print("button is now", value)
+
+The Pin.edge, Timer.tick and Semaphore.acquire methods are shorthand
+for the functions of the same name in this module.
+
+The sources are not added to the event loop directly.  The sysfs value
+file of a pin is always readable, and signals an edge with
+PRIORITY_INPUT, which asyncio does not wait for.  Instead, each event
+loop has a single epoll object that waits for the events each source
+needs, and the loop waits for that epoll object to become readable.
+Sources are registered with EPOLLONESHOT and rearmed each time a
+coroutine waits for them, so a source that nobody is waiting for does
+not wake the loop.
+
+Readiness wakes every coroutine waiting for a source, but only one of
+them may be able to take a timer expiration or semaphore signal.  The
+others find that the source is no longer readable and wait again, so
+no coroutine blocks the event loop reading a blocking Timer or
+Semaphore.
+"""
+
+import asyncio
+import select
+import weakref
+from quick2wire.selector import INPUT, ERROR, PRIORITY_INPUT
+
+
+class _Dispatcher(object):
+    def __init__(self, loop):
+        self._epoll = select.epoll()
+        self._waiters = {}
+        self._eventmasks = {}
+        loop.add_reader(self._epoll.fileno(), self._dispatch)
+    
+    def wait(self, loop, fileno, eventmask):
+        future = loop.create_future()
+        waiters = self._waiters.setdefault(fileno, [])
+        waiters.append(future)
+        future.add_done_callback(lambda f: self._cancelled(fileno, f) if f.cancelled() else None)
+        
+        eventmask |= self._eventmasks.get(fileno, 0)
+        self._eventmasks[fileno] = eventmask
+        try:
+            self._epoll.modify(fileno, eventmask|select.EPOLLONESHOT)
+        except FileNotFoundError:
+            self._epoll.register(fileno, eventmask|select.EPOLLONESHOT)
+        
+        return future
+    
+    def _cancelled(self, fileno, future):
+        waiters = self._waiters.get(fileno)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                # Nobody is waiting, so stop the source waking the loop
+                del self._waiters[fileno]
+                self._eventmasks.pop(fileno, None)
+                try:
+                    self._epoll.modify(fileno, 0)
+                except OSError:
+                    pass
+    
+    def _dispatch(self):
+        for fileno, events in self._epoll.poll(0):
+            self._eventmasks.pop(fileno, None)
+            for future in self._waiters.pop(fileno, ()):
+                if not future.done():
+                    future.set_result(events)
+
+
+_dispatchers = weakref.WeakKeyDictionary()
+
+
+def _dispatcher(loop):
+    dispatcher = _dispatchers.get(loop)
+    if dispatcher is None:
+        dispatcher = _dispatchers[loop] = _Dispatcher(loop)
+    return dispatcher
+
+
+def ready(source, eventmask=INPUT|ERROR):
+    """Waits for events on an event source.
+    
+    Parameters:
+    source    -- the event source.  Must provide a fileno() method
+                 that returns its file descriptor.
+    eventmask -- (optional) the events to wait for, as for
+                 Selector.add.  (default = INPUT|ERROR)
+    
+    Returns: an awaitable whose result is the bit-set of events that
+             occurred on the source.
+    """
+    loop = asyncio.get_running_loop()
+    return _dispatcher(loop).wait(loop, source.fileno(), eventmask)
+
+
+async def edge(pin):
+    """Waits for an input pin to signal an interrupt and returns its new value.
+    
+    The pin must be open with its interrupt set.  The pin is waited
+    for with the events given by its __edge_events__ attribute, if it
+    has one, or PRIORITY_INPUT|ERROR, which a sysfs value file signals.
+    """
+    await ready(pin, getattr(pin, "__edge_events__", PRIORITY_INPUT|ERROR))
+    return pin.get()
+
+
+async def tick(timer):
+    """Waits for a timer to expire.
+    
+    Returns: the number of times the timer has expired since it was
+             last waited for.
+    """
+    while True:
+        await ready(timer, INPUT)
+        if _readable(timer):
+            expirations = timer.wait()
+            if expirations:
+                return expirations
+
+
+async def acquire(semaphore):
+    """Waits for a signal from a semaphore, decrementing its count by one."""
+    while True:
+        await ready(semaphore, INPUT)
+        if _readable(semaphore) and semaphore.wait():
+            return True
+
+
+def _readable(source):
+    # Another coroutine woken by the same event may already have read
+    # the source, and reading a blocking source that is no longer
+    # readable would block the event loop
+    poll = select.poll()
+    poll.register(source.fileno(), select.POLLIN)
+    return bool(poll.poll(0))
@@ -0,0 +1,216 @@
+"""I2C transactions performed by a dedicated worker thread.
+
+An I2C ioctl blocks the calling thread until the transaction has
+finished, which can take a long time if a slow device stretches the
+clock.  An AsyncI2CMaster owns an I2CMaster and performs transactions
+on it in a worker thread of its own, so that the threads that request
+transactions, including the thread running an asyncio event loop, are
+not blocked.  Requests are queued and performed one after another in
+the order they were submitted, so many requests can be in flight at
+once.  The queue is bounded: when it is full, submitting a request
+waits until the worker has made room for it.
+
+Requests return concurrent.futures.Future objects:
+
+    with AsyncI2CMaster(1) as bus:
+        gpio = bus.read_byte_data(0x20, 0x12)
+        adc = bus.transaction(writing_bytes(0x48, 0x40), reading(0x48, 2))
+
+        print(gpio.result(), adc.result()[0][-1])
+
+In an asyncio coroutine, use the call method, which waits for room in
+the queue and for the result without blocking the event loop:
+
+    value = await bus.call(I2CMaster.read_byte_data, 0x20, 0x12)
+
+Each bus is a separate device with its own kernel lock, so an
+AsyncI2CMaster for each bus lets transactions on different buses be
+performed in parallel.
+"""
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from functools import partial
+from quick2wire.i2c import I2CMaster
+
+
+class AsyncI2CMaster(object):
+    """Performs I2C transactions on a worker thread, returning futures of their results."""
+    
+    def __init__(self, n=None, extra_open_flags=0, queue_size=64, master=None):
+        """Opens the bus device and starts the worker thread.
+        
+        Parameters:
+        n                -- (optional) the number of the bus, as for
+                            I2CMaster.
+        extra_open_flags -- (optional) extra flags passed to posix.open
+                            when opening the I2C bus device file, as for
+                            I2CMaster. (default = 0)
+        queue_size       -- (optional) the number of requests that can be
+                            waiting to be performed before submitting
+                            another request waits. (default = 64)
+        master           -- (optional) an open I2CMaster to use instead of
+                            opening the bus.  It is not closed when the
+                            AsyncI2CMaster is closed.
+        """
+        if master is None:
+            self.master = I2CMaster(n, extra_open_flags)
+            self._owns_master = True
+        else:
+            self.master = master
+            self._owns_master = False
+        
+        # The queue is not bounded itself, so that close() can always
+        # add the sentinel.  Submitters wait on the condition for the
+        # number of queued requests to fall below queue_size.
+        self._queue = queue.Queue()
+        self._queue_size = queue_size
+        self._closed = False
+        self._room = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="i2c-worker-%i" % self.master.fd, daemon=True)
+        self._thread.start()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @property
+    def pending(self):
+        """The number of requests waiting to be performed."""
+        return self._queue.qsize()
+    
+    def close(self):
+        """Performs the requests already submitted, stops the worker thread and closes the bus device.
+        
+        Requests that are still queued when the worker thread has
+        stopped fail with a ValueError.
+        """
+        with self._room:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+            self._room.notify_all()
+        
+        self._thread.join()
+        self._fail_remaining()
+        if self._owns_master:
+            self.master.close()
+    
+    def submit(self, fn, *args, **kwargs):
+        """Submits a request to the worker thread.
+        
+        Waits until there is room in the queue.
+        
+        Parameters:
+        fn -- called on the worker thread as fn(master, *args, **kwargs),
+              where master is the I2CMaster.  A function that performs
+              several transactions performs them all before the worker
+              starts the next request.
+        
+        Returns: a concurrent.futures.Future of the result of fn.
+        """
+        return self._put(partial(fn, self.master, *args, **kwargs))
+    
+    async def call(self, fn, *args, **kwargs):
+        """Submits a request to the worker thread and waits for its result without blocking the event loop.
+        
+        Parameters are as for submit.
+        
+        Returns: the result of fn.
+        """
+        future, request = self._request(partial(fn, self.master, *args, **kwargs))
+        try:
+            self._enqueue(request, block=False)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, self._enqueue, request)
+        return await asyncio.wrap_future(future)
+    
+    def transaction(self, *msgs, copy=True):
+        """Submits an I2C I/O transaction, as for I2CMaster.transaction.
+        
+        Returns: a Future of the list of byte sequences read.
+        """
+        return self._put(partial(self.master.transaction, *msgs, copy=copy))
+    
+    def read_byte_data(self, addr, register):
+        """Submits an SMBus register read, as for I2CMaster.read_byte_data."""
+        return self._put(partial(self.master.read_byte_data, addr, register))
+    
+    def write_byte_data(self, addr, register, value):
+        """Submits an SMBus register write, as for I2CMaster.write_byte_data."""
+        return self._put(partial(self.master.write_byte_data, addr, register, value))
+    
+    def read_word_data(self, addr, register):
+        """Submits an SMBus 16-bit register read, as for I2CMaster.read_word_data."""
+        return self._put(partial(self.master.read_word_data, addr, register))
+    
+    def read_i2c_block_data(self, addr, register, n_bytes):
+        """Submits an I2C block read, as for I2CMaster.read_i2c_block_data."""
+        return self._put(partial(self.master.read_i2c_block_data, addr, register, n_bytes))
+    
+    def _put(self, fn):
+        future, request = self._request(fn)
+        self._enqueue(request)
+        return future
+    
+    def _request(self, fn):
+        if self._closed:
+            raise ValueError("AsyncI2CMaster is closed")
+        
+        future = Future()
+        return future, (future, fn)
+    
+    def _enqueue(self, request, block=True):
+        # The closed check and the put are made while holding the
+        # condition's lock, as is close()'s put of the sentinel, so no
+        # request can be queued behind it.  Waiting for room releases
+        # the lock, and close() wakes the waiters to fail.  A request
+        # submitted by the worker thread itself, from a request or a
+        # completion callback, is queued even if the queue is full,
+        # because only the worker can make room.
+        with self._room:
+            while True:
+                if self._closed:
+                    raise ValueError("AsyncI2CMaster is closed")
+                if (self._queue.qsize() < self._queue_size 
+                    or threading.current_thread() is self._thread):
+                    self._queue.put(request)
+                    return
+                if not block:
+                    raise queue.Full
+                self._room.wait()
+    
+    def _fail_remaining(self):
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if request is not None:
+                future, fn = request
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(ValueError("AsyncI2CMaster is closed"))
+    
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                break
+            
+            with self._room:
+                self._room.notify()
+            
+            future, fn = request
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn()
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
@@ -1,11 +1,95 @@
+"""Detects the revision of the Raspberry Pi board.
+
+The revision determines which SoC GPIO pins are connected to the
+header and which I2C bus is brought out to the header.  It is one of:
+
+    0 -- not running on a Raspberry Pi
+    1 -- a revision 1 Model B
+    2 -- a later board, with the revision 2 header layout
+
+The revision is detected the first time it is needed and remembered
+for the life of the process.  Detection can be overridden by setting
+the QUICK2WIRE_BOARD_REVISION environment variable to 0, 1 or 2, or
+by calling set_revision before the pin banks or I2C bus are first
+used.
+"""
+
+import os
+
+ENVIRONMENT_VARIABLE = "QUICK2WIRE_BOARD_REVISION"
+
+_NEW_STYLE_REVISION_CODE = 1 << 23
+_OLD_STYLE_REVISION_MASK = 0xFFFF
+_REVISION_1_CODES = (0x0002, 0x0003)
+
+_revision = None
+
+
 def revision():
+    """Returns the revision of the board, detecting it on first use."""
+    global _revision
+    if _revision is None:
+        _revision = _detect_revision()
+    return _revision
+
+
+def set_revision(new_revision):
+    """Overrides the detected board revision.
+
+    Parameters:
+    new_revision -- 0, 1 or 2, or None to detect the revision again
+                    the next time it is needed.
+    """
+    global _revision
+    if new_revision is not None:
+        new_revision = _checked_revision(new_revision)
+    _revision = new_revision
+
+
+def revision_from_code(code):
+    """Returns the board revision identified by a hexadecimal revision code from /proc/cpuinfo.
+
+    Boards with new-style revision codes, and all boards with old-style
+    codes other than the first Model B, have the revision 2 header
+    layout.  The warranty and overvoltage bits of old-style codes are
+    ignored.
+    """
+    try:
+        n = int(code, 16)
+    except ValueError:
+        return 0
+
+    if n & _NEW_STYLE_REVISION_CODE:
+        return 2
+    elif (n & _OLD_STYLE_REVISION_MASK) in _REVISION_1_CODES:
+        return 1
+    else:
+        return 2
+
+
+def _detect_revision():
+    override = os.environ.get(ENVIRONMENT_VARIABLE)
+    if override is not None:
+        return _checked_revision(override)
+
     try:
         with open('/proc/cpuinfo','r') as f:
             for line in f:
                 if line.startswith('Revision'):
-                    return 1 if line.rstrip()[-1] in ['2','3'] else 2
+                    return revision_from_code(line.partition(':')[2].strip())
             else:
                 return 0
-    except:
+    except IOError:
         return 0
 
+
+def _checked_revision(r):
+    try:
+        r = int(r)
+    except ValueError:
+        r = None
+
+    if r not in (0, 1, 2):
+        raise ValueError("board revision must be 0, 1 or 2")
+
+    return r
@@ -0,0 +1,178 @@
+"""Serialisation of access to a shared bus by multiple threads.
+
+A BusLock is held for the duration of each transaction on a bus.  As
+well as excluding other threads, it records, for each device address,
+how long threads waited to acquire the bus, how long they held it,
+and how many other threads were already waiting when they arrived.
+The hold time is dominated by the time the kernel takes to perform
+the transaction on the bus, while the wait time and queue depth show
+contention between threads: long waits with short holds mean that
+the bus is idle much of the time and the threads are the bottleneck.
+
+By default the lock is a plain threading.Lock, which does not grant
+the bus in the order that threads asked for it, so a thread that
+polls in a tight loop can starve others.  A fair BusLock grants the
+bus to waiting threads in first-come, first-served order.
+
+An I2CMaster created with thread_safe=True uses a BusLock:
+
+    with I2CMaster(thread_safe=True, fair=True) as i2c:
+        ...
+        for address, stats in i2c.statistics().items():
+            print(hex(address), stats.mean_wait_ns, stats.mean_hold_ns, stats.max_queue_depth)
+"""
+
+from collections import deque
+from copy import copy
+from threading import Lock
+from time import monotonic_ns
+
+
+class AddressStatistics(object):
+    """Contention statistics of the transactions with one device address.
+    
+    Times are in nanoseconds.
+    """
+    
+    __slots__ = ["transactions", "total_wait_ns", "max_wait_ns", "total_hold_ns", "max_hold_ns",
+                 "total_queue_depth", "max_queue_depth"]
+    
+    def __init__(self):
+        self.transactions = 0
+        self.total_wait_ns = 0
+        self.max_wait_ns = 0
+        self.total_hold_ns = 0
+        self.max_hold_ns = 0
+        self.total_queue_depth = 0
+        self.max_queue_depth = 0
+    
+    @property
+    def mean_wait_ns(self):
+        """The mean time spent waiting for the bus, or None if there have been no transactions."""
+        return self.total_wait_ns / self.transactions if self.transactions else None
+    
+    @property
+    def mean_hold_ns(self):
+        """The mean time for which the bus was held, or None if there have been no transactions."""
+        return self.total_hold_ns / self.transactions if self.transactions else None
+    
+    @property
+    def mean_queue_depth(self):
+        """The mean number of threads already waiting for the bus, or None if there have been no transactions."""
+        return self.total_queue_depth / self.transactions if self.transactions else None
+    
+    def __repr__(self):
+        return "AddressStatistics(transactions=%i, mean_wait_ns=%r, mean_hold_ns=%r, max_queue_depth=%i)" % (
+            self.transactions, self.mean_wait_ns, self.mean_hold_ns, self.max_queue_depth)
+
+
+class BusLock(object):
+    """A lock that serialises transactions on a bus and records contention statistics."""
+    
+    def __init__(self, fair=False, clock=monotonic_ns):
+        """Creates a BusLock.
+        
+        Parameters:
+        fair  -- (optional) if True, grants the bus to waiting threads
+                 in the order in which they asked for it.
+                 (default = False)
+        clock -- (optional) returns the current time, in nanoseconds.
+                 (default = time.monotonic_ns)
+        """
+        self.fair = fair
+        self._clock = clock
+        self._mutex = Lock()
+        self._lock = Lock()
+        self._held = False
+        self._waiters = deque()
+        self._waiting = 0
+        self._statistics = {}
+        self._holder = None
+    
+    @property
+    def statistics_lock(self):
+        """The lock that guards the statistics.
+        
+        Other records of the transactions on the bus can share it, so
+        that they are snapshotted and reset consistently.
+        """
+        return self._mutex
+    
+    @property
+    def queue_depth(self):
+        """The number of threads currently waiting for the bus."""
+        return self._waiting
+    
+    def acquire(self, addr):
+        """Waits until the bus is free and takes exclusive use of it.
+        
+        Parameters:
+        addr -- the address of the device that the thread will
+                communicate with, under which the wait and hold times
+                are recorded.
+        """
+        arrived = self._clock()
+        
+        with self._mutex:
+            depth = self._waiting
+            self._waiting += 1
+            if self.fair:
+                if self._held:
+                    waiter = Lock()
+                    waiter.acquire()
+                    self._waiters.append(waiter)
+                else:
+                    waiter = None
+                    self._held = True
+        
+        if not self.fair:
+            self._lock.acquire()
+        elif waiter is not None:
+            # Released by the thread that hands the bus over to this one
+            waiter.acquire()
+        
+        acquired = self._clock()
+        with self._mutex:
+            self._waiting -= 1
+        
+        self._holder = (addr, arrived, acquired, depth)
+    
+    def release(self):
+        """Releases the bus, recording the statistics of the transaction."""
+        released = self._clock()
+        addr, arrived, acquired, depth = self._holder
+        self._holder = None
+        
+        with self._mutex:
+            self._record(addr, acquired - arrived, released - acquired, depth)
+            if self.fair:
+                if self._waiters:
+                    self._waiters.popleft().release()
+                else:
+                    self._held = False
+        
+        if not self.fair:
+            self._lock.release()
+    
+    def _record(self, addr, wait_ns, hold_ns, depth):
+        stats = self._statistics.get(addr)
+        if stats is None:
+            stats = self._statistics[addr] = AddressStatistics()
+        
+        stats.transactions += 1
+        stats.total_wait_ns += wait_ns
+        stats.max_wait_ns = max(stats.max_wait_ns, wait_ns)
+        stats.total_hold_ns += hold_ns
+        stats.max_hold_ns = max(stats.max_hold_ns, hold_ns)
+        stats.total_queue_depth += depth
+        stats.max_queue_depth = max(stats.max_queue_depth, depth)
+    
+    def statistics(self):
+        """Returns a snapshot of the statistics, as a dict that maps each device address to its AddressStatistics."""
+        with self._mutex:
+            return {addr: copy(stats) for addr, stats in self._statistics.items()}
+    
+    def reset_statistics(self):
+        """Discards the statistics recorded so far."""
+        with self._mutex:
+            self._statistics = {}
@@ -0,0 +1,122 @@
+"""Debouncing of noisy interrupt-driven inputs.
+
+Mechanical buttons and relay contacts produce a burst of edges every
+time they change state.  A Debouncer collapses each burst into at most
+one change of its stable value, reported only after the input has
+stopped changing for a settle time.
+
+A Debouncer has a file descriptor and can be added to a Selector in
+place of its pin.  The descriptor becomes readable when the first edge
+of a burst arrives and when the settle time expires, rather than on
+every edge.  When the Selector reports that the Debouncer is ready,
+call its update() method, which returns True only if the stable value
+has changed.
+
+For example:
+
+    with pins.pin(0, direction=In, interrupt=Both) as button, \\
+         Debouncer(button, settle_time=0.02) as debounced, \\
+         Selector() as selector:
+        
+        selector.add(debounced)
+        while True:
+            selector.wait()
+            if selector.ready is debounced and debounced.update():
+                print("button is now", debounced.value)
+"""
+
+from quick2wire.syscall import SelfClosing
+from quick2wire.selector import Selector
+from quick2wire.timerfd import Timer, CLOCK_MONOTONIC
+
+
+class Debouncer(SelfClosing):
+    """Reports changes of a pin's value only once the value has been stable for a settle time."""
+    
+    def __init__(self, pin, settle_time):
+        """Creates a Debouncer.
+        
+        Parameters:
+        pin         -- an open input pin with its interrupt set.
+        settle_time -- how long, in seconds, the pin must go without
+                       signalling an edge before its value is
+                       considered stable.
+        """
+        self._pin = pin
+        self._timer = Timer(offset=settle_time, blocking=False, clock=CLOCK_MONOTONIC)
+        self._selector = Selector(2)
+        self._selector.add(self._timer)
+        self._selector.add(self._pin)
+        self._listening = True
+        self._checking = False
+        self._value = pin.get()
+        self.bursts = 0
+        self.changes = 0
+    
+    @property
+    def pin(self):
+        return self._pin
+    
+    @property
+    def settle_time(self):
+        """The time, in seconds, for which the pin must be stable."""
+        return self._timer.offset
+    
+    @property
+    def value(self):
+        """The stable value of the pin."""
+        return self._value
+    
+    def fileno(self):
+        """Returns a file descriptor that a Selector can wait on."""
+        return self._selector.fileno()
+    
+    def close(self):
+        """Releases the Debouncer's timer and file descriptor.  The pin is not closed."""
+        self._selector.close()
+        self._timer.close()
+    
+    def update(self):
+        """Processes the edges and timeouts that made the Debouncer ready.
+        
+        Call when a Selector reports that the Debouncer is ready.  Does
+        not block.
+        
+        Returns: True if the stable value of the pin has changed,
+                 False otherwise.
+        """
+        while True:
+            self._selector.wait(timeout=0)
+            if self._selector.ready is self._pin:
+                self._start_settling()
+            elif self._selector.ready is self._timer:
+                self._settle_time_expired()
+            else:
+                break
+        
+        if self._checking:
+            self._checking = False
+            value = self._pin.get()
+            if value != self._value:
+                self._value = value
+                self.changes += 1
+                return True
+        
+        return False
+    
+    def _start_settling(self):
+        if not self._checking:
+            self.bursts += 1
+        
+        self._pin.get()
+        self._checking = False
+        if self._listening:
+            self._selector.remove(self._pin)
+            self._listening = False
+        self._timer.start()
+    
+    def _settle_time_expired(self):
+        self._timer.wait()
+        self._selector.add(self._pin)
+        self._listening = True
+        self._checking = True
@@ -0,0 +1,139 @@
+"""Timestamped capture of the edges signalled by an input pin.
+
+An EdgeCapture records a (timestamp, value) pair every time it is told
+that its pin has signalled an interrupt.  The pairs are stored in a
+fixed-size ring buffer that is allocated when the EdgeCapture is
+created, so recording an edge does not allocate buffer space.  If
+events are not drained fast enough the oldest are overwritten and the
+overflow is counted.
+
+An EdgeCapture can be added to a Selector in place of its pin:
+
+    with pins.pin(0, direction=In, interrupt=Both) as pin, Selector() as selector:
+        capture = EdgeCapture(pin)
+        selector.add(capture)
+        while True:
+            selector.wait()
+            if selector.ready is capture:
+                capture.capture()
+            ...
+            for timestamp, value in capture.drain():
+                ...
+
+If the EdgeCapture is given a quick2wire.gpiochip.LineEvents object
+instead of a Pin, it records the timestamps of the kernel's edge
+events instead of the time at which the process was woken.
+"""
+
+from array import array
+from time import monotonic_ns
+from quick2wire.selector import LEVEL
+
+
+class EdgeCapture(object):
+    """Records the time and value of each edge signalled by a pin into a ring buffer."""
+    
+    def __init__(self, pin, capacity=1024, clock=monotonic_ns):
+        """Creates an EdgeCapture.
+        
+        Parameters:
+        pin      -- the source of edges: an open input Pin with its
+                    interrupt set, or a quick2wire.gpiochip.LineEvents.
+        capacity -- (optional) the number of events that can be held
+                    before the oldest are overwritten. (default = 1024)
+        clock    -- (optional) returns the current time, in
+                    nanoseconds.  (default = time.monotonic_ns)
+        """
+        self._pin = pin
+        self._clock = clock
+        self._capacity = capacity
+        self._timestamps = array('q', bytes(8*capacity))
+        self._values = bytearray(capacity)
+        self._head = 0
+        self._tail = 0
+        self.overflows = 0
+        self._reads_events = hasattr(pin, "read_events")
+        self.__trigger__ = getattr(pin, "__trigger__", LEVEL)
+    
+    @property
+    def pin(self):
+        return self._pin
+    
+    @property
+    def capacity(self):
+        """The number of events that the ring buffer can hold."""
+        return self._capacity
+    
+    def fileno(self):
+        """Returns the file descriptor of the pin."""
+        return self._pin.fileno()
+    
+    def __len__(self):
+        """The number of events waiting to be drained."""
+        return self._head - self._tail
+    
+    def capture(self):
+        """Records the edge that caused the pin to signal.
+        
+        Call when a Selector reports that the pin is ready.  The time
+        is taken before the pin's value is read.  If the pin is a
+        LineEvents, the events queued by the kernel are recorded with
+        the kernel's timestamps.
+        """
+        if self._reads_events:
+            for timestamp, value in self._pin.read_events():
+                self.record(timestamp, value)
+        else:
+            timestamp = self._clock()
+            self.record(timestamp, self._pin.get())
+    
+    def record(self, timestamp, value):
+        """Records an event in the ring buffer, overwriting the oldest event if the buffer is full."""
+        if self._head - self._tail == self._capacity:
+            self._tail += 1
+            self.overflows += 1
+        
+        i = self._head % self._capacity
+        self._timestamps[i] = timestamp
+        self._values[i] = value
+        self._head += 1
+    
+    def drain_into(self, timestamps, values):
+        """Moves the oldest events into caller-supplied buffers, without allocating.
+        
+        Parameters:
+        timestamps -- a writable sequence of integers, such as an array('q').
+        values     -- a writable sequence of integers, such as a bytearray,
+                      the same length as timestamps.
+        
+        Returns: the number of events moved, at most len(timestamps).
+        """
+        count = min(len(timestamps), self._head - self._tail)
+        capacity = self._capacity
+        tail = self._tail
+        for n in range(count):
+            i = (tail + n) % capacity
+            timestamps[n] = self._timestamps[i]
+            values[n] = self._values[i]
+        self._tail = tail + count
+        return count
+    
+    def drain(self, max_count=None):
+        """Removes the oldest events from the buffer.
+        
+        Parameters:
+        max_count -- (optional) the maximum number of events to remove.
+                     Default: all of them.
+        
+        Returns: a list of (timestamp, value) pairs, oldest first.
+        """
+        count = len(self) if max_count is None else min(max_count, len(self))
+        timestamps = array('q', bytes(8*count))
+        values = bytearray(count)
+        self.drain_into(timestamps, values)
+        return list(zip(timestamps, values))
+    
+    def clear(self):
+        """Discards all events and resets the overflow count."""
+        self._tail = self._head
+        self.overflows = 0
@@ -0,0 +1,147 @@
+"""Decoding of quadrature rotary encoders connected to two input pins.
+
+A RotaryEncoder watches the A and B channels of an encoder, which
+must be open input pins with their interrupt set to Both.  Every time
+either channel signals an edge, the encoder reads both channels
+through a PinGroup, with a single read of their bank if the bank reads
+all its pins in one operation, and looks up the transition from the previous state in a 16-entry
+table to decide whether the encoder has moved forward, backward or
+not at all, or whether a state has been skipped.
+
+A RotaryEncoder has a file descriptor and can be added to a Selector.
+When the Selector reports that the encoder is ready, call its update()
+method:
+
+    with pins.pin(0, direction=In, interrupt=Both) as a, \\
+         pins.pin(1, direction=In, interrupt=Both) as b, \\
+         RotaryEncoder(a, b) as encoder, \\
+         Selector() as selector:
+        
+        selector.add(encoder)
+        while True:
+            selector.wait()
+            if selector.ready is encoder and encoder.update():
+                print("position:", encoder.detents)
+
+The file descriptor becomes readable whenever an edge is waiting to
+be processed, so an asyncio event loop can drive the encoder with:
+
+    loop.add_reader(encoder.fileno(), encoder.update)
+"""
+
+from quick2wire.syscall import SelfClosing
+from quick2wire.selector import Selector
+from quick2wire.gpio import PinGroup
+
+
+# The state is the value of channel A in bit 0 and channel B in bit 1.
+# In the forward direction the state follows the Gray code sequence
+# 0, 1, 3, 2.  The table is indexed by (previous_state << 2) | state.
+
+_INVALID = 2
+
+_transitions = (
+    #  to 0      to 1      to 2      to 3
+        0,        1,       -1,    _INVALID,   # from 0
+       -1,        0,    _INVALID,     1,      # from 1
+        1,     _INVALID,    0,       -1,      # from 2
+    _INVALID,    -1,        1,        0)      # from 3
+
+
+class RotaryEncoder(SelfClosing):
+    """Counts the steps of a quadrature rotary encoder."""
+    
+    def __init__(self, pin_a, pin_b, steps_per_detent=4):
+        """Creates a RotaryEncoder.
+        
+        Parameters:
+        pin_a            -- the open input pin connected to channel A,
+                            with its interrupt set to Both.
+        pin_b            -- the open input pin connected to channel B,
+                            with its interrupt set to Both.
+        steps_per_detent -- (optional) the number of quadrature steps
+                            between the encoder's detents. (default = 4)
+        """
+        self._pins = PinGroup([pin_a, pin_b])
+        self._steps_per_detent = steps_per_detent
+        self._selector = Selector(2)
+        self._selector.add(pin_a)
+        self._selector.add(pin_b)
+        self._state = self._pins.read()
+        self._direction = 0
+        self.position = 0
+        self.forward = 0
+        self.backward = 0
+        self.invalid = 0
+    
+    @property
+    def steps_per_detent(self):
+        return self._steps_per_detent
+    
+    @property
+    def detents(self):
+        """The position of the encoder, in detents."""
+        return int(self.position / self._steps_per_detent)
+    
+    @property
+    def direction(self):
+        """The direction of the last step: 1 for forward, -1 for backward or 0 if the encoder has not moved."""
+        return self._direction
+    
+    def fileno(self):
+        """Returns a file descriptor that a Selector can wait on."""
+        return self._selector.fileno()
+    
+    def close(self):
+        """Releases the encoder's file descriptor.  The pins are not closed."""
+        self._selector.close()
+    
+    def update(self):
+        """Processes the edges that made the encoder ready.
+        
+        Call when a Selector reports that the encoder is ready.  Does
+        not block.
+        
+        Returns: the change in position, in steps.
+        """
+        selector = self._selector
+        start = self.position
+        while True:
+            selector.wait(timeout=0)
+            if selector.ready is None:
+                break
+            self.step(self._pins.read())
+        return self.position - start
+    
+    def step(self, state):
+        """Moves the encoder to a new state read from its channels.
+        
+        Called by update().  Can be called directly by applications that
+        sample the channels themselves.
+        
+        Parameters:
+        state -- the value of channel A in bit 0 and channel B in bit 1.
+        """
+        delta = _transitions[(self._state << 2) | state]
+        self._state = state
+        
+        if delta == _INVALID:
+            # A state was skipped.  Assume the encoder is still turning
+            # in the same direction, so has moved two steps.
+            self.invalid += 1
+            delta = 2 * self._direction
+        elif delta > 0:
+            self.forward += 1
+            self._direction = 1
+        elif delta < 0:
+            self.backward += 1
+            self._direction = -1
+        
+        self.position += delta
+    
+    def reset(self):
+        """Sets the position to zero and resets the statistics."""
+        self.position = 0
+        self.forward = 0
+        self.backward = 0
+        self.invalid = 0
@@ -72,3 +72,12 @@ class Semaphore(syscall.SelfClosing):
                 return False
             else:
                 raise
+    
+    def acquire(self):
+        """Returns an awaitable that waits in an asyncio event loop for a signal from the Semaphore.
+        
+        Like wait(), receiving the signal decrements the Semaphore's
+        count by one.  See quick2wire.aio.
+        """
+        from quick2wire.aio import acquire
+        return acquire(self)
@@ -10,10 +10,143 @@ from quick2wire.selector import EDGE
 
 
 def gpio_admin(subcommand, pin, pull=None):
+    subprocess.check_call(_gpio_admin_command(subcommand, pin, pull))
+
+
+def _gpio_admin_command(subcommand, pin, pull=None):
     if pull:
-        subprocess.check_call(["gpio-admin", subcommand, str(pin), pull])
+        return ["gpio-admin", subcommand, str(pin), pull]
     else:
-        subprocess.check_call(["gpio-admin", subcommand, str(pin)])
+        return ["gpio-admin", subcommand, str(pin)]
+
+
+class PinExporter(object):
+    """Makes GPIO pins available to user space, identified by SoC pin number.
+    
+    Subclasses must implement export and unexport.  The export_all
+    and unexport_all methods, used by PinBank to open and close many
+    pins together, can be overridden to do the work more cheaply than
+    one pin at a time.
+    
+    The root attribute is the sysfs GPIO directory in which the
+    exported pins appear, each in a gpioN subdirectory.
+    """
+    
+    root = "/sys/devices/virtual/gpio"
+    
+    def export(self, pin, pull=None):
+        """Exports a pin, optionally enabling its pull-up or pull-down resistor."""
+        raise NotImplementedError()
+    
+    def unexport(self, pin):
+        """Unexports a pin."""
+        raise NotImplementedError()
+    
+    def export_all(self, pins_and_pulls):
+        """Exports several pins, given as a sequence of (pin, pull) pairs.
+        
+        If any pin cannot be exported, the pins that were exported are
+        unexported again.
+        """
+        exported = []
+        try:
+            for pin, pull in pins_and_pulls:
+                self.export(pin, pull)
+                exported.append(pin)
+        except:
+            self.unexport_all(exported)
+            raise
+    
+    def unexport_all(self, pins):
+        """Unexports several pins."""
+        for pin in pins:
+            self.unexport(pin)
+
+
+class GPIOAdminExporter(PinExporter):
+    """Exports pins by running the gpio-admin command once per pin.
+    
+    Does not need root privileges.
+    """
+    
+    def export(self, pin, pull=None):
+        gpio_admin("export", pin, pull)
+    
+    def unexport(self, pin):
+        gpio_admin("unexport", pin)
+
+
+class BatchedGPIOAdminExporter(GPIOAdminExporter):
+    """Exports pins with gpio-admin, running the commands for many pins concurrently.
+    
+    gpio-admin only accepts one pin per invocation, so exporting N pins
+    still runs N processes, but the caller waits for the slowest of
+    them rather than for all of them one after another.
+    """
+    
+    def export_all(self, pins_and_pulls):
+        pins_and_pulls = list(pins_and_pulls)
+        succeeded = []
+        try:
+            _run_all([_gpio_admin_command("export", pin, pull) for pin, pull in pins_and_pulls], succeeded)
+        except:
+            self.unexport_all([pins_and_pulls[i][0] for i in succeeded])
+            raise
+    
+    def unexport_all(self, pins):
+        _run_all([_gpio_admin_command("unexport", pin) for pin in pins])
+
+
+def _run_all(commands, succeeded=None):
+    # Appends the indices of the commands that succeeded to succeeded,
+    # even if some of the commands could not be run
+    processes = []
+    try:
+        for command in commands:
+            processes.append(subprocess.Popen(command))
+    finally:
+        returncodes = [p.wait() for p in processes]
+        if succeeded is not None:
+            succeeded.extend(i for i, returncode in enumerate(returncodes) if returncode == 0)
+    
+    for returncode, command in zip(returncodes, commands):
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command)
+
+
+class SysfsExporter(PinExporter):
+    """Exports pins by writing directly to the kernel's sysfs GPIO interface.
+    
+    Much faster than running gpio-admin, but the process must have
+    permission to write to the export and unexport files, and the
+    exported pins are only accessible to users that have permission to
+    access the files that the kernel creates.  Pull-up and pull-down
+    resistors cannot be configured through sysfs.
+    """
+    
+    def __init__(self, root="/sys/class/gpio"):
+        """Creates a SysfsExporter.
+        
+        Parameters:
+        root -- (optional) the directory containing the export and 
+                unexport files, in which the exported pins appear.
+        """
+        self.root = root
+    
+    def export(self, pin, pull=None):
+        if pull:
+            raise ValueError("cannot set pull of pin " + str(pin) + " through sysfs")
+        self._write("export", pin)
+    
+    def unexport(self, pin):
+        self._write("unexport", pin)
+    
+    def _write(self, filename, pin):
+        with open(os.path.join(self.root, filename), "w") as f:
+            f.write(str(pin))
+
+
+default_exporter = GPIOAdminExporter()
 
 
 Out = "out"
@@ -26,6 +159,14 @@ Both = "both"
 PullDown = "pulldown"
 PullUp = "pullup"
 
+# The sysfs attribute files that a Pin can keep open while it is open
+_persistent_attributes = ("direction", "edge", "active_low")
+
+# The contents of the sysfs value file
+_HIGH = b"1"
+_LOW = b"0"
+_HIGH_BYTE = _HIGH[0]
+
 
 
 class PinAPI(object):
@@ -54,16 +195,32 @@ class PinAPI(object):
     
 
 class PinBankAPI(object):
+    # True if read() reads all the pins of the bank with a single 
+    # operation, such as one register read or ioctl, so that reading
+    # some of the pins through it costs no more than reading one
+    single_read = False
+    
     def __getitem__(self, n):
         if 0 < n < len(self):
             raise ValueError("no pin index {n} out of range", n=n)
         return self.pin(n)
     
-    def write(self):
-        pass
+    def write(self, mask, values):
+        """Sets the values of many output pins of the bank in a single operation.
+        
+        Bit n of mask selects whether pin n of the bank is written and
+        bit n of values is the new value of pin n.  Backends that
+        support it perform the whole write as a single atomic operation.
+        """
+        raise NotImplementedError()
     
     def read(self):
-        pass
+        """Returns the values of the bank's open pins as an integer bit-mask.
+        
+        Bit n of the result is the value of pin n of the bank.  Bits of
+        pins that are not open are zero.
+        """
+        raise NotImplementedError()
 
 
 
@@ -72,7 +229,8 @@ class Pin(PinAPI):
     
     __trigger__ = EDGE
     
-    def __init__(self, bank, index, soc_pin_number, direction=In, interrupt=None, pull=None):
+    def __init__(self, bank, index, soc_pin_number, direction=In, interrupt=None, pull=None, 
+                 keep_attributes_open=False):
         """Creates a pin
         
         Parameters:
@@ -81,16 +239,27 @@ class Pin(PinAPI):
         direction       -- (optional) the direction of the pin, either In or Out.
         interrupt       -- (optional)
         pull            -- (optional)
+        keep_attributes_open -- (optional) if True, the pin keeps the sysfs
+                           direction, edge and active_low files open while
+                           the pin is open, so that changing the direction,
+                           interrupt or active_low properties costs a single
+                           write system call. (default = False)
         
         Raises:
         IOError        -- could not export the pin (if direction is given)
         """
-        super(Pin,self).__init__(None, index)
+        super(Pin,self).__init__(bank, index)
         self._soc_pin_number = soc_pin_number
-        self._file = None
+        self._path_prefix = _pin_directory(self._exporter.root, soc_pin_number)
+        self._fd = None
+        self._value_buf = bytearray(1)
+        self._value_bufs = [self._value_buf]
         self._direction = direction
         self._interrupt = interrupt
         self._pull = pull
+        self._active_low = False
+        self._keep_attributes_open = keep_attributes_open
+        self._attribute_fds = {}
     
     
     @property
@@ -98,21 +267,54 @@ class Pin(PinAPI):
         return self._soc_pin_number
     
     def open(self):
-        gpio_admin("export", self.soc_pin_number, self._pull)
-        self._file = open(self._pin_path("value"), "r+")
-        self._write("direction", self._direction)
-        if self._direction == In:
-            self._write("edge", self._interrupt if self._interrupt is not None else "none")
-            
+        self._exporter.export(self.soc_pin_number, self._pull)
+        try:
+            self._open_exported()
+        except:
+            self._exporter.unexport(self.soc_pin_number)
+            raise
+        self._opened()
+    
     def close(self):
         if not self.closed:
-            if self.direction == Out:
-                self.value = 0
-            self._file.close()
-            self._file = None
-            self._write("direction", In)
-            self._write("edge", "none")
-            gpio_admin("unexport", self.soc_pin_number)
+            self._close_exported()
+            self._closed()
+            self._exporter.unexport(self.soc_pin_number)
+    
+    def _opened(self):
+        if self.bank is not None:
+            self.bank._open_pins[self.index] = self
+    
+    def _closed(self):
+        if self.bank is not None:
+            self.bank._open_pins.pop(self.index, None)
+    
+    @property
+    def _exporter(self):
+        return self.bank.exporter if self.bank is not None else default_exporter
+    
+    def _open_exported(self):
+        self._fd = os.open(self._pin_path("value"), os.O_RDWR)
+        try:
+            if self._keep_attributes_open:
+                self._open_attributes()
+            self._write("direction", self._direction)
+            if self._direction == In:
+                self._write("edge", self._interrupt if self._interrupt is not None else "none")
+        except:
+            self._close_attributes()
+            os.close(self._fd)
+            self._fd = None
+            raise
+            
+    def _close_exported(self):
+        if self.direction == Out:
+            self.value = 0
+        os.close(self._fd)
+        self._fd = None
+        self._write("direction", In)
+        self._write("edge", "none")
+        self._close_attributes()
     
     def get(self):
         """The current value of the pin: 1 if the pin is high or 0 if the pin is low.
@@ -122,18 +324,24 @@ class Pin(PinAPI):
         Raises: 
         IOError -- could not read or write the pin's value.
         """
-        self._check_open()
-        self._file.seek(0)
-        v = self._file.read()
-        return int(v) if v else 0
+        if self._fd is None:
+            raise IOError(str(self) + " is closed")
+        if os.preadv(self._fd, self._value_bufs, 0) == 0:
+            return 0
+        return 1 if self._value_buf[0] == _HIGH_BYTE else 0
     
     def set(self, new_value):
-        self._check_open()
+        """Sets the value of the pin: 1 to drive the pin high or 0 to drive it low.
+        
+        Raises:
+        IOError    -- could not write the pin's value.
+        ValueError -- the pin is not an output pin.
+        """
+        if self._fd is None:
+            raise IOError(str(self) + " is closed")
         if self._direction != Out:
             raise ValueError("not an output pin")
-        self._file.seek(0)
-        self._file.write(str(int(new_value)))
-        self._file.flush()
+        os.pwrite(self._fd, _HIGH if new_value else _LOW, 0)
     
     @property
     def direction(self):
@@ -171,29 +379,73 @@ class Pin(PinAPI):
         self._write("edge", new_value)
         self._interrupt = new_value
 
+    @property
+    def active_low(self):
+        """If True, the value of the pin is inverted: 1 when the pin is low and 0 when it is high.
+        
+        Raises:
+        IOError -- could not set the pin's active_low attribute
+        """
+        return self._active_low
+    
+    @active_low.setter
+    def active_low(self, new_value):
+        self._write("active_low", "1" if new_value else "0")
+        self._active_low = bool(new_value)
+    
     @property
     def pull(self):
         return self._pull
     
     def fileno(self):
         """Return the underlying file descriptor.  Useful for select, epoll, etc."""
-        return self._file.fileno()
+        return self._fd
+    
+    def edge(self):
+        """Returns an awaitable that waits in an asyncio event loop for the pin to signal an interrupt.
+        
+        The result of the awaitable is the new value of the pin.  See
+        quick2wire.aio.
+        """
+        from quick2wire.aio import edge
+        return edge(self)
     
     @property
     def closed(self):
         """Returns if this pin is closed"""
-        return self._file is None or self._file.closed
+        return self._fd is None
     
-    def _check_open(self):
-        if self.closed:
-            raise IOError(str(self) + " is closed")
+    def _open_attributes(self):
+        try:
+            for filename in _persistent_attributes:
+                self._attribute_fds[filename] = os.open(self._pin_path(filename), os.O_RDWR)
+        except:
+            self._close_attributes()
+            raise
+    
+    def _close_attributes(self):
+        fds, self._attribute_fds = self._attribute_fds, {}
+        for fd in fds.values():
+            os.close(fd)
     
     def _write(self, filename, value):
-        with open(self._pin_path(filename), "w+") as f:
-            f.write(value)
+        if value is None:
+            value = "none"
+        
+        fd = self._attribute_fds.get(filename)
+        if fd is not None:
+            self._write_attribute(fd, value.encode())
+        else:
+            with open(self._pin_path(filename), "w+") as f:
+                f.write(value)
+    
+    def _write_attribute(self, fd, data):
+        # Each write to a sysfs attribute replaces its whole value, so 
+        # there is no need to truncate the file
+        os.pwrite(fd, data, 0)
     
     def _pin_path(self, filename=""):
-        return "/sys/devices/virtual/gpio/gpio%i/%s" % (self.soc_pin_number, filename)
+        return self._path_prefix + filename
     
     def __repr__(self):
         return self.__module__ + "." + str(self)
@@ -208,14 +460,101 @@ class Pin(PinAPI):
 
 
 class PinBank(PinBankAPI):
-    def __init__(self, index_to_soc_fn, count=None):
+    def __init__(self, index_to_soc_fn, count=None, exporter=None):
+        """Creates a PinBank.
+        
+        Parameters:
+        index_to_soc_fn -- maps pin indices to SoC pin numbers: either a
+                           function, or a sequence or dict of SoC pin 
+                           numbers indexed by pin index.  A sequence or
+                           dict is copied into a lookup table when the
+                           bank is created.
+        count           -- (optional) the number of pins in the bank.
+        exporter        -- (optional) the PinExporter used to export and 
+                           unexport the bank's pins.  Defaults to 
+                           default_exporter, which runs gpio-admin.
+        """
         super(PinBank,self).__init__()
-        self._index_to_soc = index_to_soc_fn
+        if callable(index_to_soc_fn):
+            self._index_to_soc = index_to_soc_fn
+        else:
+            self._index_to_soc = map_with(index_to_soc_fn)
         self._count = count
+        self.exporter = exporter if exporter is not None else default_exporter
+        self._open_pins = {}
     
     def pin(self, index, *args, **kwargs):
         return Pin(self, index, self._index_to_soc(index), *args, **kwargs)
     
+    def open_all(self, pins):
+        """Opens several pins of the bank, exporting them with one call to the bank's exporter.
+        
+        If any pin cannot be exported or opened, the pins that were
+        opened are closed again and the pins that were exported are
+        unexported.
+        """
+        pins = list(pins)
+        self.exporter.export_all([(p.soc_pin_number, p.pull) for p in pins])
+        
+        opened = []
+        try:
+            for p in pins:
+                p._open_exported()
+                p._opened()
+                opened.append(p)
+        except:
+            for p in opened:
+                p._close_exported()
+                p._closed()
+            self.exporter.unexport_all([p.soc_pin_number for p in pins])
+            raise
+    
+    def close_all(self, pins):
+        """Closes several pins of the bank, unexporting them with one call to the bank's exporter."""
+        pins = [p for p in pins if not p.closed]
+        for p in pins:
+            p._close_exported()
+            p._closed()
+        self.exporter.unexport_all([p.soc_pin_number for p in pins])
+    
+    def read(self):
+        """Returns the values of the bank's open pins as an integer bit-mask.
+        
+        Bit n of the result is the value of pin n of the bank.  Bits of
+        pins that are not open are zero.
+        
+        Raises:
+        IOError -- could not read a pin's value.
+        """
+        values = 0
+        for index, pin in self._open_pins.items():
+            if pin.get():
+                values |= 1 << index
+        return values
+    
+    def write(self, mask, values):
+        """Sets the values of many output pins of the bank in a single pass.
+        
+        Bit n of mask selects whether pin n of the bank is written and
+        bit n of values is the new value of pin n.
+        
+        Raises:
+        IOError    -- a pin selected by the mask is not open or could not 
+                      be written.
+        ValueError -- a pin selected by the mask is not an output pin.
+        """
+        _check_mask_open(self, mask)
+        
+        # Check every selected pin before writing any, so that a bad
+        # mask does not leave the bank partly written
+        selected = [(pin, values & (1 << index)) for index, pin in self._open_pins.items() if mask & (1 << index)]
+        for pin, value in selected:
+            if pin._direction != Out:
+                raise ValueError(str(pin) + " is not an output pin")
+        
+        for pin, value in selected:
+            pin.set(value)
+    
     @property
     def has_len(self):
         return self._count is not None
@@ -227,25 +566,255 @@ class PinBank(PinBankAPI):
             raise TypeError(self.__class__.__name__ + " has no len")
 
 
+class PinGroup(PinBankAPI):
+    """Treats an ordered sequence of pins as a single integer-valued port.
+    
+    Bit n of the group's value is the value of the nth pin of the
+    group.  The pins can belong to different banks of different
+    types, such as the Pi's GPIO pins and the pins of an MCP23x17.
+    The group remembers the value it last wrote and only writes the
+    pins whose values have changed.  The changed pins of each bank are
+    written with a single call to the bank's write(mask, values) method
+    if the bank implements it, or one pin at a time if it does not.
+    
+    For example, to drive an 8-bit DAC ladder:
+    
+        with PinGroup([pins.pin(i, Out) for i in range(8)]) as dac:
+            for v in range(256):
+                dac.value = v
+    """
+    
+    def __init__(self, pins):
+        """Creates a PinGroup.
+        
+        Parameters:
+        pins -- the pins of the group, least significant bit first.
+        """
+        self._pins = tuple(pins)
+        self._last_written = None
+        self._bulk_runs = []
+        self._single_pins = []
+        
+        runs_by_bank = {}
+        for bit, pin in enumerate(self._pins):
+            bank = pin.bank
+            if not _implements(bank, "write"):
+                self._single_pins.append((1 << bit, pin))
+                continue
+            
+            runs = runs_by_bank.get(id(bank))
+            if runs is None:
+                runs = runs_by_bank[id(bank)] = []
+                self._bulk_runs.append((bank, runs))
+            
+            # Pins that are adjacent in both the group and the bank are
+            # moved between the group value and bank value with one shift
+            if runs and runs[-1][0] + runs[-1][2] == bit and runs[-1][1] + runs[-1][2] == pin.index:
+                group_shift, bank_shift, width = runs[-1]
+                runs[-1] = (group_shift, bank_shift, width + 1)
+            else:
+                runs.append((bit, pin.index, 1))
+        
+        self._bulk_runs = [(bank, tuple((group_shift, bank_shift, (1 << width) - 1) 
+                                        for group_shift, bank_shift, width in runs))
+                           for bank, runs in self._bulk_runs]
+    
+    def __len__(self):
+        return len(self._pins)
+    
+    def pin(self, n):
+        """Returns the nth pin of the group."""
+        return self._pins[n]
+    
+    def open(self):
+        """Opens all the pins of the group."""
+        opened = []
+        try:
+            for pin in self._pins:
+                pin.open()
+                opened.append(pin)
+        except:
+            for pin in opened:
+                pin.close()
+            raise
+        self._last_written = None
+    
+    def close(self):
+        """Closes all the pins of the group."""
+        for pin in self._pins:
+            pin.close()
+    
+    def __enter__(self):
+        self.open()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def forget(self):
+        """Forgets the last value written, so that the next write sets every selected pin.
+        
+        Call if the pins of the group have been written other than
+        through the group.
+        """
+        self._last_written = None
+    
+    def read(self):
+        """Returns the values of the pins of the group as an integer.
+        
+        The values of the pins of each bank that reads all its pins
+        with a single operation, such as the registers of /dev/gpiomem
+        or a GPIO character device line handle, are read with a single
+        call to the bank's read method.  The pins of other banks, such
+        as the Pi's sysfs PinBank, are read one at a time, so that
+        reading the group does not read, and acknowledge the pending
+        edges of, pins that are not in the group.
+        """
+        value = 0
+        for bank, runs in self._bulk_runs:
+            if bank.single_read:
+                bank_value = bank.read()
+                for group_shift, bank_shift, width_mask in runs:
+                    value |= ((bank_value >> bank_shift) & width_mask) << group_shift
+            else:
+                for group_shift, bank_shift, width_mask in runs:
+                    for i in range(width_mask.bit_length()):
+                        if self._pins[group_shift + i].get():
+                            value |= 1 << (group_shift + i)
+        
+        for bit, pin in self._single_pins:
+            if pin.get():
+                value |= bit
+        
+        return value
+    
+    def write(self, mask, values):
+        """Sets the values of the pins of the group selected by mask.
+        
+        Bit n of mask selects whether the nth pin of the group is
+        written and bit n of values is its new value.  Pins whose
+        value has not changed since the group last wrote them are not
+        written.
+        """
+        last = self._last_written
+        if last is None:
+            changed = mask
+            last = 0
+        else:
+            changed = mask & (values ^ last)
+        
+        if changed:
+            for bank, runs in self._bulk_runs:
+                bank_mask = 0
+                bank_values = 0
+                for group_shift, bank_shift, width_mask in runs:
+                    run_mask = (changed >> group_shift) & width_mask
+                    bank_mask |= run_mask << bank_shift
+                    bank_values |= ((values >> group_shift) & run_mask) << bank_shift
+                if bank_mask:
+                    bank.write(bank_mask, bank_values)
+            
+            for bit, pin in self._single_pins:
+                if changed & bit:
+                    pin.set(1 if values & bit else 0)
+        
+        self._last_written = (last & ~mask) | (values & mask)
+    
+    def get(self):
+        """Returns the values of the pins of the group as an integer.  The same as read()."""
+        return self.read()
+    
+    def set(self, new_value):
+        """Sets all the pins of the group to the bits of new_value, least significant bit first."""
+        self.write((1 << len(self._pins)) - 1, new_value)
+    
+    value = property(lambda g: g.get(), 
+                     lambda g,v: g.set(v), 
+                     doc="""The value of the group: bit n is the value of the nth pin.""")
+
+
+def _implements(bank, method_name):
+    return bank is not None and getattr(type(bank), method_name, None) is not getattr(PinBankAPI, method_name)
+
+
+_pin_directories = {}
+
+def _pin_directory(root, soc_pin_number):
+    key = (root, soc_pin_number)
+    try:
+        return _pin_directories[key]
+    except KeyError:
+        directory = _pin_directories[key] = os.path.join(root, "gpio%i" % soc_pin_number, "")
+        return directory
+
+
+def lookup(pin_mapping, i):
+    """Returns the SoC pin number of pin index i in a sequence or dict of SoC pin numbers.
+    
+    Raises:
+    IndexError -- i is not a valid pin index.
+    """
+    try:
+        if i >= 0 and pin_mapping[i] is not None:
+            return pin_mapping[i]
+    except LookupError:
+        pass
+    
+    raise IndexError(str(i) + " is not a valid pin index")
+
+
+def map_with(pin_mapping):
+    """Returns a function that maps pin indices to SoC pin numbers with a sequence or dict of SoC pin numbers.
+    
+    The mapping is copied into a lookup table when the function is
+    created.  The function raises IndexError if given an index that is
+    not in the mapping.
+    """
+    table = _soc_table(pin_mapping)
+    size = len(table)
+    
+    def index_to_soc(i):
+        if 0 <= i < size:
+            soc_pin_number = table[i]
+            if soc_pin_number is not None:
+                return soc_pin_number
+        
+        raise IndexError(str(i) + " is not a valid pin index")
+    
+    return index_to_soc
+
+
+def _soc_table(pin_mapping):
+    if isinstance(pin_mapping, dict):
+        size = max(pin_mapping) + 1 if pin_mapping else 0
+        return tuple(pin_mapping.get(i) for i in range(size))
+    else:
+        return tuple(pin_mapping)
+
+
+def _check_mask_open(bank, mask):
+    for index in bank._open_pins:
+        mask &= ~(1 << index)
+    if mask:
+        raise IOError("pins selected by mask " + bin(mask) + " of " + str(bank) + " are not open")
+
+
 BUTTON = 0
 LED = 1
 SPI_INTERRUPT = 6
 I2C_INTERRUPT = 7
 
 
-_pi_revision = revision()
-
-if _pi_revision == 0:
-    # Not running on the Raspberry Pi, so define no-op pin banks
-    pins = PinBank(lambda p: p)
-    pi_broadcom_soc = pins
-    pi_header_1 = pins
-
-else:
+def _pin_banks(pi_revision):
+    if pi_revision == 0:
+        # Not running on the Raspberry Pi, so define no-op pin banks
+        pins = PinBank(lambda p: p)
+        return dict(pins=pins, pi_broadcom_soc=pins, pi_header_1=pins)
+    
     def by_revision(d):
-        return d[_pi_revision]
-
-
+        return d[pi_revision]
+    
+    
     # Maps header pin numbers to SoC GPIO numbers
     # See http://elinux.org/RPi_Low-level_peripherals
     #
@@ -254,7 +823,7 @@ else:
     #         GPIO1, etc., but these are not the same as the SoC GPIO
     #         numbers.
     
-    _pi_header_1_pins = {
+    pi_header_1_pins = {
         3:  by_revision({1:0, 2:2}), 
         5:  by_revision({1:1, 2:3}), 
         7:  4, 
@@ -274,24 +843,18 @@ else:
         26: 7
         }
     
-    _pi_gpio_pins = [_pi_header_1_pins[i] for i in [11, 12, 13, 15, 16, 18, 22, 7]]
+    pi_gpio_pins = [pi_header_1_pins[i] for i in [11, 12, 13, 15, 16, 18, 22, 7]]
     
-    
-    def lookup(pin_mapping, i):
-        try:
-            if i >= 0:
-                return pin_mapping[i]
-        except LookupError:
-            pass
-        
-        raise IndexError(str(i) + " is not a valid pin index")
+    return dict(pi_broadcom_soc=PinBank(lambda p: p),
+                pi_header_1=PinBank(pi_header_1_pins),
+                pins=PinBank(pi_gpio_pins, len(pi_gpio_pins)))
 
-    def map_with(pin_mapping):
-        return lambda i: lookup(pin_mapping,i)
-    
-    
-    pi_broadcom_soc = PinBank(lambda p: p)
-    pi_header_1 = PinBank(map_with(_pi_header_1_pins))
-    pins = PinBank(map_with(_pi_gpio_pins), len(_pi_gpio_pins))
-    
 
+def __getattr__(name):
+    # The pin banks depend on the board revision, so are created when
+    # first used rather than when the module is imported
+    if name in ("pins", "pi_header_1", "pi_broadcom_soc"):
+        globals().update(_pin_banks(revision()))
+        return globals()[name]
+    
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
@@ -0,0 +1,346 @@
+"""Access to GPIO lines through the Linux GPIO character device.
+
+The GPIO character device, /dev/gpiochipN, replaces the deprecated
+sysfs GPIO interface used by quick2wire.gpio.  A GPIOChip requests
+many lines at once as a single LineHandle, and reads or writes the
+values of all of them with a single ioctl.
+
+For example:
+
+    from quick2wire.gpio import Out
+    from quick2wire.gpiochip import GPIOChip
+    
+    with GPIOChip(0) as chip, chip.request_lines([17, 18, 27], Out) as lines:
+        lines.write(0b111, 0b101)
+
+Edge events are reported by the kernel as timestamped records, read
+from a LineEvents object.  A LineEvents object can be added to a
+quick2wire.selector.Selector:
+
+    with GPIOChip(0) as chip, chip.request_events(17, Both) as events:
+        selector.add(events)
+        ...
+        for timestamp, value in events.read_events():
+            ...
+"""
+
+import os
+import posix
+import struct
+from ctypes import sizeof
+from fcntl import ioctl
+from quick2wire.syscall import SelfClosing
+from quick2wire.gpio import PinAPI, PinBankAPI, In, Out, Rising, Falling, Both, PullUp, PullDown
+from quick2wire.gpiochip_ctypes import *
+
+
+_direction_flags = {
+    In: GPIOHANDLE_REQUEST_INPUT,
+    Out: GPIOHANDLE_REQUEST_OUTPUT}
+
+_pull_flags = {
+    None: 0,
+    PullUp: GPIOHANDLE_REQUEST_BIAS_PULL_UP,
+    PullDown: GPIOHANDLE_REQUEST_BIAS_PULL_DOWN}
+
+_edge_flags = {
+    Rising: GPIOEVENT_REQUEST_RISING_EDGE,
+    Falling: GPIOEVENT_REQUEST_FALLING_EDGE,
+    Both: GPIOEVENT_REQUEST_BOTH_EDGES}
+
+_event_record = struct.Struct("QI4x")
+assert _event_record.size == sizeof(gpioevent_data)
+
+
+class GPIOChip(SelfClosing):
+    """A GPIO controller, accessed through its character device."""
+    
+    def __init__(self, n=0, path=None, ioctl=ioctl):
+        """Opens the GPIO character device.
+        
+        Arguments:
+        n     -- the number of the chip (default 0, the SoC GPIO
+                 controller of the Raspberry Pi).
+        path  -- (optional) the path of the device file.  Overrides n.
+        ioctl -- (optional) the function used to perform ioctls on the
+                 device and the line handles it returns.  Defaults to
+                 fcntl.ioctl.
+        """
+        self._ioctl = ioctl
+        self.fd = posix.open(path if path is not None else "/dev/gpiochip%i"%n, posix.O_RDWR)
+    
+    def fileno(self):
+        """Returns the chip's file descriptor."""
+        return self.fd
+    
+    def close(self):
+        """Closes the GPIO character device."""
+        if self.fd is not None:
+            posix.close(self.fd)
+            self.fd = None
+    
+    def info(self):
+        """Returns the chip's gpiochip_info: its name, label and number of lines."""
+        info = gpiochip_info()
+        self._ioctl(self.fd, GPIO_GET_CHIPINFO_IOCTL, info)
+        return info
+    
+    def request_lines(self, offsets, direction=In, values=None, pull=None, active_low=False, label="quick2wire"):
+        """Requests many lines of the chip as a single LineHandle.
+        
+        Arguments:
+        offsets    -- the offsets of the lines on the chip.  On the
+                      Raspberry Pi these are the SoC pin numbers.
+        direction  -- the direction of all the lines, In or Out.
+        values     -- (optional) the initial values of output lines,
+                      as a bit-mask: bit n is the value of offsets[n].
+        pull       -- (optional) PullUp or PullDown.
+        active_low -- (optional) if True, the values of the lines are
+                      inverted.
+        label      -- (optional) the consumer label of the lines.
+        
+        Raises:
+        ValueError -- more lines than the kernel allows in a handle.
+        OSError    -- the kernel refused the request.
+        """
+        offsets = tuple(offsets)
+        if len(offsets) > GPIOHANDLES_MAX:
+            raise ValueError("cannot request more than %i lines in one handle" % GPIOHANDLES_MAX)
+        
+        request = gpiohandle_request()
+        request.flags = (_direction_flags[direction]
+                         |_pull_flags[pull]
+                         |(active_low and GPIOHANDLE_REQUEST_ACTIVE_LOW))
+        request.consumer_label = label.encode()
+        request.lines = len(offsets)
+        for i, offset in enumerate(offsets):
+            request.lineoffsets[i] = offset
+            request.default_values[i] = (values or 0) >> i & 1
+        
+        self._ioctl(self.fd, GPIO_GET_LINEHANDLE_IOCTL, request)
+        
+        return LineHandle(self._ioctl, request.fd, offsets, direction, request.default_values)
+    
+    def request_events(self, offset, edge=Both, pull=None, active_low=False, label="quick2wire"):
+        """Requests edge events from a line of the chip.
+        
+        Arguments:
+        offset     -- the offset of the line on the chip.
+        edge       -- which edges to report: Rising, Falling or Both.
+        pull       -- (optional) PullUp or PullDown.
+        active_low -- (optional) if True, the value of the line is
+                      inverted.
+        label      -- (optional) the consumer label of the line.
+        
+        Raises:
+        OSError    -- the kernel refused the request.
+        """
+        request = gpioevent_request()
+        request.lineoffset = offset
+        request.handleflags = (GPIOHANDLE_REQUEST_INPUT
+                               |_pull_flags[pull]
+                               |(active_low and GPIOHANDLE_REQUEST_ACTIVE_LOW))
+        request.eventflags = _edge_flags[edge]
+        request.consumer_label = label.encode()
+        
+        self._ioctl(self.fd, GPIO_GET_LINEEVENT_IOCTL, request)
+        
+        return LineEvents(self._ioctl, request.fd, offset)
+
+
+class LineHandle(PinBankAPI, SelfClosing):
+    """A group of lines requested together from a GPIOChip.
+    
+    The values of all the lines are read or written with a single
+    ioctl.  Bit n of the bit-masks passed to and returned from read()
+    and write() is the value of the n'th line of the handle.
+    """
+    
+    single_read = True
+    
+    def __init__(self, ioctl, fd, offsets, direction, values):
+        """Called by GPIOChip.  Not used by application code."""
+        self._ioctl = ioctl
+        self.fd = fd
+        self._offsets = offsets
+        self._direction = direction
+        self._read_data = gpiohandle_data()
+        self._write_data = gpiohandle_data()
+        self._write_data.values[:len(offsets)] = values[:len(offsets)]
+        self._pins = tuple(LinePin(self, i) for i in range(len(offsets)))
+    
+    @property
+    def offsets(self):
+        """The offsets of the lines on the chip."""
+        return self._offsets
+    
+    @property
+    def direction(self):
+        """The direction of the lines: In or Out."""
+        return self._direction
+    
+    def __len__(self):
+        """The number of lines in the handle."""
+        return len(self._offsets)
+    
+    def pin(self, n):
+        """Returns a Pin that controls the n'th line of the handle."""
+        return self._pins[n]
+    
+    __getitem__ = pin
+    
+    def fileno(self):
+        """Returns the handle's file descriptor."""
+        return self.fd
+    
+    def close(self):
+        """Releases the lines."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+    
+    @property
+    def closed(self):
+        return self.fd is None
+    
+    def read(self):
+        """Returns the values of all the lines as an integer bit-mask.
+        
+        Raises:
+        IOError -- the handle is closed or the values could not be read.
+        """
+        self._check_open()
+        self._ioctl(self.fd, GPIOHANDLE_GET_LINE_VALUES_IOCTL, self._read_data)
+        
+        values = 0
+        read_values = self._read_data.values
+        for i in range(len(self._offsets)):
+            if read_values[i]:
+                values |= 1 << i
+        return values
+    
+    def write(self, mask, values):
+        """Sets the values of the lines selected by mask with a single ioctl.
+        
+        Lines not selected by the mask keep the last value written to
+        them.
+        
+        Raises:
+        IOError    -- the handle is closed or the values could not be
+                      written.
+        ValueError -- the lines are not output lines.
+        """
+        self._check_open()
+        if self._direction != Out:
+            raise ValueError("not an output line handle")
+        
+        write_values = self._write_data.values
+        for i in range(len(self._offsets)):
+            bit = 1 << i
+            if mask & bit:
+                write_values[i] = 1 if values & bit else 0
+        
+        self._ioctl(self.fd, GPIOHANDLE_SET_LINE_VALUES_IOCTL, self._write_data)
+    
+    def _check_open(self):
+        if self.fd is None:
+            raise IOError(str(self) + " is closed")
+    
+    def __str__(self):
+        return "LineHandle(" + ", ".join(str(o) for o in self._offsets) + ")"
+
+
+class LinePin(PinAPI):
+    """A single line of a LineHandle, with the same interface as the quick2wire.gpio Pins.
+    
+    The line is requested and released by its LineHandle, so opening
+    and closing a LinePin has no effect.
+    """
+    
+    def __init__(self, handle, index):
+        """Called by the LineHandle.  Not used by application code."""
+        super(LinePin,self).__init__(handle, index)
+    
+    @property
+    def direction(self):
+        return self.bank.direction
+    
+    def get(self):
+        return (self.bank.read() >> self.index) & 1
+    
+    def set(self, new_value):
+        self.bank.write(1 << self.index, (1 if new_value else 0) << self.index)
+    
+    def open(self):
+        pass
+    
+    def close(self):
+        pass
+    
+    @property
+    def closed(self):
+        return self.bank.closed
+    
+    def __str__(self):
+        return "LinePin(" + str(self.bank.offsets[self.index]) + ")"
+
+
+class LineEvents(SelfClosing):
+    """The edge events of a single line, requested from a GPIOChip.
+    
+    A LineEvents object can be added to a Selector, which reports
+    input when there are events to be read.  Each event is read as a
+    (timestamp, value) pair: the time, in nanoseconds, at which the
+    kernel recorded the edge, and the value of the line after the
+    edge.
+    """
+    
+    def __init__(self, ioctl, fd, offset):
+        """Called by GPIOChip.  Not used by application code."""
+        self._ioctl = ioctl
+        self.fd = fd
+        self._offset = offset
+        self._event = gpioevent_data()
+        self._data = gpiohandle_data()
+    
+    @property
+    def offset(self):
+        """The offset of the line on the chip."""
+        return self._offset
+    
+    def fileno(self):
+        """Returns the file descriptor from which events are read."""
+        return self.fd
+    
+    def close(self):
+        """Stops receiving events and releases the line."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+    
+    def get(self):
+        """Returns the current value of the line."""
+        self._ioctl(self.fd, GPIOHANDLE_GET_LINE_VALUES_IOCTL, self._data)
+        return self._data.values[0]
+    
+    value = property(get)
+    
+    def read_event(self):
+        """Reads the next event, blocking until one occurs.
+        
+        Returns: a (timestamp, value) pair.
+        """
+        os.readv(self.fd, [self._event])
+        return self._event.timestamp, _event_value(self._event.id)
+    
+    def read_events(self, max_count=16):
+        """Reads up to max_count events with a single read, blocking until at least one occurs.
+        
+        Returns: a list of (timestamp, value) pairs.
+        """
+        records = os.read(self.fd, _event_record.size*max_count)
+        return [(timestamp, _event_value(id)) for timestamp, id in _event_record.iter_unpack(records)]
+
+
+def _event_value(event_id):
+    return 1 if event_id == GPIOEVENT_EVENT_RISING_EDGE else 0
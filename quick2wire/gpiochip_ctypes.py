@@ -0,0 +1,126 @@
+# Warning: not part of the published Quick2Wire API.
+#
+# Converted from <linux/gpio.h>
+# Version 1 of the GPIO character device ABI
+
+from ctypes import c_int, c_uint8, c_uint32, c_uint64, c_char, Structure
+from quick2wire.asm_generic_ioctl import _IOR, _IOWR
+
+
+GPIOHANDLES_MAX = 64
+
+
+# /usr/include/linux/gpio.h
+class gpiochip_info(Structure):
+    """<linux/gpio.h> struct gpiochip_info"""
+    
+    _fields_ = [
+        ('name', c_char*32),
+        ('label', c_char*32),
+        ('lines', c_uint32)]
+    
+    __slots__ = [name for name,type in _fields_]
+
+
+# gpioline_info flags
+GPIOLINE_FLAG_KERNEL		= 1 << 0
+GPIOLINE_FLAG_IS_OUT		= 1 << 1
+GPIOLINE_FLAG_ACTIVE_LOW	= 1 << 2
+GPIOLINE_FLAG_OPEN_DRAIN	= 1 << 3
+GPIOLINE_FLAG_OPEN_SOURCE	= 1 << 4
+
+
+# /usr/include/linux/gpio.h
+class gpioline_info(Structure):
+    """<linux/gpio.h> struct gpioline_info"""
+    
+    _fields_ = [
+        ('line_offset', c_uint32),
+        ('flags', c_uint32),
+        ('name', c_char*32),
+        ('consumer', c_char*32)]
+    
+    __slots__ = [name for name,type in _fields_]
+
+
+# gpiohandle_request flags
+GPIOHANDLE_REQUEST_INPUT	= 1 << 0
+GPIOHANDLE_REQUEST_OUTPUT	= 1 << 1
+GPIOHANDLE_REQUEST_ACTIVE_LOW	= 1 << 2
+GPIOHANDLE_REQUEST_OPEN_DRAIN	= 1 << 3
+GPIOHANDLE_REQUEST_OPEN_SOURCE	= 1 << 4
+GPIOHANDLE_REQUEST_BIAS_PULL_UP	= 1 << 5
+GPIOHANDLE_REQUEST_BIAS_PULL_DOWN = 1 << 6
+GPIOHANDLE_REQUEST_BIAS_DISABLE	= 1 << 7
+
+
+# /usr/include/linux/gpio.h
+class gpiohandle_request(Structure):
+    """<linux/gpio.h> struct gpiohandle_request"""
+    
+    _fields_ = [
+        ('lineoffsets', c_uint32*GPIOHANDLES_MAX),
+        ('flags', c_uint32),
+        ('default_values', c_uint8*GPIOHANDLES_MAX),
+        ('consumer_label', c_char*32),
+        ('lines', c_uint32),
+        ('fd', c_int)]
+    
+    __slots__ = [name for name,type in _fields_]
+
+
+# /usr/include/linux/gpio.h
+class gpiohandle_data(Structure):
+    """<linux/gpio.h> struct gpiohandle_data"""
+    
+    _fields_ = [
+        ('values', c_uint8*GPIOHANDLES_MAX)]
+    
+    __slots__ = [name for name,type in _fields_]
+
+
+# gpioevent_request eventflags
+GPIOEVENT_REQUEST_RISING_EDGE	= 1 << 0
+GPIOEVENT_REQUEST_FALLING_EDGE	= 1 << 1
+GPIOEVENT_REQUEST_BOTH_EDGES	= GPIOEVENT_REQUEST_RISING_EDGE|GPIOEVENT_REQUEST_FALLING_EDGE
+
+
+# /usr/include/linux/gpio.h
+class gpioevent_request(Structure):
+    """<linux/gpio.h> struct gpioevent_request"""
+    
+    _fields_ = [
+        ('lineoffset', c_uint32),
+        ('handleflags', c_uint32),
+        ('eventflags', c_uint32),
+        ('consumer_label', c_char*32),
+        ('fd', c_int)]
+    
+    __slots__ = [name for name,type in _fields_]
+
+
+# gpioevent_data ids
+GPIOEVENT_EVENT_RISING_EDGE	= 0x01
+GPIOEVENT_EVENT_FALLING_EDGE	= 0x02
+
+
+# /usr/include/linux/gpio.h
+class gpioevent_data(Structure):
+    """<linux/gpio.h> struct gpioevent_data"""
+    
+    _fields_ = [
+        ('timestamp', c_uint64),
+        ('id', c_uint32)]
+    
+    __slots__ = [name for name,type in _fields_]
+
+
+# ioctls
+
+GPIO_GET_CHIPINFO_IOCTL			= _IOR(0xB4, 0x01, gpiochip_info)
+GPIO_GET_LINEINFO_IOCTL			= _IOWR(0xB4, 0x02, gpioline_info)
+GPIO_GET_LINEHANDLE_IOCTL		= _IOWR(0xB4, 0x03, gpiohandle_request)
+GPIO_GET_LINEEVENT_IOCTL		= _IOWR(0xB4, 0x04, gpioevent_request)
+
+GPIOHANDLE_GET_LINE_VALUES_IOCTL	= _IOWR(0xB4, 0x08, gpiohandle_data)
+GPIOHANDLE_SET_LINE_VALUES_IOCTL	= _IOWR(0xB4, 0x09, gpiohandle_data)
@@ -0,0 +1,329 @@
+"""Fast access to the Raspberry Pi's GPIO pins through the memory-mapped GPIO registers.
+
+Pins of a MemoryMappedPinBank have the same interface as those of a
+quick2wire.gpio.PinBank, but read and write the SoC's GPIO registers
+directly, through the /dev/gpiomem device, instead of going through
+the sysfs files.  Getting or setting the value of a pin is a single
+memory access rather than several system calls.
+
+For example:
+
+    from quick2wire.gpio import pins, Out
+    from quick2wire.gpiomem import memory_mapped
+    
+    fast_pins = memory_mapped(pins)
+    
+    with fast_pins.pin(0, direction=Out) as pin:
+        pin.value = 1
+
+Memory-mapped pins cannot raise interrupts or configure their pull-up
+and pull-down resistors.  Use the sysfs pins of quick2wire.gpio for
+that.
+"""
+
+import mmap
+import os
+from quick2wire.gpio import PinAPI, PinBankAPI, In, Out, _check_mask_open
+
+
+# Register offsets, in bytes, from the start of the BCM2835 GPIO block
+
+GPFSEL0 = 0x00  # Function select, 3 bits per pin, 10 pins per register
+GPSET0 = 0x1C   # Output set, 1 bit per pin, 32 pins per register
+GPCLR0 = 0x28   # Output clear, 1 bit per pin, 32 pins per register
+GPLEV0 = 0x34   # Pin level, 1 bit per pin, 32 pins per register
+
+_FSEL_MASK = 0b111
+_FSEL_INPUT = 0b000
+_FSEL_OUTPUT = 0b001
+
+_BLOCK_SIZE = 4096
+
+_functions = {In: _FSEL_INPUT, Out: _FSEL_OUTPUT}
+
+
+def _word(offset, pin=0):
+    return (offset >> 2) + (pin >> 5)
+
+def _bit(pin):
+    return 1 << (pin & 31)
+
+
+class GPIORegisters(object):
+    """The GPIO registers of the SoC, mapped into memory from a device file.
+    
+    Registers are addressed by their offset in bytes from the start of
+    the GPIO register block.
+    """
+    
+    def __init__(self, path="/dev/gpiomem"):
+        """Creates a GPIORegisters object.  The file is not mapped until open() is called.
+        
+        Parameters:
+        path -- (optional) the file to map. (default = /dev/gpiomem)
+        """
+        self._path = path
+        self._mmap = None
+        self.words = None
+    
+    @property
+    def path(self):
+        return self._path
+    
+    def open(self):
+        """Maps the register block into memory."""
+        fd = os.open(self._path, os.O_RDWR|os.O_SYNC)
+        try:
+            self._mmap = mmap.mmap(fd, _BLOCK_SIZE)
+        finally:
+            os.close(fd)
+        self.words = memoryview(self._mmap).cast("I")
+    
+    def close(self):
+        """Unmaps the register block."""
+        if self._mmap is not None:
+            self.words.release()
+            self.words = None
+            self._mmap.close()
+            self._mmap = None
+    
+    @property
+    def closed(self):
+        return self._mmap is None
+    
+    def __enter__(self):
+        self.open()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def read(self, offset):
+        """Returns the 32-bit value of the register at offset."""
+        return self.words[offset >> 2]
+    
+    def write(self, offset, value):
+        """Writes a 32-bit value to the register at offset."""
+        self.words[offset >> 2] = value
+    
+    def function(self, pin):
+        """Returns the 3-bit function selected for a pin."""
+        shift = (pin % 10) * 3
+        return (self.words[_word(GPFSEL0) + pin // 10] >> shift) & _FSEL_MASK
+    
+    def select_function(self, pin, function):
+        """Selects the function of a pin."""
+        i = _word(GPFSEL0) + pin // 10
+        shift = (pin % 10) * 3
+        self.words[i] = (self.words[i] & ~(_FSEL_MASK << shift)) | (function << shift)
+
+
+class MemoryMappedPin(PinAPI):
+    """Controls a GPIO pin through the memory-mapped GPIO registers."""
+    
+    def __init__(self, bank, index, soc_pin_number, direction=In, interrupt=None, pull=None):
+        """Called by the MemoryMappedPinBank.  Not used by application code.
+        
+        Raises:
+        ValueError -- interrupt or pull was given, which memory-mapped
+                      pins do not support.
+        """
+        if interrupt is not None:
+            raise ValueError("memory-mapped pins cannot raise interrupts")
+        if pull is not None:
+            raise ValueError("memory-mapped pins cannot set their pull")
+        
+        super(MemoryMappedPin,self).__init__(bank, index)
+        self._soc_pin_number = soc_pin_number
+        self._direction = direction
+        self._words = None
+        self._bit = _bit(soc_pin_number)
+        self._lev = _word(GPLEV0, soc_pin_number)
+        self._set = _word(GPSET0, soc_pin_number)
+        self._clr = _word(GPCLR0, soc_pin_number)
+    
+    @property
+    def soc_pin_number(self):
+        return self._soc_pin_number
+    
+    def open(self):
+        if self.closed:
+            self._words = self.bank._acquire_registers().words
+            self.bank._registers.select_function(self._soc_pin_number, _functions[self._direction])
+            self.bank._open_pins[self.index] = self
+    
+    def close(self):
+        if not self.closed:
+            if self._direction == Out:
+                self.set(0)
+            self.bank._registers.select_function(self._soc_pin_number, _FSEL_INPUT)
+            self._words = None
+            del self.bank._open_pins[self.index]
+            self.bank._release_registers()
+    
+    @property
+    def closed(self):
+        """Returns if this pin is closed"""
+        return self._words is None
+    
+    def get(self):
+        """The current value of the pin: 1 if the pin is high or 0 if the pin is low.
+        
+        Raises:
+        IOError -- the pin is closed
+        """
+        if self._words is None:
+            raise IOError(str(self) + " is closed")
+        return 1 if self._words[self._lev] & self._bit else 0
+    
+    def set(self, new_value):
+        """Sets the value of the pin: 1 to drive the pin high or 0 to drive it low.
+        
+        Raises:
+        IOError    -- the pin is closed
+        ValueError -- the pin is not an output pin
+        """
+        if self._words is None:
+            raise IOError(str(self) + " is closed")
+        if self._direction != Out:
+            raise ValueError("not an output pin")
+        self._words[self._set if new_value else self._clr] = self._bit
+    
+    @property
+    def direction(self):
+        """The direction of the pin: either In or Out.
+        
+        The value of the pin can only be set if its direction is Out.
+        """
+        return self._direction
+    
+    @direction.setter
+    def direction(self, new_value):
+        if not self.closed:
+            self.bank._registers.select_function(self._soc_pin_number, _functions[new_value])
+        self._direction = new_value
+    
+    @property
+    def interrupt(self):
+        return None
+    
+    @property
+    def pull(self):
+        return None
+    
+    def __repr__(self):
+        return self.__module__ + "." + str(self)
+    
+    def __str__(self):
+        return "{type}({index})".format(
+            type=self.__class__.__name__,
+            index=self.index)
+
+
+class MemoryMappedPinBank(PinBankAPI):
+    """A bank of GPIO pins controlled through the memory-mapped GPIO registers.
+    
+    The registers are mapped when the first pin of the bank is opened
+    and unmapped when the last pin is closed.
+    """
+    
+    single_read = True
+    
+    def __init__(self, index_to_soc_fn, count=None, path="/dev/gpiomem"):
+        """Creates a MemoryMappedPinBank.
+        
+        Parameters:
+        index_to_soc_fn -- maps pin indices to SoC pin numbers.
+        count           -- (optional) the number of pins in the bank.
+        path            -- (optional) the file from which the GPIO
+                           registers are mapped. (default = /dev/gpiomem)
+        """
+        super(MemoryMappedPinBank,self).__init__()
+        self._index_to_soc = index_to_soc_fn
+        self._count = count
+        self._registers = GPIORegisters(path)
+        self._open_count = 0
+        self._open_pins = {}
+    
+    def pin(self, index, *args, **kwargs):
+        return MemoryMappedPin(self, index, self._index_to_soc(index), *args, **kwargs)
+    
+    @property
+    def has_len(self):
+        return self._count is not None
+    
+    def __len__(self):
+        if self._count is not None:
+            return self._count
+        else:
+            raise TypeError(self.__class__.__name__ + " has no len")
+    
+    def read(self):
+        """Returns the values of the bank's open pins as an integer bit-mask.
+        
+        Bit n of the result is the value of pin n of the bank.  Bits of
+        pins that are not open are zero.  The level registers are read
+        once, so the values are sampled at the same instant.
+        """
+        if not self._open_pins:
+            return 0
+        
+        words = self._registers.words
+        levels = (words[_word(GPLEV0)], words[_word(GPLEV0)+1])
+        
+        values = 0
+        for index, pin in self._open_pins.items():
+            if levels[pin._soc_pin_number >> 5] & pin._bit:
+                values |= 1 << index
+        return values
+    
+    def write(self, mask, values):
+        """Sets the values of many output pins of the bank.
+        
+        Bit n of mask selects whether pin n of the bank is written and
+        bit n of values is the new value of pin n.  All the pins that
+        are set change with a single write to the set registers, and all
+        those that are cleared change with a single write to the clear
+        registers.
+        
+        Raises:
+        IOError    -- a pin selected by the mask is not open.
+        ValueError -- a pin selected by the mask is not an output pin.
+        """
+        _check_mask_open(self, mask)
+        
+        set_words = [0, 0]
+        clear_words = [0, 0]
+        for index, pin in self._open_pins.items():
+            bit = 1 << index
+            if mask & bit:
+                if pin._direction != Out:
+                    raise ValueError(str(pin) + " is not an output pin")
+                if values & bit:
+                    set_words[pin._soc_pin_number >> 5] |= pin._bit
+                else:
+                    clear_words[pin._soc_pin_number >> 5] |= pin._bit
+        
+        words = self._registers.words
+        for i in (0, 1):
+            if set_words[i]:
+                words[_word(GPSET0)+i] = set_words[i]
+        for i in (0, 1):
+            if clear_words[i]:
+                words[_word(GPCLR0)+i] = clear_words[i]
+    
+    def _acquire_registers(self):
+        if self._open_count == 0:
+            self._registers.open()
+        self._open_count += 1
+        return self._registers
+    
+    def _release_registers(self):
+        self._open_count -= 1
+        if self._open_count == 0:
+            self._registers.close()
+
+
+def memory_mapped(bank, path="/dev/gpiomem"):
+    """Returns a MemoryMappedPinBank that numbers its pins in the same way as a quick2wire.gpio.PinBank."""
+    return MemoryMappedPinBank(bank._index_to_soc, bank._count, path)
@@ -1,9 +1,30 @@
+from quick2wire.gpio import PinGroup
+from quick2wire.parts.mcp23x17 import immediate_write
+
+
 class AnalogueDisplay():
     def __init__(self, max, *pins):
         self._pins = pins
-        self._pin_levels = [(pins[index], index * max / len(pins)) for index in range(len(pins))]
+        self._group = PinGroup(pins)
+        self._banks = list({id(pin.bank): pin.bank for pin in pins if pin.bank is not None}.values())
+        self._levels = [index * max / len(pins) for index in range(len(pins))]
 
     def display(self, value):
-        for (pin, level) in self._pin_levels:
-            pin.value = 1 if value < level else 0
+        bits = 0
+        for index, level in enumerate(self._levels):
+            if value < level:
+                bits |= 1 << index
+        
+        if all(_writes_immediately(bank) for bank in self._banks):
+            self._group.value = bits
+        else:
+            # Writing to a bank in deferred write mode must wait for 
+            # the application to call the bank's write() method, but
+            # writing through the group would flush the bank immediately
+            for index, pin in enumerate(self._pins):
+                pin.value = (bits >> index) & 1
+            self._group.forget()
+
 
+def _writes_immediately(bank):
+    return getattr(bank, "write_mode", immediate_write) is immediate_write
@@ -0,0 +1,78 @@
+
+from quick2wire.gpio import Out
+from quick2wire.helpers.display import AnalogueDisplay
+from quick2wire.parts.mcp23x17 import PinBanks, Registers, deferred_write, OLATA
+from quick2wire.simulator.gpio import SimulatedGPIO
+
+
+class FakeRegisters(Registers):
+    def __init__(self):
+        self.registers = {}
+        self.writes = []
+    
+    def write_register(self, reg, value):
+        self.writes.append((reg, value))
+        self.registers[reg] = value
+    
+    def read_register(self, reg):
+        return self.registers.get(reg, 0)
+
+
+def test_displays_level_on_pins_of_a_sysfs_bank():
+    with SimulatedGPIO() as gpio:
+        bank = gpio.bank()
+        pins = [bank.pin(i, Out) for i in range(4)]
+        bank.open_all(pins)
+        try:
+            display = AnalogueDisplay(100, *pins)
+            
+            display.display(30)
+            assert [gpio.line(i).value for i in range(4)] == [0, 0, 1, 1]
+            
+            display.display(60)
+            assert [gpio.line(i).value for i in range(4)] == [0, 0, 0, 1]
+        finally:
+            bank.close_all(pins)
+
+
+def test_waits_for_explicit_write_to_a_deferred_mcp23x17_bank():
+    registers = FakeRegisters()
+    chip = PinBanks(registers)
+    chip.reset()
+    bank = chip[0]
+    pins = [bank.pin(i) for i in range(4)]
+    for pin in pins:
+        pin.open()
+        pin.direction = Out
+    
+    bank.write_mode = deferred_write
+    display = AnalogueDisplay(100, *pins)
+    registers.writes = []
+    
+    display.display(30)
+    assert registers.writes == []
+    
+    bank.write()
+    assert registers.writes == [(OLATA, 0b1100)]
+    
+    registers.writes = []
+    display.display(60)
+    bank.write()
+    assert registers.writes == [(OLATA, 0b1000)]
+
+
+def test_writes_an_immediate_mcp23x17_bank_once_per_display():
+    registers = FakeRegisters()
+    chip = PinBanks(registers)
+    chip.reset()
+    bank = chip[0]
+    pins = [bank.pin(i) for i in range(4)]
+    for pin in pins:
+        pin.open()
+        pin.direction = Out
+    
+    display = AnalogueDisplay(100, *pins)
+    registers.writes = []
+    
+    display.display(30)
+    assert registers.writes == [(OLATA, 0b1100)]
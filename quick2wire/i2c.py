@@ -4,13 +4,24 @@ from contextlib import closing
 import posix
 from fcntl import ioctl
 from quick2wire.i2c_ctypes import *
-from ctypes import create_string_buffer, sizeof, c_int, byref, pointer, addressof, string_at
+from ctypes import create_string_buffer, sizeof, c_int, c_ulong, c_char, Array, byref, pointer, addressof, string_at
 from quick2wire.board_revision import revision
+from quick2wire.buslock import BusLock
+from quick2wire.i2c_retry import ErrorCounters
 
 assert sys.version_info.major >= 3, __name__ + " is only supported on Python 3"
 
 
-default_bus = 1 if revision() > 1 else 0
+def _default_bus():
+    return 1 if revision() > 1 else 0
+
+def __getattr__(name):
+    # The default bus depends on the board revision, so is determined
+    # when first used rather than when the module is imported
+    if name == "default_bus":
+        return _default_bus()
+    
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
 
 class I2CMaster(object):
     """Performs I2C I/O transactions on an I2C bus.
@@ -20,6 +31,26 @@ class I2CMaster(object):
     created with the reading, reading_into, writing and writing_bytes
     functions defined in the quick2wire.i2c module.
     
+    Single register accesses can also be performed with the SMBus
+    methods, such as read_byte_data and write_byte_data, which use
+    the kernel's I2C_SMBUS ioctl and a preallocated data buffer rather
+    than building I2C messages.  The SMBus methods address the device
+    with the I2C_SLAVE ioctl, which fails if a kernel driver has
+    claimed the address.
+    
+    An I2CMaster is not thread-safe unless it is created with
+    thread_safe=True, in which case every transaction holds a lock
+    for the duration of its ioctl and the time threads spend waiting
+    for and holding the bus is recorded for each device address.
+    Compiled Transactions and Batches must still only be used by one
+    thread at a time, because they reuse their buffers.
+    
+    An I2CMaster created with a quick2wire.i2c_retry.RetryPolicy
+    retries transactions that fail with transient errors.  Whether or
+    not it has a retry policy, an I2CMaster counts the errors of the
+    transactions with each device address, which are returned by its
+    errors method.
+    
     An I2CMaster acts as a context manager, allowing it to be used in a
     with statement.  The I2CMaster's file descriptor is closed at
     the end of the with statement and the instance cannot be used for
@@ -34,7 +65,7 @@ class I2CMaster(object):
                 writing(0x20, bytes([0x01, 0xFF])))
     """
     
-    def __init__(self, n=default_bus, extra_open_flags=0):
+    def __init__(self, n=None, extra_open_flags=0, thread_safe=False, fair=False, retry_policy=None):
         """Opens the bus device.
         
         Arguments:
@@ -44,8 +75,43 @@ class I2CMaster(object):
         extra_open_flags -- extra flags passed to posix.open when 
                             opening the I2C bus device file (default 0; 
                             e.g. no extra flags).
+        thread_safe      -- if True, transactions from multiple threads
+                            are serialised by a lock that records
+                            contention statistics (default False).
+        fair             -- if True, a thread-safe I2CMaster grants the
+                            bus to threads in the order in which they
+                            asked for it (default False).
+        retry_policy     -- a quick2wire.i2c_retry.RetryPolicy that
+                            decides which failed transactions are
+                            retried (default None; e.g. errors are
+                            raised without retrying).
         """
+        if fair and not thread_safe:
+            raise ValueError("only a thread-safe I2CMaster can be fair")
+        
+        if n is None:
+            n = _default_bus()
         self.fd = posix.open("/dev/i2c-%i"%n, posix.O_RDWR|extra_open_flags)
+        self._bus_lock = BusLock(fair) if thread_safe else None
+        self._retry_policy = retry_policy
+        self._errors = ErrorCounters(self._bus_lock.statistics_lock if thread_safe else None)
+        self._slave_address = None
+        self._smbus_data = i2c_smbus_data()
+        self._smbus_arg = i2c_smbus_ioctl_data(data=pointer(self._smbus_data))
+        
+        if retry_policy is not None:
+            try:
+                self._configure_adapter(retry_policy)
+            except BaseException:
+                posix.close(self.fd)
+                raise
+    
+    def _configure_adapter(self, policy):
+        if policy.kernel_retries is not None:
+            ioctl(self.fd, I2C_RETRIES, policy.kernel_retries)
+        if policy.kernel_timeout is not None:
+            # The kernel's timeout is in units of 10 ms
+            ioctl(self.fd, I2C_TIMEOUT, max(1, round(policy.kernel_timeout*100)))
     
     def __enter__(self):
         return self
@@ -59,13 +125,17 @@ class I2CMaster(object):
         """
         posix.close(self.fd)
     
-    def transaction(self, *msgs):
+    def transaction(self, *msgs, copy=True):
         """
         Perform an I2C I/O transaction.
 
         Arguments:
         *msgs -- I2C messages created by one of the reading, reading_into,
                  writing or writing_bytes functions.
+        copy  -- if True (the default), the data read is copied into
+                 new bytes objects.  If False, the data is returned as
+                 memoryviews of the buffers the messages read into,
+                 without copying it.
         
         Returns: a list of byte sequences, one for each read operation 
                  performed.
@@ -75,18 +145,434 @@ class I2CMaster(object):
         msg_array = (i2c_msg*msg_count)(*msgs)
         ioctl_arg = i2c_rdwr_ioctl_data(msgs=msg_array, nmsgs=msg_count)
         
-        ioctl(self.fd, I2C_RDWR, ioctl_arg)
+        self._rdwr(msgs[0].addr if msgs else None, ioctl_arg)
+        
+        if copy:
+            return [i2c_msg_to_bytes(m) for m in msgs if (m.flags & I2C_M_RD)]
+        else:
+            return [i2c_msg_to_memoryview(m) for m in msgs if (m.flags & I2C_M_RD)]
+    
+    def functionality(self):
+        """
+        Returns the bit-set of I2C_FUNC_* flags that describe what
+        the bus adapter supports.
+        """
+        funcs = c_ulong()
+        ioctl(self.fd, I2C_FUNCS, funcs)
+        return funcs.value
+    
+    def read_byte(self, addr):
+        """
+        Perform an SMBus receive byte transaction.
+        
+        Returns: the byte received from the device.
+        """
+        return self._smbus(addr, I2C_SMBUS_READ, 0, I2C_SMBUS_BYTE)
+    
+    def write_byte(self, addr, value):
+        """
+        Perform an SMBus send byte transaction.
+        """
+        self._smbus(addr, I2C_SMBUS_WRITE, value, I2C_SMBUS_BYTE)
+    
+    def write_quick(self, addr, bit=0):
+        """
+        Perform an SMBus quick command, which transfers a single bit in
+        place of the read/write bit of the address.
+        """
+        self._smbus(addr, bit, 0, I2C_SMBUS_QUICK)
+    
+    def read_byte_data(self, addr, register):
+        """
+        Read an 8-bit register with an SMBus read byte transaction.
+        
+        Returns: the value of the register.
+        """
+        return self._smbus(addr, I2C_SMBUS_READ, register, I2C_SMBUS_BYTE_DATA)
+    
+    def write_byte_data(self, addr, register, value):
+        """
+        Write an 8-bit register with an SMBus write byte transaction.
+        """
+        self._smbus(addr, I2C_SMBUS_WRITE, register, I2C_SMBUS_BYTE_DATA, value)
+    
+    def read_word_data(self, addr, register):
+        """
+        Read a 16-bit register with an SMBus read word transaction.
+        
+        Returns: the value of the register.  As specified by SMBus,
+                 the first byte received is the low byte.
+        """
+        return self._smbus(addr, I2C_SMBUS_READ, register, I2C_SMBUS_WORD_DATA)
+    
+    def write_word_data(self, addr, register, value):
+        """
+        Write a 16-bit register with an SMBus write word transaction.
+        """
+        self._smbus(addr, I2C_SMBUS_WRITE, register, I2C_SMBUS_WORD_DATA, value)
+    
+    def read_i2c_block_data(self, addr, register, n_bytes):
+        """
+        Write a register address and read up to I2C_SMBUS_BLOCK_MAX
+        bytes, as supported by most devices with auto-incrementing
+        register addresses.
+        
+        Returns: the bytes read.
+        """
+        if not 0 < n_bytes <= I2C_SMBUS_BLOCK_MAX:
+            raise ValueError("can read from 1 to %i bytes, not %i" % (I2C_SMBUS_BLOCK_MAX, n_bytes))
+        
+        return self._smbus(addr, I2C_SMBUS_READ, register, I2C_SMBUS_I2C_BLOCK_DATA, n_bytes)
+    
+    def _smbus(self, addr, read_write, command, size, value=0):
+        if self._bus_lock is None and self._retry_policy is None:
+            try:
+                return self._smbus_ioctl(addr, read_write, command, size, value)
+            except OSError as e:
+                self._errors.record(addr, e.errno, False)
+                raise
+        
+        return self._perform(addr, self._smbus_ioctl, addr, read_write, command, size, value)
+    
+    def _smbus_ioctl(self, addr, read_write, command, size, value):
+        if addr != self._slave_address:
+            ioctl(self.fd, I2C_SLAVE, addr)
+            self._slave_address = addr
+        
+        data = self._smbus_data
+        if size == I2C_SMBUS_WORD_DATA:
+            data.word = value
+        elif size == I2C_SMBUS_I2C_BLOCK_DATA:
+            data.block[0] = value
+        else:
+            data.byte = value
+        
+        arg = self._smbus_arg
+        arg.read_write = read_write
+        arg.command = command
+        arg.size = size
+        ioctl(self.fd, I2C_SMBUS, arg)
+        
+        if read_write != I2C_SMBUS_READ:
+            return None
+        elif size == I2C_SMBUS_WORD_DATA:
+            return data.word
+        elif size == I2C_SMBUS_I2C_BLOCK_DATA:
+            return bytes(data.block[1:data.block[0]+1])
+        else:
+            return data.byte
+    
+    def _rdwr(self, addr, ioctl_arg):
+        if self._bus_lock is None and self._retry_policy is None:
+            try:
+                ioctl(self.fd, I2C_RDWR, ioctl_arg)
+            except OSError as e:
+                self._errors.record(addr, e.errno, False)
+                raise
+        else:
+            self._perform(addr, ioctl, self.fd, I2C_RDWR, ioctl_arg)
+    
+    def _perform(self, addr, fn, *args):
+        # Performs fn(*args), holding the bus lock if there is one and
+        # retrying as the retry policy allows.  Errors are counted while
+        # the lock is held.  The lock is not held while waiting to retry.
+        lock = self._bus_lock
+        policy = self._retry_policy
+        attempt = 0
+        first_failure = None
+        
+        while True:
+            if lock is not None:
+                lock.acquire(addr)
+            try:
+                return fn(*args)
+            except OSError as e:
+                if policy is None:
+                    delay = None
+                else:
+                    if first_failure is None:
+                        first_failure = policy.clock()
+                    delay = policy.delay(e.errno, attempt, first_failure)
+                
+                self._errors.record(addr, e.errno, delay is not None)
+                if delay is None:
+                    raise
+            finally:
+                if lock is not None:
+                    lock.release()
+            
+            policy.sleep(delay)
+            attempt += 1
+    
+    def errors(self):
+        """
+        Returns the errors of the transactions performed so far, as a
+        dict that maps each device address to a
+        quick2wire.i2c_retry.AddressErrors, which counts the errors
+        by errno and the number of errors that were retried and that
+        were raised.
+        
+        A transaction is counted under the address of its first
+        message.
+        """
+        return self._errors.snapshot()
+    
+    def reset_errors(self):
+        """
+        Discards the error counts recorded so far.
+        """
+        self._errors.reset()
+    
+    def statistics(self):
+        """
+        Returns the contention statistics of a thread-safe I2CMaster,
+        as a dict that maps each device address to a
+        quick2wire.buslock.AddressStatistics.
         
-        return [i2c_msg_to_bytes(m) for m in msgs if (m.flags & I2C_M_RD)]
+        A transaction is recorded under the address of its first
+        message.
+        """
+        if self._bus_lock is None:
+            raise ValueError("statistics are only recorded by a thread-safe I2CMaster")
+        return self._bus_lock.statistics()
+    
+    def reset_statistics(self):
+        """
+        Discards the contention statistics recorded so far.
+        """
+        if self._bus_lock is not None:
+            self._bus_lock.reset_statistics()
+    
+    def batch(self, max_msgs=I2C_RDWR_IOCTL_MAX_MSGS):
+        """
+        Create a Batch that collects reads from many devices on this bus
+        and performs them with as few ioctls as possible.
+        
+        Arguments:
+        max_msgs -- the maximum number of messages per ioctl (default
+                    I2C_RDWR_IOCTL_MAX_MSGS, the kernel's limit).
+        """
+        return Batch(self, max_msgs)
+    
+    def compile(self, *msgs):
+        """
+        Prepare an I2C I/O transaction that can be performed repeatedly.
+        
+        The message array, ioctl argument and data buffers are
+        allocated once, when the transaction is compiled, rather than
+        every time it is performed.
+        
+        Arguments:
+        *msgs -- I2C messages created by one of the reading, reading_into,
+                 writing or writing_bytes functions.
+        
+        Returns: a Transaction that performs the messages on this bus.
+        """
+        return Transaction(self, msgs)
+
+
+class Transaction(object):
+    """An I2C I/O transaction compiled by I2CMaster.compile.
+    
+    Calling the Transaction performs its messages with a single ioctl.
+    The data of each message is held in a bytearray that is allocated
+    when the transaction is compiled.  The data written by the
+    transaction can be changed between calls by modifying the
+    bytearrays of its write messages in place, and the data read by
+    the transaction is returned in the bytearrays of its read
+    messages, which are overwritten by the next call.  Messages
+    created by reading_into are the exception: they read directly
+    into the buffer passed to reading_into, which is returned in place
+    of a bytearray.
+    
+    For example, to read a register of an MCP23017 whose address
+    changes from call to call:
+    
+        read_register = i2c.compile(
+            writing_bytes(0x20, 0x00),
+            reading(0x20, 1))
+        
+        for register in range(0x16):
+            read_register.buffers[0][0] = register
+            value = read_register()[0][0]
+    """
+    
+    def __init__(self, master, msgs):
+        msg_count = len(msgs)
+        
+        self.master = master
+        self.buffers = tuple(_transaction_buffer(m) for m in msgs)
+        self.results = tuple(buf for buf, m in zip(self.buffers, msgs) if m.flags & I2C_M_RD)
+        
+        # The ctypes arrays share the memory of the buffers and must
+        # be kept alive for as long as the messages point to them.
+        self._data = [(c_char*m.len).from_buffer(buf) for buf, m in zip(self.buffers, msgs)]
+        self._msgs = (i2c_msg*msg_count)(*[
+            i2c_msg(addr=m.addr, flags=m.flags, len=m.len, buf=data)
+            for m, data in zip(msgs, self._data)])
+        self._ioctl_arg = i2c_rdwr_ioctl_data(msgs=self._msgs, nmsgs=msg_count)
+        self._addr = msgs[0].addr if msgs else None
+    
+    def __len__(self):
+        return len(self.buffers)
+    
+    def __call__(self):
+        """
+        Perform the transaction.
+        
+        Returns: the bytearrays of the transaction's read messages, in
+                 the order of the messages.  The same bytearrays are
+                 returned by every call.
+        """
+        self.master._rdwr(self._addr, self._ioctl_arg)
+        return self.results
+
 
 
+def _transaction_buffer(m):
+    # Reads into the caller's buffer, of whatever type, but copies the
+    # storage that reading and writing allocate for themselves
+    buf = getattr(m, "buffer", None)
+    if m.flags & I2C_M_RD and buf is not None and not getattr(m, "private", False):
+        return buf
+    else:
+        return bytearray(i2c_msg_to_bytes(m))
+
+
+class Batch(object):
+    """Collects register reads from many devices and performs them
+    with as few I2C_RDWR ioctls as the kernel allows.
+    
+    Each read is added to the batch once.  It returns a bytearray
+    that receives the register's value every time the batch is
+    performed, so the result of each read is routed back to the code
+    that added it.  A callback can also be given, which is called
+    with the bytearray after the read has been performed.
+    
+    For example, to poll the GPIO registers of several MCP23017s:
+    
+        batch = i2c.batch()
+        gpios = [batch.read_register(address, 0x12, 2)
+                 for address in range(0x20, 0x28)]
+        
+        while True:
+            batch()
+            for address, gpio in zip(range(0x20, 0x28), gpios):
+                print(hex(address), gpio[0], gpio[1])
+    
+    The reads are packed, in the order in which they were added, into
+    compiled transactions of at most max_msgs messages.  The messages
+    of each ioctl are performed as one combined I2C transaction, with
+    a repeated start condition between messages and a single stop
+    condition at the end.
+    """
+    
+    def __init__(self, master, max_msgs=I2C_RDWR_IOCTL_MAX_MSGS):
+        if max_msgs < 2:
+            raise ValueError("a batch must allow at least 2 messages per ioctl, not %i" % max_msgs)
+        
+        self.master = master
+        self.max_msgs = max_msgs
+        self._requests = []
+        self._transactions = None
+    
+    def read_register(self, addr, register, n_bytes=1, callback=None):
+        """
+        Add a read of one or more consecutive registers of a device.
+        
+        Arguments:
+        addr     -- the address of the device.
+        register -- the address of the first register to read.
+        n_bytes  -- the number of bytes to read (default 1).
+        callback -- (optional) called with the bytearray every time
+                    the batch has read the registers.
+        
+        Returns: the bytearray into which the registers are read.
+        """
+        buf = bytearray(n_bytes)
+        if callback is None:
+            routed = None
+        else:
+            routed = lambda: callback(buf)
+        
+        self.add(writing_bytes(addr, register), reading_into(addr, buf), callback=routed)
+        return buf
+    
+    def add(self, *msgs, callback=None):
+        """
+        Add a group of messages that are always performed by the same ioctl.
+        
+        Arguments:
+        *msgs    -- I2C messages created by one of the reading,
+                    reading_into, writing or writing_bytes functions.
+                    The data read by messages created by reading_into
+                    is read directly into their buffers.
+        callback -- (optional) called with no arguments every time the
+                    batch has performed the messages.
+        """
+        if len(msgs) > self.max_msgs:
+            raise ValueError("cannot perform %i messages in one ioctl, the maximum is %i" % (len(msgs), self.max_msgs))
+        
+        self._requests.append((msgs, callback))
+        self._transactions = None
+    
+    def __len__(self):
+        return len(self._requests)
+    
+    @property
+    def ioctl_count(self):
+        """The number of ioctls with which the batch is performed."""
+        return len(self._compiled())
+    
+    def __call__(self):
+        """
+        Perform all the messages in the batch and then call the callbacks.
+        
+        If an ioctl fails, the exception is raised without performing
+        the rest of the batch or calling any callbacks.
+        """
+        transactions = self._compiled()
+        
+        for transaction, callbacks in transactions:
+            transaction()
+        
+        for transaction, callbacks in transactions:
+            for callback in callbacks:
+                callback()
+    
+    def _compiled(self):
+        if self._transactions is None:
+            self._transactions = []
+            msgs = []
+            callbacks = []
+            for group, callback in self._requests:
+                if len(msgs) + len(group) > self.max_msgs:
+                    self._transactions.append((self.master.compile(*msgs), callbacks))
+                    msgs = []
+                    callbacks = []
+                msgs.extend(group)
+                if callback is not None:
+                    callbacks.append(callback)
+            if msgs:
+                self._transactions.append((self.master.compile(*msgs), callbacks))
+        
+        return self._transactions
+
 
 def reading(addr, n_bytes):
     """An I2C I/O message that reads n_bytes bytes of data"""
-    return reading_into(addr, create_string_buffer(n_bytes))
+    msg = reading_into(addr, create_string_buffer(n_bytes))
+    msg.private = True
+    return msg
 
 def reading_into(addr, buf):
-    """An I2C I/O message that reads into an existing ctypes string buffer."""
+    """An I2C I/O message that reads into an existing buffer.
+    
+    The buffer can be a ctypes string buffer or any writable,
+    contiguous object that supports the buffer protocol, such as a
+    bytearray, an array.array or a NumPy array.  The message reads as
+    many bytes as the buffer holds, directly into the buffer's memory.
+    """
     return _new_i2c_msg(addr, I2C_M_RD, buf)
 
 def writing_bytes(addr, *bytes):
@@ -105,8 +591,26 @@ def writing(addr, byte_seq):
     return _new_i2c_msg(addr, 0, create_string_buffer(buf, len(buf)))
 
 
+class _i2c_msg(i2c_msg):
+    # Refers to the object that the message reads into or writes from,
+    # so that transaction can return views of it without copying.
+    # The buffer is private if the message allocated it itself.
+    __slots__ = ["buffer", "private"]
+
+
 def _new_i2c_msg(addr, flags, buf):
-    return i2c_msg(addr=addr, flags=flags, len=sizeof(buf), buf=buf)
+    if isinstance(buf, Array):
+        msg = _i2c_msg(addr=addr, flags=flags, len=sizeof(buf), buf=buf)
+    else:
+        c_buf = (c_char*memoryview(buf).nbytes).from_buffer(buf)
+        msg = _i2c_msg(addr=addr, flags=flags, len=sizeof(c_buf), buf=c_buf)
+    
+    msg.buffer = buf
+    return msg
+
+
+def i2c_msg_to_memoryview(m):
+    return memoryview(m.buffer).cast("B")
 
 
 def i2c_msg_to_bytes(m):
@@ -1,9 +1,8 @@
 # Warning: not part of the published Quick2Wire API.
 #
 # Converted from i2c.h and i2c-dev.h
-# I2C only, no SMB definitions
 
-from ctypes import c_int, c_uint16, c_ushort, c_short, c_ubyte, c_char, POINTER, Structure
+from ctypes import c_int, c_uint8, c_uint16, c_uint32, c_ushort, c_short, c_ubyte, c_char, POINTER, Structure, Union
 
 # /usr/include/linux/i2c-dev.h: 38
 class i2c_msg(Structure):
@@ -38,13 +37,76 @@ class i2c_rdwr_ioctl_data(Structure):
 
     __slots__ = [name for name,type in _fields_]
 
+I2C_RDWR_IOCTL_MAX_MSGS	= 42
+
 I2C_FUNC_I2C			= 0x00000001
 I2C_FUNC_10BIT_ADDR		= 0x00000002
 I2C_FUNC_PROTOCOL_MANGLING	= 0x00000004 # I2C_M_NOSTART etc.
+I2C_FUNC_SMBUS_QUICK		= 0x00010000
+I2C_FUNC_SMBUS_READ_BYTE	= 0x00020000
+I2C_FUNC_SMBUS_WRITE_BYTE	= 0x00040000
+I2C_FUNC_SMBUS_READ_BYTE_DATA	= 0x00080000
+I2C_FUNC_SMBUS_WRITE_BYTE_DATA	= 0x00100000
+I2C_FUNC_SMBUS_READ_WORD_DATA	= 0x00200000
+I2C_FUNC_SMBUS_WRITE_WORD_DATA	= 0x00400000
+I2C_FUNC_SMBUS_PROC_CALL	= 0x00800000
+I2C_FUNC_SMBUS_READ_BLOCK_DATA	= 0x01000000
+I2C_FUNC_SMBUS_WRITE_BLOCK_DATA = 0x02000000
+I2C_FUNC_SMBUS_READ_I2C_BLOCK	= 0x04000000 # I2C-like block xfer
+I2C_FUNC_SMBUS_WRITE_I2C_BLOCK	= 0x08000000 # w/ 1-byte reg. addr.
+
+
+# /usr/include/linux/i2c.h: 139
+I2C_SMBUS_BLOCK_MAX	= 32	# As specified in SMBus standard
+
+class i2c_smbus_data(Union):
+    """<linux/i2c.h> union i2c_smbus_data"""
+    
+    _fields_ = [
+        ('byte', c_uint8),
+        ('word', c_uint16),
+        ('block', c_uint8*(I2C_SMBUS_BLOCK_MAX + 2))] # block[0] is used for length
+                                                      # and one more for user-space compatibility
+    
+    __slots__ = [name for name,type in _fields_]
+
+
+# i2c_smbus_xfer read or write markers
+I2C_SMBUS_READ	= 1
+I2C_SMBUS_WRITE	= 0
+
+# SMBus transaction types (size parameter in the above functions)
+# Note: these no longer correspond to the (arbitrary) PIIX4 internal codes!
+I2C_SMBUS_QUICK		    = 0
+I2C_SMBUS_BYTE		    = 1
+I2C_SMBUS_BYTE_DATA	    = 2
+I2C_SMBUS_WORD_DATA	    = 3
+I2C_SMBUS_PROC_CALL	    = 4
+I2C_SMBUS_BLOCK_DATA	    = 5
+I2C_SMBUS_I2C_BLOCK_BROKEN  = 6
+I2C_SMBUS_BLOCK_PROC_CALL   = 7		# SMBus 2.0
+I2C_SMBUS_I2C_BLOCK_DATA    = 8
+
+
+# /usr/include/linux/i2c-dev.h: 144
+class i2c_smbus_ioctl_data(Structure):
+    """<linux/i2c-dev.h> struct i2c_smbus_ioctl_data"""
+    
+    _fields_ = [
+        ('read_write', c_uint8),
+        ('command', c_uint8),
+        ('size', c_uint32),
+        ('data', POINTER(i2c_smbus_data))]
+    
+    __slots__ = [name for name,type in _fields_]
 
 
 # ioctls
 
+I2C_RETRIES	= 0x0701	# number of times a device address should
+				# be polled when not acknowledging 
+I2C_TIMEOUT	= 0x0702	# set timeout in units of 10 ms
+
 I2C_SLAVE	= 0x0703	# Change slave address			
 				# Attn.: Slave address is 7 or 10 bits  
 I2C_SLAVE_FORCE	= 0x0706	# Change slave address			
@@ -54,3 +116,4 @@ I2C_SLAVE_FORCE	= 0x0706	# Change slave address
 I2C_TENBIT	= 0x0704	# 0 for 7 bit addrs, != 0 for 10 bit	
 I2C_FUNCS	= 0x0705	# Get the adapter functionality         
 I2C_RDWR	= 0x0707	# Combined R/W transfer (one stop only) 
+I2C_SMBUS	= 0x0720	# SMBus-level access
@@ -0,0 +1,183 @@
+"""Retrying I2C transactions that fail with transient errors.
+
+A device that is busy, or a bus disturbed by noise or by another
+master, makes a transaction fail with an OSError such as EREMOTEIO
+(the device did not acknowledge), EAGAIN (arbitration was lost) or
+ETIMEDOUT.  An I2CMaster created with a RetryPolicy retries failed
+transactions according to rules that give the number of retries
+allowed for each errno, waiting between attempts for a delay that
+doubles every attempt, up to a maximum, and is randomly shortened so
+that threads retrying together do not stay in step.  No retry is
+started that would end after the policy's deadline, measured from
+the first failure, and errors that have no rule are raised at once.
+
+For example:
+
+    policy = RetryPolicy(retries={errno.EREMOTEIO: 3}, deadline=0.05)
+
+    with I2CMaster(retry_policy=policy) as i2c:
+        ...
+        for address, errors in i2c.errors().items():
+            print(hex(address), errors.errors, errors.retries, errors.failures)
+
+Some retries are cheaper in the kernel than in Python.  The kernel
+retries a transfer that loses arbitration as many times as the
+adapter's I2C_RETRIES setting without returning to user space, and
+gives up on a transfer after the adapter's I2C_TIMEOUT.  A policy
+with kernel_retries or kernel_timeout applies those settings to the
+adapter when the I2CMaster is opened.  The settings apply to every
+user of the bus.
+"""
+
+import errno
+import random
+import time
+from contextlib import nullcontext
+from copy import copy
+
+
+DEFAULT_RETRIES = {errno.EREMOTEIO: 2, errno.EAGAIN: 3, errno.ETIMEDOUT: 1}
+
+
+class RetryPolicy(object):
+    """Decides whether and when to retry a failed I2C transaction."""
+    
+    def __init__(self, retries=None, deadline=0.1, base_delay=0.0005, max_delay=0.01, jitter=0.5,
+                 kernel_retries=None, kernel_timeout=None,
+                 clock=time.monotonic, sleep=time.sleep, random=random.random):
+        """Creates a RetryPolicy.
+        
+        Parameters:
+        retries        -- (optional) a dict that maps an errno to the
+                          number of times a transaction that fails with
+                          that error is retried.  (default =
+                          DEFAULT_RETRIES, without EAGAIN if
+                          kernel_retries is given)
+        deadline       -- (optional) the time, in seconds after the
+                          first failure, by which the retries must
+                          finish. (default = 0.1)
+        base_delay     -- (optional) the delay before the first retry,
+                          in seconds. (default = 0.0005)
+        max_delay      -- (optional) the longest delay between retries,
+                          in seconds. (default = 0.01)
+        jitter         -- (optional) the largest fraction by which each
+                          delay is randomly shortened, from 0 to 1.
+                          (default = 0.5)
+        kernel_retries -- (optional) the number of times the kernel
+                          retries a transfer that loses arbitration.
+                          (default = None, leave the adapter's setting
+                          unchanged)
+        kernel_timeout -- (optional) the time after which the kernel
+                          gives up on a transfer, in seconds, rounded
+                          to the nearest 10 ms. (default = None, leave
+                          the adapter's setting unchanged)
+        clock          -- (optional) returns the current time, in
+                          seconds. (default = time.monotonic)
+        sleep          -- (optional) waits for a time in seconds.
+                          (default = time.sleep)
+        random         -- (optional) returns a random number from 0 to 1.
+                          (default = random.random)
+        """
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be from 0 to 1, not " + repr(jitter))
+        
+        if retries is None:
+            retries = dict(DEFAULT_RETRIES)
+            if kernel_retries is not None:
+                del retries[errno.EAGAIN]
+        
+        self.retries = retries
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.kernel_retries = kernel_retries
+        self.kernel_timeout = kernel_timeout
+        self.clock = clock
+        self.sleep = sleep
+        self._random = random
+    
+    def delay(self, error, attempt, first_failure):
+        """Returns the time to wait before retrying a failed transaction, or None if it must not be retried.
+        
+        Parameters:
+        error         -- the errno of the failure.
+        attempt       -- the number of retries already made.
+        first_failure -- the time, from the policy's clock, at which
+                         the first attempt failed.
+        """
+        if attempt >= self.retries.get(error, 0):
+            return None
+        
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay *= 1 - self.jitter * self._random()
+        
+        if self.clock() + delay - first_failure > self.deadline:
+            return None
+        
+        return delay
+
+
+class AddressErrors(object):
+    """The errors of the transactions with one device address."""
+    
+    __slots__ = ["errors", "retries", "failures"]
+    
+    def __init__(self):
+        self.errors = {}
+        self.retries = 0
+        self.failures = 0
+    
+    def __copy__(self):
+        snapshot = AddressErrors()
+        snapshot.errors = dict(self.errors)
+        snapshot.retries = self.retries
+        snapshot.failures = self.failures
+        return snapshot
+    
+    def __repr__(self):
+        return "AddressErrors(errors=%r, retries=%i, failures=%i)" % (self.errors, self.retries, self.failures)
+
+
+class ErrorCounters(object):
+    """Counts errors, retries and failures per device address."""
+    
+    def __init__(self, lock=None):
+        """Creates an ErrorCounters.
+        
+        Parameters:
+        lock -- (optional) a lock held while the counts are recorded,
+                copied or reset, if they are shared between threads.
+        """
+        self._addresses = {}
+        self._lock = lock if lock is not None else nullcontext()
+    
+    def record(self, addr, error, retried):
+        """Records an error.
+        
+        Parameters:
+        addr    -- the address of the transaction that failed.
+        error   -- the errno of the failure.
+        retried -- True if the transaction is to be retried, False if
+                   the error is raised to the caller.
+        """
+        with self._lock:
+            counters = self._addresses.get(addr)
+            if counters is None:
+                counters = self._addresses[addr] = AddressErrors()
+            
+            counters.errors[error] = counters.errors.get(error, 0) + 1
+            if retried:
+                counters.retries += 1
+            else:
+                counters.failures += 1
+    
+    def snapshot(self):
+        """Returns a dict that maps each address to a copy of its AddressErrors."""
+        with self._lock:
+            return {addr: copy(counters) for addr, counters in self._addresses.items()}
+    
+    def reset(self):
+        """Discards the counts."""
+        with self._lock:
+            self._addresses = {}
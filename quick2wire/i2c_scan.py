@@ -0,0 +1,228 @@
+"""Discovery of the devices attached to the I2C buses.
+
+The scan function probes every address of a bus in the same way as
+the i2cdetect tool: with an SMBus quick write, which transfers no
+data, except at the addresses used by EEPROMs and by devices that
+quick writes are known to upset, which are probed by reading a byte.
+Addresses claimed by a kernel driver are not probed at all and are
+reported as present.
+
+The scan_buses function scans several buses concurrently, one thread
+per bus, and the inventory function persists the results in a JSON
+cache file.  On the next start, the cache of each bus is validated by
+probing only the addresses at which a device was found, and the bus
+is scanned again only if that fails or the bus is not in the cache.
+Devices added to a bus that still has all its cached devices are not
+noticed until the inventory is rescanned.
+
+For example:
+
+    devices = inventory("/var/cache/quick2wire/i2c.json")
+    if 0x20 in devices.get(1, []):
+        chip = MCP23017(I2CMaster(1), 0x20)
+"""
+
+import errno
+import glob
+import json
+import os
+import re
+import stat
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from quick2wire.i2c import I2CMaster
+from quick2wire.i2c_ctypes import I2C_FUNC_SMBUS_QUICK
+
+
+# The addresses that i2cdetect scans by default, excluding the
+# reserved addresses at each end of the 7-bit address space.
+DEFAULT_ADDRESSES = range(0x03, 0x78)
+
+_CACHE_VERSION = 1
+
+# The errors with which an adapter reports that nothing acknowledged
+# the address.
+_ABSENT_ERRORS = (errno.ENXIO, errno.EREMOTEIO, errno.EIO, errno.ETIMEDOUT)
+
+
+def _probe_by_reading(addr):
+    # EEPROMs can be write-protected by a quick write, and some devices
+    # at 0x30-0x37 latch up when sent one.
+    return 0x30 <= addr <= 0x37 or 0x50 <= addr <= 0x5F
+
+
+def probe(master, addr, quick_write=True):
+    """Checks whether a device acknowledges an address.
+    
+    Parameters:
+    master      -- the I2CMaster of the bus.
+    addr        -- the address to probe.
+    quick_write -- (optional) if False, the adapter does not support
+                   SMBus quick writes, and the address is probed by
+                   reading a byte from it. (default = True)
+    
+    Returns: True if a device acknowledged the address or a kernel
+             driver has claimed it, False otherwise.
+    """
+    try:
+        if quick_write and not _probe_by_reading(addr):
+            master.write_quick(addr)
+        else:
+            master.read_byte(addr)
+        return True
+    except OSError as e:
+        if e.errno == errno.EBUSY:
+            return True
+        elif e.errno in _ABSENT_ERRORS:
+            return False
+        else:
+            raise
+
+
+def scan(master, addresses=DEFAULT_ADDRESSES):
+    """Probes addresses of a bus.
+    
+    Parameters:
+    master    -- the I2CMaster of the bus.
+    addresses -- (optional) the addresses to probe.
+                 (default = DEFAULT_ADDRESSES)
+    
+    Returns: a sorted list of the addresses at which devices are present.
+    """
+    quick_write = bool(master.functionality() & I2C_FUNC_SMBUS_QUICK)
+    return sorted(addr for addr in addresses if probe(master, addr, quick_write))
+
+
+def bus_numbers(dev="/dev"):
+    """Returns the sorted numbers of the I2C bus devices, such as i2c-1, in the directory dev."""
+    numbers = []
+    for path in glob.glob(os.path.join(dev, "i2c-*")):
+        match = re.match(r"i2c-(\d+)$", os.path.basename(path))
+        if match:
+            numbers.append(int(match.group(1)))
+    return sorted(numbers)
+
+
+def scan_buses(buses=None, addresses=DEFAULT_ADDRESSES):
+    """Scans several buses concurrently, each on a thread of its own.
+    
+    Parameters:
+    buses     -- (optional) the numbers of the buses to scan.
+                 (default = every bus returned by bus_numbers())
+    addresses -- (optional) the addresses to probe.
+                 (default = DEFAULT_ADDRESSES)
+    
+    Returns: a dict that maps each bus number to a sorted list of the
+             addresses at which devices are present.
+    """
+    return _for_each_bus(buses, lambda n, master: scan(master, addresses))
+
+
+def inventory(cache_path, buses=None, addresses=DEFAULT_ADDRESSES, rescan=False):
+    """Returns the devices attached to the buses, using and maintaining a cache file.
+    
+    Parameters:
+    cache_path -- the path of the JSON cache file.  The file is created
+                  if it does not exist and replaced if the inventory
+                  changes.  Buses that are not scanned keep their
+                  entries in the cache.
+    buses      -- (optional) the numbers of the buses to scan.
+                  (default = every bus returned by bus_numbers())
+    addresses  -- (optional) the addresses to probe.
+                  (default = DEFAULT_ADDRESSES)
+    rescan     -- (optional) if True, ignores the cache and scans every
+                  bus. (default = False)
+    
+    Returns: a dict that maps each bus number to a sorted list of the
+             addresses at which devices are present.
+    """
+    addresses = list(addresses)
+    
+    stored = _read_cache(cache_path, addresses)
+    cached = {} if rescan else stored
+    
+    def discover(n, master):
+        expected = cached.get(n)
+        if expected is not None:
+            quick_write = bool(master.functionality() & I2C_FUNC_SMBUS_QUICK)
+            if all(probe(master, addr, quick_write) for addr in expected):
+                return expected
+        
+        return scan(master, addresses)
+    
+    devices = _for_each_bus(buses, discover)
+    
+    merged = dict(stored)
+    merged.update(devices)
+    if merged != stored:
+        _write_cache(cache_path, merged, addresses)
+    
+    return devices
+
+
+def _for_each_bus(buses, fn):
+    if buses is None:
+        buses = bus_numbers()
+    buses = list(buses)
+    
+    def on_bus(n):
+        with I2CMaster(n) as master:
+            return fn(n, master)
+    
+    if not buses:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=len(buses)) as executor:
+        return dict(zip(buses, executor.map(on_bus, buses)))
+
+
+def _read_cache(cache_path, addresses):
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    
+    if (not isinstance(cache, dict)
+        or cache.get("version") != _CACHE_VERSION
+        or cache.get("addresses") != addresses):
+        return {}
+    
+    try:
+        return {int(n): sorted(addrs) for n, addrs in cache["buses"].items()}
+    except (KeyError, AttributeError, TypeError, ValueError):
+        return {}
+
+
+def _write_cache(cache_path, devices, addresses):
+    cache = {"version": _CACHE_VERSION,
+             "addresses": addresses,
+             "buses": {str(n): addrs for n, addrs in devices.items()}}
+    
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    # Replace the cache in a single step, so that an interrupted write
+    # cannot leave it truncated
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(cache_path) + ".", dir=directory or ".")
+    try:
+        with open(fd, "w") as f:
+            os.fchmod(f.fileno(), _cache_mode(cache_path))
+            json.dump(cache, f)
+        os.replace(temp_path, cache_path)
+    except:
+        os.unlink(temp_path)
+        raise
+
+
+def _cache_mode(cache_path):
+    # mkstemp creates the file readable only by its owner.  Give it the
+    # mode of the cache it replaces, or the mode open() would have given
+    # a new file.
+    try:
+        return stat.S_IMODE(os.stat(cache_path).st_mode)
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
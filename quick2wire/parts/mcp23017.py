@@ -10,14 +10,16 @@ from quick2wire.parts.mcp23x17 import deferred_read, immediate_read, deferred_wr
 class MCP23017(mcp23x17.PinBanks):
     """Application programming interface to the MCP23017 GPIO extender"""
     
-    def __init__(self, master, address=0x20):
+    def __init__(self, master, address=0x20, smbus=False):
         """Initialise to control an MCP23017 at the specified address via the given I2CMaster.
         
         Parameters:
         master  -- the quick2wire.i2c.I2CMaster used to communicate with the chip.
         address -- the address of the chip on the I2C bus (defaults to 0x20).
+        smbus   -- if True, access registers with the I2CMaster's SMBus
+                   methods (defaults to False).
         """
-        super().__init__(Registers(master, address))
+        super().__init__(Registers(master, address, smbus))
         
 
 class Registers(mcp23x17.Registers):
@@ -28,15 +30,20 @@ class Registers(mcp23x17.Registers):
     POR default value).
     """
     
-    def __init__(self, master, address):
+    def __init__(self, master, address, smbus=False):
         """Initialise to control an MCP23017 at the specified address via the given I2CMaster.
         
         Parameters:
         master  -- the quick2wire.i2c.I2CMaster used to communicate with the chip.
         address -- the address of the chip on the I2C bus (defaults to 0x20).
+        smbus   -- if True, access registers with the I2CMaster's SMBus
+                   read_byte_data and write_byte_data methods, which
+                   perform an I2C_SMBUS ioctl without building I2C
+                   messages (defaults to False).
         """
         self.master = master
         self.address = address
+        self.smbus = smbus
         
     def write_register(self, register_id, byte):
         """Write the value of a register.
@@ -45,8 +52,11 @@ class Registers(mcp23x17.Registers):
         reg   -- the register address
         value -- the new value of the register
         """
-        self.master.transaction(
-            writing_bytes(self.address, register_id, byte))
+        if self.smbus:
+            self.master.write_byte_data(self.address, register_id, byte)
+        else:
+            self.master.transaction(
+                writing_bytes(self.address, register_id, byte))
     
     def read_register(self, register_id):
         """Read the value of a register.
@@ -56,8 +66,11 @@ class Registers(mcp23x17.Registers):
         
         Returns: the value of the register.
         """
-        return self.master.transaction(
-            writing_bytes(self.address, register_id),
-            reading(self.address, 1))[0][0]
+        if self.smbus:
+            return self.master.read_byte_data(self.address, register_id)
+        else:
+            return self.master.transaction(
+                writing_bytes(self.address, register_id),
+                reading(self.address, 1))[0][0]
 
 
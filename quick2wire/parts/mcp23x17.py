@@ -215,6 +215,8 @@ def immediate_write(f):
 class PinBank(PinBankAPI):
     """A bank of 8 GPIO pins"""
     
+    single_read = True
+    
     def __init__(self, chip, bank_id):
         self.chip = chip
         self._bank_id = bank_id
@@ -254,12 +256,15 @@ class PinBank(PinBankAPI):
         If the bank's read_mode is set to immediate_read, read() is
         called whenever the value property of any of the bank's Pins
         is read.
+        
+        Returns: the value of the GPIO register: bit n is the value of pin n.
         """
         self._read_register(INTCAP)
         self._read_register(GPIO)
+        return self._register_cache[GPIO]
     
 
-    def write(self):
+    def write(self, mask=0, values=0):
         """Write changes to the pin's state capture and GPIO input registers from the chip.
         
         If the bank's write_mode is set to deferred_write, this must be
@@ -269,7 +274,20 @@ class PinBank(PinBankAPI):
         If the bank's write_mode is set to immediate_write, write() is
         called whenever the value property of any of the bank's Pins
         is set.
+        
+        Parameters:
+        mask   -- (optional) selects output latch bits to set before the
+                  outstanding changes are written: bit n selects pin n.
+        values -- (optional) the new values of the pins selected by mask.
+        
+        Setting the values of several pins this way writes the OLAT
+        register once, rather than once for each pin.
         """
+        if mask:
+            self._register_cache[OLAT] = (self._register_cache[OLAT] & ~mask) | (values & mask)
+            if OLAT not in self._outstanding_writes:
+                self._outstanding_writes.append(OLAT)
+        
         for r in self._outstanding_writes:
             self._write_register(r, self._register_cache[r])
         self._outstanding_writes = []
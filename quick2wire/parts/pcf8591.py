@@ -95,7 +95,7 @@ class PCF8591(object):
     See module documentation for details on how to use this class.
     """
     
-    def __init__(self, master, mode, address=BASE_ADDRESS):
+    def __init__(self, master, mode, address=BASE_ADDRESS, smbus=False):
         """Initialises a PCF8591.
         
         Parameters:
@@ -105,9 +105,14 @@ class PCF8591(object):
                 THREE_DIFFERENTIAL or SINGLE_ENDED_AND_DIFFERENTIAL.
         address -- the I2C address of the PCF8591 chip.
                    (optional, default = BASE_ADDRESS)
+        smbus -- if True, communicate with the chip with the
+                 I2CMaster's SMBus methods, which perform an
+                 I2C_SMBUS ioctl without building I2C messages.
+                 (optional, default = False)
         """
         self.master = master
         self.address = address
+        self.smbus = smbus
         self._control_flags = (mode << 4)
         self._last_channel_read = None
         self._output = _OutputChannel(self)
@@ -168,8 +173,11 @@ class PCF8591(object):
         if self._last_channel_read is None:
             self._last_channel_read = 0
         
-        self.master.transaction(
-            writing_bytes(self.address, self._control_flags|self._last_channel_read))
+        if self.smbus:
+            self.master.write_byte(self.address, self._control_flags|self._last_channel_read)
+        else:
+            self.master.transaction(
+                writing_bytes(self.address, self._control_flags|self._last_channel_read))
     
     def write(self, value):
         self.write_raw(min(max(0, int(value*255)), 0xFF))
@@ -178,8 +186,11 @@ class PCF8591(object):
         if self._last_channel_read is None:
             self._last_channel_read = 0
         
-        self.master.transaction(
-            writing_bytes(self.address, self._control_flags|self._last_channel_read, int_value))
+        if self.smbus:
+            self.master.write_byte_data(self.address, self._control_flags|self._last_channel_read, int_value)
+        else:
+            self.master.transaction(
+                writing_bytes(self.address, self._control_flags|self._last_channel_read, int_value))
     
     def read_single_ended(self, channel):
         """Read the 8-bit value of a single-ended input channel."""
@@ -191,6 +202,12 @@ class PCF8591(object):
         return (unsigned & 127) - (unsigned & 128)
     
     def read_raw(self, channel):
+        if self.smbus:
+            # Writing the control byte and reading two bytes returns the
+            # previous conversion followed by a conversion of the channel.
+            self._last_channel_read = channel
+            return self.master.read_i2c_block_data(self.address, self._control_flags|channel, 2)[-1]
+        
         if channel != self._last_channel_read:
             self.master.transaction(writing_bytes(self.address, self._control_flags|channel),
                                     reading(self.address, 2))
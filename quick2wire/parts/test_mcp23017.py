@@ -0,0 +1,30 @@
+
+from quick2wire.parts.mcp23017 import MCP23017
+from quick2wire.parts.mcp23x17 import IODIRA, GPIOB
+
+
+class FakeSMBusMaster:
+    def __init__(self):
+        self.registers = bytearray(0x16)
+    
+    def read_byte_data(self, addr, register):
+        assert addr == 0x21
+        return self.registers[register]
+    
+    def write_byte_data(self, addr, register, value):
+        assert addr == 0x21
+        self.registers[register] = value
+    
+    def transaction(self, *msgs):
+        raise AssertionError("I2C transaction performed when using SMBus")
+
+
+def test_can_access_registers_with_smbus():
+    master = FakeSMBusMaster()
+    chip = MCP23017(master, 0x21, smbus=True)
+    
+    chip.registers.write_register(IODIRA, 0x0F)
+    master.registers[GPIOB] = 0xA5
+    
+    assert master.registers[IODIRA] == 0x0F
+    assert chip.registers.read_register(GPIOB) == 0xA5
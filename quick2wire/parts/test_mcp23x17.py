@@ -4,6 +4,7 @@ from warnings import catch_warnings, simplefilter as issue_warnings
 import quick2wire.parts.mcp23x17 as mcp23x17
 from quick2wire.parts.mcp23x17 import *
 from quick2wire.parts.mcp23x17 import _banked_register
+from quick2wire.gpio import PinGroup
 from factcheck import *
 
 bits = from_range(2)
@@ -384,6 +385,46 @@ def test_in_deferred_write_mode_a_reset_discards_outstanding_writes(b, p):
         assert registers.writes == []
 
 
+@forall(b=bank_ids, samples=2)
+def test_can_set_many_output_latch_bits_with_one_register_write(b):
+    chip.reset()
+    bank = chip[b]
+    bank.write(0xFF, 0x00)
+    
+    registers.clear_writes()
+    bank.write(0b00111100, 0b10100101)
+    
+    assert registers.writes == [(_banked_register(b, OLAT), 0b00100100)]
+
+
+@forall(b=bank_ids, samples=2)
+def test_reading_a_bank_returns_the_value_of_its_gpio_register(b):
+    chip.reset()
+    registers.given_gpio_inputs(b, 0b10010110)
+    
+    assert chip[b].read() == 0b10010110
+
+
+def test_pin_group_writes_each_bank_of_the_chip_once():
+    chip.reset()
+    
+    group = PinGroup([chip[0][6], chip[0][7], chip[1][0], chip[1][1]])
+    with group:
+        for pin in (group.pin(i) for i in range(len(group))):
+            pin.direction = Out
+        
+        registers.clear_writes()
+        group.value = 0b0110
+        
+        assert registers.writes == [(OLATA, 0b10000000), (OLATB, 0b00000001)]
+        
+        registers.clear_writes()
+        group.value = 0b0111
+        
+        assert registers.writes == [(OLATA, 0b11000000)]
+        assert group.value == 0b0111
+
+
 class FakeRegisters(Registers):
     """Note - does not simulate effect of the IPOL{A,B} registers."""
     
@@ -367,3 +367,52 @@ def test_setting_value_of_output_pin_does_not_affect_currently_selected_input_pi
         opin.value = 0.5
         assert i2c.request_count == 7
         assert i2c.request(6)[0].buf[0][0] == 0b01000010
+
+
+class FakeSMBusMaster:
+    def __init__(self):
+        self.calls = []
+        self.block = bytes([0x80, 0x40])
+    
+    def write_byte(self, addr, value):
+        self.calls.append(("write_byte", addr, value))
+    
+    def write_byte_data(self, addr, register, value):
+        self.calls.append(("write_byte_data", addr, register, value))
+    
+    def read_i2c_block_data(self, addr, register, n_bytes):
+        self.calls.append(("read_i2c_block_data", addr, register, n_bytes))
+        return self.block[:n_bytes]
+
+
+def test_can_read_a_pin_with_a_single_smbus_transaction():
+    smbus = FakeSMBusMaster()
+    adc = PCF8591(smbus, FOUR_SINGLE_ENDED, smbus=True)
+    
+    sample = adc.single_ended_input(2).raw_value
+    
+    assert smbus.calls == [("read_i2c_block_data", adc.address, 0b00000010, 2)]
+    assert sample == 0x40
+
+
+def test_can_read_a_differential_pin_with_smbus():
+    smbus = FakeSMBusMaster()
+    smbus.block = bytes([0x80, 0xC0])
+    adc = PCF8591(smbus, THREE_DIFFERENTIAL, smbus=True)
+    
+    assert adc.differential_input(1).raw_value == -64
+    assert smbus.calls == [("read_i2c_block_data", adc.address, 0b00010001, 2)]
+
+
+def test_can_write_the_output_pin_with_smbus():
+    smbus = FakeSMBusMaster()
+    adc = PCF8591(smbus, FOUR_SINGLE_ENDED, smbus=True)
+    
+    adc.single_ended_input(1).get()
+    with adc.output as pin:
+        pin.value = 0.5
+    
+    assert smbus.calls[1:] == [
+        ("write_byte", adc.address, 0b01000001),
+        ("write_byte_data", adc.address, 0b01000001, 127),
+        ("write_byte", adc.address, 0b00000001)]
@@ -0,0 +1,239 @@
+"""Measurement of the period, frequency and duty cycle of a pulse train on an input pin.
+
+A PulseMeter timestamps the edges signalled by a pin with an
+EdgeCapture and maintains rolling statistics over the most recent
+periods.  Capturing an edge does nothing but record the time and
+value in a preallocated ring buffer, so the process spends as little
+time as possible awake for each edge.  The captured edges are turned
+into statistics only when the statistics are read, at whatever rate
+the application wants them.
+
+For example, to measure a tachometer connected to pin 0:
+
+    with pins.pin(0, direction=In, interrupt=Both) as pin, Selector() as selector:
+        meter = PulseMeter(pin)
+        selector.add(meter)
+        while True:
+            selector.wait()
+            if selector.ready is meter:
+                meter.capture()
+            ...
+            if meter.reliable:
+                print(meter.frequency, "Hz", meter.duty_cycle)
+
+If the process does not wake up for every edge, edges are coalesced
+and lost.  The PulseMeter detects this when a pin that signals both
+edges reports the same value twice in a row, when a pin that signals
+only one edge reports the other value, or when the capture buffer
+overflows.  Lost edges are counted, the period that contains them is
+discarded, and the statistics are not reliable until the window has
+been refilled with periods measured since the loss.
+"""
+
+from array import array
+from time import monotonic_ns
+from quick2wire.edgecapture import EdgeCapture
+from quick2wire.gpio import Rising, Falling, Both
+
+
+class PulseMeter(object):
+    """Maintains rolling period, frequency and duty cycle statistics of the edges signalled by a pin."""
+    
+    def __init__(self, pin, window=64, interrupt=Both, capacity=1024, clock=monotonic_ns):
+        """Creates a PulseMeter.
+        
+        Parameters:
+        pin       -- the source of edges: an open input Pin with its
+                     interrupt set, or a quick2wire.gpiochip.LineEvents.
+        window    -- (optional) the number of most recent periods over
+                     which the statistics are calculated. (default = 64)
+        interrupt -- (optional) the edges the pin signals: Both,
+                     Rising or Falling.  The duty cycle can only be
+                     measured if the pin signals both edges.
+                     (default = Both)
+        capacity  -- (optional) the number of edges that can be captured
+                     between reads of the statistics. (default = 1024)
+        clock     -- (optional) returns the current time, in
+                     nanoseconds.  (default = time.monotonic_ns)
+        """
+        if interrupt not in (Rising, Falling, Both):
+            raise ValueError("interrupt must be Rising, Falling or Both")
+        
+        self._capture = EdgeCapture(pin, capacity, clock)
+        self.__trigger__ = self._capture.__trigger__
+        self._interrupt = interrupt
+        self._window = window
+        self._periods = array('q', bytes(8*window))
+        self._high_times = array('q', bytes(8*window))
+        self._timestamps = array('q', bytes(8*capacity))
+        self._values = bytearray(capacity)
+        self.reset()
+    
+    @property
+    def pin(self):
+        return self._capture.pin
+    
+    @property
+    def window(self):
+        """The number of periods over which the statistics are calculated."""
+        return self._window
+    
+    def fileno(self):
+        """Returns the file descriptor of the pin."""
+        return self._capture.fileno()
+    
+    def capture(self):
+        """Records the edge that caused the pin to signal.
+        
+        Call when a Selector reports that the pin is ready.
+        """
+        self._capture.capture()
+    
+    def reset(self):
+        """Discards all captured edges and statistics."""
+        self._capture.clear()
+        self._count = 0
+        self._next = 0
+        self._period_sum = 0
+        self._high_sum = 0
+        self._last_value = None
+        self._last_start = None
+        self._last_end = None
+        self._since_loss = 0
+        self._edges = 0
+        self._lost_edges = 0
+        self._last_edge_time = None
+    
+    def update(self):
+        """Processes the edges captured since the statistics were last updated.
+        
+        Called automatically when the statistics are read.
+        """
+        capture = self._capture
+        if capture.overflows:
+            self._lost(capture.overflows)
+            capture.overflows = 0
+        
+        timestamps = self._timestamps
+        values = self._values
+        n = capture.drain_into(timestamps, values)
+        while n:
+            for i in range(n):
+                self._edge(timestamps[i], values[i])
+            n = capture.drain_into(timestamps, values)
+    
+    def _edge(self, timestamp, value):
+        self._edges += 1
+        self._last_edge_time = timestamp
+        
+        if self._interrupt == Both:
+            if value == self._last_value:
+                self._lost(1)
+            self._last_value = value
+            
+            if value:
+                if self._last_start is not None and self._last_end is not None:
+                    self._record(timestamp - self._last_start, self._last_end - self._last_start)
+                self._last_start = timestamp
+                self._last_end = None
+            elif self._last_start is not None:
+                self._last_end = timestamp
+        
+        else:
+            if value != (self._interrupt == Rising):
+                # The pin changed again before its value was read
+                self._lost(1)
+            else:
+                if self._last_start is not None:
+                    self._record(timestamp - self._last_start, 0)
+                self._last_start = timestamp
+    
+    def _lost(self, count):
+        self._lost_edges += count
+        self._since_loss = 0
+        self._last_start = None
+        self._last_end = None
+    
+    def _record(self, period, high_time):
+        i = self._next
+        if self._count == self._window:
+            self._period_sum -= self._periods[i]
+            self._high_sum -= self._high_times[i]
+        else:
+            self._count += 1
+        
+        self._periods[i] = period
+        self._high_times[i] = high_time
+        self._period_sum += period
+        self._high_sum += high_time
+        self._next = (i + 1) % self._window
+        self._since_loss += 1
+    
+    @property
+    def edges(self):
+        """The number of edges captured."""
+        self.update()
+        return self._edges
+    
+    @property
+    def lost_edges(self):
+        """The number of edges known to have been lost."""
+        self.update()
+        return self._lost_edges
+    
+    @property
+    def last_edge_time(self):
+        """The time of the most recent edge, in nanoseconds, or None if no edges have been captured."""
+        self.update()
+        return self._last_edge_time
+    
+    @property
+    def periods(self):
+        """The number of periods in the window."""
+        self.update()
+        return self._count
+    
+    @property
+    def reliable(self):
+        """True if the window is not empty and no edges have been lost since its oldest period was measured."""
+        self.update()
+        return self._count > 0 and self._since_loss >= self._count
+    
+    @property
+    def period(self):
+        """The mean period, in nanoseconds, or None if no periods have been measured."""
+        self.update()
+        if self._count == 0:
+            return None
+        return self._period_sum / self._count
+    
+    @property
+    def frequency(self):
+        """The mean frequency, in Hz, or None if no periods have been measured."""
+        self.update()
+        if self._count == 0 or self._period_sum == 0:
+            return None
+        return self._count * 1000000000 / self._period_sum
+    
+    @property
+    def duty_cycle(self):
+        """The fraction of the time for which the pin is high, or None if it cannot be measured."""
+        self.update()
+        if self._interrupt != Both or self._period_sum == 0:
+            return None
+        return self._high_sum / self._period_sum
+    
+    @property
+    def min_period(self):
+        """The shortest period in the window, in nanoseconds, or None if no periods have been measured."""
+        self.update()
+        return min(self._window_periods()) if self._count else None
+    
+    @property
+    def max_period(self):
+        """The longest period in the window, in nanoseconds, or None if no periods have been measured."""
+        self.update()
+        return max(self._window_periods()) if self._count else None
+    
+    def _window_periods(self):
+        return self._periods[:self._count]
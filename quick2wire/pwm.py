@@ -0,0 +1,304 @@
+"""Software pulse-width modulation of GPIO output pins.
+
+A SoftwarePWM drives any number of output pins of a PinBank from a
+single quick2wire.timerfd.Timer.  Each PWM period is divided into a
+number of ticks (the resolution).  Pins are switched on together at
+the start of the period and each is switched off at the tick given by
+its duty cycle.  All the pins that switch on the same tick are written
+with a single call to the bank's write method, and the timer is armed
+with absolute deadlines, so that timing errors do not accumulate from
+one period to the next.
+
+For example:
+
+    with pins.pin(0, Out) as led, pins.pin(1, Out) as motor, SoftwarePWM(pins, frequency=100) as pwm:
+        pwm.set_duty_cycle(0, 0.25)
+        pwm.set_duty_cycle(1, 0.75)
+        pwm.run(10)
+        pwm.stop()
+
+The SoftwarePWM can also be added to a Selector, in which case the
+application must call step() whenever the Selector reports that the
+SoftwarePWM is ready.
+
+The SoftwarePWM measures how well it keeps up: the frequency it has
+achieved, how late it has written to the pins, how many periods it
+has had to skip and, for each pin, the difference between the
+requested duty cycle and the duty cycle it actually produced.
+"""
+
+from time import clock_gettime_ns
+from quick2wire.syscall import SelfClosing
+from quick2wire.timerfd import Timer, CLOCK_MONOTONIC
+
+
+class _Schedule(object):
+    def __init__(self, duty_cycles, period, resolution):
+        all_pins = 0
+        on_pins = 0
+        off_pins = {}
+        self.ticks = {}
+        for index, duty_cycle in duty_cycles.items():
+            bit = 1 << index
+            tick = round(duty_cycle * resolution)
+            all_pins |= bit
+            if tick > 0:
+                on_pins |= bit
+            if 0 < tick < resolution:
+                off_pins[tick] = off_pins.get(tick, 0) | bit
+            self.ticks[index] = tick
+        
+        off_ticks = sorted(off_pins)
+        self.events = tuple([(0, all_pins, on_pins)] +
+                            [(tick * period // resolution, off_pins[tick], 0) for tick in off_ticks])
+        self.off_event = dict((index, off_ticks.index(tick) + 1)
+                              for index, tick in self.ticks.items() if tick in off_pins)
+        self.all_pins = all_pins
+
+
+class SoftwarePWM(SelfClosing):
+    """Generates pulse-width modulated signals on output pins of a PinBank from a single timer."""
+    
+    def __init__(self, bank, frequency, resolution=100):
+        """Creates a SoftwarePWM.
+        
+        Parameters:
+        bank       -- the PinBank whose output pins are driven.  The
+                      pins must be opened by the application.
+        frequency  -- the PWM frequency, in Hz.
+        resolution -- (optional) the number of ticks in each period.
+                      Duty cycles are rounded to the nearest tick.
+                      (default = 100)
+        """
+        if frequency <= 0:
+            raise ValueError("frequency must be positive")
+        
+        self._bank = bank
+        self._period = int(1000000000 // frequency)
+        self._resolution = resolution
+        self._duty_cycles = {}
+        self._schedule = _Schedule(self._duty_cycles, self._period, resolution)
+        self._pending_schedule = None
+        self._timer = Timer(clock=CLOCK_MONOTONIC)
+        self._running = False
+        self.reset_statistics()
+    
+    @property
+    def frequency(self):
+        """The requested PWM frequency, in Hz."""
+        return 1000000000 / self._period
+    
+    @property
+    def resolution(self):
+        """The number of ticks in each period."""
+        return self._resolution
+    
+    @property
+    def running(self):
+        return self._running
+    
+    def duty_cycle(self, index):
+        """Returns the requested duty cycle of pin index of the bank.
+        
+        Raises:
+        ValueError -- the pin is not driven by the SoftwarePWM.
+        """
+        self._check_driven(index)
+        return self._duty_cycles[index]
+    
+    def set_duty_cycle(self, index, duty_cycle):
+        """Sets the duty cycle of a pin, between 0 (always off) and 1 (always on).
+        
+        If the SoftwarePWM is running the change takes effect at the
+        start of the next period.
+        
+        Parameters:
+        index      -- the index of the pin in the bank.
+        duty_cycle -- the fraction of each period for which the pin is on.
+        """
+        if not 0 <= duty_cycle <= 1:
+            raise ValueError("duty cycle must be between 0 and 1")
+        
+        self._duty_cycles[index] = duty_cycle
+        self._reschedule()
+    
+    def remove(self, index):
+        """Stops driving a pin.  The pin is left in its current state.
+        
+        Raises:
+        ValueError -- the pin is not driven by the SoftwarePWM.
+        """
+        self._check_driven(index)
+        del self._duty_cycles[index]
+        self._reschedule()
+    
+    def _check_driven(self, index):
+        if index not in self._duty_cycles:
+            raise ValueError("pin " + str(index) + " is not driven by the SoftwarePWM")
+    
+    def _reschedule(self):
+        schedule = _Schedule(self._duty_cycles, self._period, self._resolution)
+        if self._running:
+            self._pending_schedule = schedule
+        else:
+            self._schedule = schedule
+    
+    def fileno(self):
+        """Returns the file descriptor of the timer, for use with a Selector."""
+        return self._timer.fileno()
+    
+    def start(self):
+        """Starts generating the signals, with the first period starting immediately."""
+        self._period_start = clock_gettime_ns(CLOCK_MONOTONIC)
+        self._next_event = 0
+        self._written_at = [0] * len(self._schedule.events)
+        self._previous_period = None
+        self._running = True
+        self._timer.start_at_ns(self._period_start)
+    
+    def stop(self):
+        """Stops generating the signals and switches off all the pins."""
+        self._timer.stop()
+        self._running = False
+        if self._pending_schedule is not None:
+            self._schedule = self._pending_schedule
+            self._pending_schedule = None
+        self._bank.write(self._schedule.all_pins, 0)
+    
+    def close(self):
+        """Releases the timer."""
+        self._timer.close()
+    
+    def step(self):
+        """Performs the next scheduled write to the pins.
+        
+        Blocks until the write is due.  When the SoftwarePWM has been
+        added to a Selector, call step() when the Selector reports that
+        the SoftwarePWM is ready.
+        """
+        self._timer.wait()
+        
+        schedule = self._schedule
+        i = self._next_event
+        offset, mask, values = schedule.events[i]
+        deadline = self._period_start + offset
+        
+        self._bank.write(mask, values)
+        now = clock_gettime_ns(CLOCK_MONOTONIC)
+        
+        self._written_at[i] = now
+        self._record_lateness(now - deadline)
+        if i == 0 and self._previous_period is not None:
+            self._account_period(now)
+        
+        i += 1
+        if i == len(schedule.events):
+            self._end_period(now)
+            i = 0
+        
+        self._next_event = i
+        self._timer.start_at_ns(self._period_start + self._schedule.events[i][0])
+    
+    def run(self, duration):
+        """Generates the signals for duration seconds, blocking the calling thread.
+        
+        Starts the SoftwarePWM if it is not already running.  It is left
+        running when run() returns.
+        """
+        if not self._running:
+            self.start()
+        
+        end = clock_gettime_ns(CLOCK_MONOTONIC) + int(duration * 1000000000)
+        while clock_gettime_ns(CLOCK_MONOTONIC) < end:
+            self.step()
+    
+    def _end_period(self, now):
+        self._previous_period = (self._schedule, self._written_at)
+        if self._pending_schedule is not None:
+            self._schedule = self._pending_schedule
+            self._pending_schedule = None
+        self._written_at = [0] * len(self._schedule.events)
+        
+        self._period_start += self._period
+        if now - self._period_start > self._period:
+            skipped = (now - self._period_start) // self._period
+            self._period_start += skipped * self._period
+            self.skipped_periods += skipped
+            self._previous_period = None
+    
+    def _record_lateness(self, lateness):
+        self.writes += 1
+        if lateness > self._period // self._resolution:
+            self.late_writes += 1
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+    
+    def _account_period(self, now):
+        schedule, written_at = self._previous_period
+        start = written_at[0]
+        length = now - start
+        
+        for index, tick in schedule.ticks.items():
+            if index in schedule.off_event:
+                on_time = written_at[schedule.off_event[index]] - start
+            elif tick > 0:
+                on_time = length
+            else:
+                on_time = 0
+            self._on_time[index] = self._on_time.get(index, 0) + on_time
+            self._measured_time[index] = self._measured_time.get(index, 0) + length
+        
+        if self._first_period_start is None:
+            self._first_period_start = start
+        self._last_period_end = now
+        self.periods += 1
+    
+    def reset_statistics(self):
+        """Resets the measurements of the SoftwarePWM's performance.
+        
+        The measurements are:
+        periods         -- the number of complete periods measured.
+        writes          -- the number of writes to the bank.
+        late_writes     -- the number of writes made more than one tick 
+                           after their deadline.
+        max_lateness    -- the latest that a write has been made after its
+                           deadline, in nanoseconds.
+        skipped_periods -- the number of whole periods skipped because the
+                           SoftwarePWM fell more than a period behind.
+        """
+        self.periods = 0
+        self.writes = 0
+        self.late_writes = 0
+        self.skipped_periods = 0
+        self.max_lateness = 0
+        self._on_time = {}
+        self._measured_time = {}
+        self._first_period_start = None
+        self._last_period_end = None
+        self._previous_period = None
+    
+    @property
+    def achieved_frequency(self):
+        """The average frequency, in Hz, of the periods that have been completed, or None if no periods have been completed."""
+        if self.periods == 0:
+            return None
+        return self.periods * 1000000000 / (self._last_period_end - self._first_period_start)
+    
+    def achieved_duty_cycle(self, index):
+        """The average duty cycle actually produced on a pin, or None if no periods have been completed."""
+        measured = self._measured_time.get(index, 0)
+        if measured == 0:
+            return None
+        return self._on_time[index] / measured
+    
+    def duty_cycle_error(self, index):
+        """The difference between the achieved and requested duty cycles of a pin, or None if no periods have been completed.
+        
+        Raises:
+        ValueError -- the pin is not driven by the SoftwarePWM.
+        """
+        self._check_driven(index)
+        achieved = self.achieved_duty_cycle(index)
+        if achieved is None:
+            return None
+        return achieved - self._duty_cycles[index]
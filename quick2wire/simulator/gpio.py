@@ -0,0 +1,243 @@
+"""A simulation of the kernel's sysfs GPIO interface, for testing and benchmarking off the Pi.
+
+A SimulatedGPIO creates a fake sysfs GPIO tree in a temporary
+directory and acts as the PinExporter of the pin banks that it
+creates.  Exporting a pin creates its gpioN directory, containing
+value, direction, edge and active_low files, and unexporting the pin
+removes it.  The pins of a simulated bank read and write those files
+with exactly the same code as pins on the Pi.
+
+The test drives the other side of each pin through a SimulatedLine.
+Setting the value of a line writes the pin's value file and, if the
+change matches the edge setting of the pin, signals an eventfd that
+the pin returns from its fileno() method, so the pin can be waited
+for with a Selector.
+
+For example:
+
+    with SimulatedGPIO() as gpio, Selector() as selector:
+        bank = gpio.bank()
+        with bank.pin(17, direction=In, interrupt=Rising) as pin:
+            selector.add(pin)
+            gpio.line(17).value = 1
+            selector.wait()
+            assert selector.ready is pin and pin.value == 1
+"""
+
+import os
+import errno
+import shutil
+import tempfile
+from quick2wire.syscall import SelfClosing
+from quick2wire.selector import INPUT
+from quick2wire.eventfd import eventfd, eventfd_t, EFD_NONBLOCK, EFD_CLOEXEC
+from quick2wire.gpio import PinExporter, PinBank, Pin, In, Out, Rising, Falling, Both, PullUp
+
+
+_directions = (In, Out)
+_edges = ("none", Rising, Falling, Both)
+
+_one = eventfd_t(1)
+
+
+class SimulatedGPIO(PinExporter, SelfClosing):
+    """A fake sysfs GPIO tree that exports pins into a temporary directory."""
+    
+    def __init__(self, root=None):
+        """Creates a SimulatedGPIO.
+        
+        Parameters:
+        root -- (optional) an empty directory in which to create the
+                tree.  The directory is not removed when the
+                SimulatedGPIO is closed.  Default: a new temporary
+                directory, removed when the SimulatedGPIO is closed.
+        """
+        if root is None:
+            self.root = tempfile.mkdtemp(prefix="quick2wire-gpio-")
+            self._owns_root = True
+        else:
+            self.root = root
+            self._owns_root = False
+        self._lines = {}
+    
+    def close(self):
+        """Unexports all the pins and removes the tree."""
+        self.unexport_all(list(self._lines))
+        if self._owns_root and self.root is not None:
+            shutil.rmtree(self.root)
+            self.root = None
+    
+    def bank(self, index_to_soc_fn=None, count=None):
+        """Creates a PinBank whose pins are exported by the simulation.
+        
+        Parameters:
+        index_to_soc_fn -- (optional) maps pin indices to SoC pin
+                           numbers, as for quick2wire.gpio.PinBank.
+                           Default: pin indices are SoC pin numbers.
+        count           -- (optional) the number of pins in the bank.
+        """
+        return SimulatedPinBank(index_to_soc_fn if index_to_soc_fn is not None else (lambda p: p),
+                                count, exporter=self)
+    
+    def line(self, pin):
+        """Returns the SimulatedLine connected to an exported pin.
+        
+        Raises:
+        KeyError -- the pin is not exported.
+        """
+        return self._lines[pin]
+    
+    @property
+    def exported(self):
+        """The SoC pin numbers of the exported pins."""
+        return set(self._lines)
+    
+    def export(self, pin, pull=None):
+        if pin in self._lines:
+            raise OSError(errno.EBUSY, os.strerror(errno.EBUSY), self._pin_directory(pin))
+        
+        directory = self._pin_directory(pin)
+        os.mkdir(directory)
+        _write_file(directory, "value", "1\n" if pull == PullUp else "0\n")
+        _write_file(directory, "direction", In + "\n")
+        _write_file(directory, "edge", "none\n")
+        _write_file(directory, "active_low", "0\n")
+        self._lines[pin] = SimulatedLine(pin, directory)
+    
+    def unexport(self, pin):
+        try:
+            line = self._lines.pop(pin)
+        except KeyError:
+            raise OSError(errno.EINVAL, os.strerror(errno.EINVAL), self._pin_directory(pin))
+        
+        line._close()
+        shutil.rmtree(line.directory)
+    
+    def _pin_directory(self, pin):
+        return os.path.join(self.root, "gpio%i" % pin)
+
+
+class SimulatedLine(object):
+    """The device side of a simulated pin, driven by the test."""
+    
+    def __init__(self, pin, directory):
+        self._pin = pin
+        self.directory = directory
+        self._value_path = os.path.join(directory, "value")
+        self._eventfd = eventfd(0, EFD_NONBLOCK|EFD_CLOEXEC)
+        self.pending = False
+        self.edges = 0
+    
+    @property
+    def soc_pin_number(self):
+        return self._pin
+    
+    def fileno(self):
+        """The eventfd that is signalled when the line raises an edge."""
+        return self._eventfd
+    
+    @property
+    def direction(self):
+        """The direction of the pin, as last written by the pin: In or Out."""
+        return self._attribute("direction", _directions)
+    
+    @property
+    def edge(self):
+        """The edge setting of the pin: "none", Rising, Falling or Both."""
+        return self._attribute("edge", _edges)
+    
+    @property
+    def active_low(self):
+        return self._attribute("active_low", ("0", "1")) == "1"
+    
+    @property
+    def value(self):
+        """The value of the pin's value file: written by the pin if it is an output, or by the test if it is an input."""
+        with open(self._value_path, "rb") as f:
+            return 1 if f.read(1) == b"1" else 0
+    
+    @value.setter
+    def value(self, new_value):
+        """Drives the input to a new value, signalling the pin if the change matches its edge setting."""
+        new_value = 1 if new_value else 0
+        old_value = self.value
+        if new_value == old_value:
+            return
+        
+        fd = os.open(self._value_path, os.O_WRONLY)
+        try:
+            os.pwrite(fd, b"1" if new_value else b"0", 0)
+        finally:
+            os.close(fd)
+        
+        edge = self.edge
+        if edge == Both or edge == (Rising if new_value else Falling):
+            self.edges += 1
+            self.pending = True
+            os.write(self._eventfd, _one)
+    
+    def _acknowledge(self):
+        self.pending = False
+        try:
+            os.read(self._eventfd, 8)
+        except BlockingIOError:
+            pass
+    
+    def _attribute(self, filename, values):
+        with open(os.path.join(self.directory, filename)) as f:
+            content = f.read()
+        value = content[:-1] if content.endswith("\n") else content
+        if value not in values:
+            raise ValueError("invalid " + filename + ": " + repr(content))
+        return value
+    
+    def _close(self):
+        os.close(self._eventfd)
+        self._eventfd = None
+    
+    def __repr__(self):
+        return "SimulatedLine(" + str(self._pin) + ")"
+
+
+class SimulatedPin(Pin):
+    """A pin of a SimulatedPinBank, signalled by its SimulatedLine instead of by the kernel."""
+    
+    # An eventfd signals input, where a sysfs value file signals priority input
+    __edge_events__ = INPUT
+    
+    def _open_exported(self):
+        self._line = self.bank.exporter.line(self.soc_pin_number)
+        super(SimulatedPin,self)._open_exported()
+    
+    def _close_exported(self):
+        super(SimulatedPin,self)._close_exported()
+        self._line = None
+    
+    def _write_attribute(self, fd, data):
+        # Writing a sysfs attribute replaces its value, but writing a
+        # regular file only overwrites the bytes written
+        super(SimulatedPin,self)._write_attribute(fd, data)
+        os.ftruncate(fd, len(data))
+    
+    def fileno(self):
+        """Returns the eventfd of the pin's SimulatedLine, for use with a Selector."""
+        return self._line.fileno() if not self.closed else None
+    
+    def get(self):
+        value = super(SimulatedPin,self).get()
+        if self._line.pending:
+            # Reading the value of a real pin acknowledges the edge
+            self._line._acknowledge()
+        return value
+
+
+class SimulatedPinBank(PinBank):
+    """A PinBank of SimulatedPins, exported by a SimulatedGPIO."""
+    
+    def pin(self, index, *args, **kwargs):
+        return SimulatedPin(self, index, self._index_to_soc(index), *args, **kwargs)
+
+
+def _write_file(directory, filename, content):
+    with open(os.path.join(directory, filename), "w") as f:
+        f.write(content)
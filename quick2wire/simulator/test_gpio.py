@@ -0,0 +1,280 @@
+
+import os
+import pytest
+from quick2wire.gpio import In, Out, Rising, Falling, Both, PullUp
+from quick2wire.selector import Selector
+from quick2wire.simulator.gpio import SimulatedGPIO
+
+
+@pytest.fixture
+def gpio():
+    with SimulatedGPIO() as gpio:
+        yield gpio
+
+
+def test_exports_pins_into_a_temporary_tree_and_removes_it_when_closed():
+    with SimulatedGPIO() as gpio:
+        root = gpio.root
+        with gpio.bank().pin(17) as pin:
+            assert os.path.exists(os.path.join(root, "gpio17", "value"))
+            assert gpio.exported == {17}
+        
+        assert not os.path.exists(os.path.join(root, "gpio17"))
+        assert gpio.exported == set()
+    
+    assert not os.path.exists(root)
+
+
+def test_cannot_export_a_pin_twice(gpio):
+    gpio.export(4)
+    
+    with pytest.raises(OSError):
+        gpio.export(4)
+
+
+def test_pin_reads_the_value_driven_onto_its_line(gpio):
+    with gpio.bank().pin(4, In) as pin:
+        assert pin.value == 0
+        
+        gpio.line(4).value = 1
+        assert pin.value == 1
+        
+        gpio.line(4).value = 0
+        assert pin.value == 0
+
+
+def test_line_reads_the_value_written_by_an_output_pin(gpio):
+    with gpio.bank().pin(4, Out) as pin:
+        assert gpio.line(4).direction == Out
+        
+        pin.value = 1
+        assert gpio.line(4).value == 1
+        
+        pin.value = 0
+        assert gpio.line(4).value == 0
+
+
+def test_pulled_up_input_starts_high(gpio):
+    with gpio.bank().pin(4, In, pull=PullUp) as pin:
+        assert pin.value == 1
+
+
+def test_line_sees_attributes_written_through_open_attribute_files(gpio):
+    with gpio.bank().pin(4, Out, keep_attributes_open=True) as pin:
+        pin.direction = In
+        pin.interrupt = Falling
+        assert gpio.line(4).direction == In
+        assert gpio.line(4).edge == Falling
+        
+        pin.interrupt = Both
+        assert gpio.line(4).edge == Both
+
+
+def test_selector_is_woken_by_edges_that_match_the_interrupt_setting(gpio):
+    with gpio.bank().pin(4, In, interrupt=Rising) as pin, Selector() as selector:
+        selector.add(pin)
+        line = gpio.line(4)
+        
+        line.value = 1
+        selector.wait(timeout=0)
+        assert selector.ready is pin
+        assert pin.value == 1
+        
+        line.value = 0
+        selector.wait(timeout=0)
+        assert selector.ready is None
+        
+        line.value = 1
+        selector.wait(timeout=0)
+        assert selector.ready is pin
+        
+        assert line.edges == 2
+
+
+def test_reading_the_value_acknowledges_the_edge(gpio):
+    with gpio.bank().pin(4, In, interrupt=Both) as pin:
+        line = gpio.line(4)
+        
+        line.value = 1
+        assert line.pending
+        
+        pin.value
+        assert not line.pending
+
+
+def test_can_open_and_close_many_pins_of_a_bank_together(gpio):
+    bank = gpio.bank(count=1000)
+    ps = [bank.pin(i, Out) for i in range(1000)]
+    
+    bank.open_all(ps)
+    try:
+        bank.write(0b1010, 0b1000)
+        assert bank.read() == 0b1000
+        assert gpio.line(3).value == 1
+    finally:
+        bank.close_all(ps)
+    
+    assert gpio.exported == set()
+
+
+def test_cannot_write_the_value_of_an_input_pin(gpio):
+    with gpio.bank().pin(4, In) as pin:
+        with pytest.raises(ValueError):
+            pin.value = 1
+        
+        assert gpio.line(4).value == 0
+
+
+def test_can_write_the_value_of_a_pin_after_changing_its_direction_to_out(gpio):
+    with gpio.bank().pin(4, In) as pin:
+        pin.direction = Out
+        pin.value = 1
+        assert gpio.line(4).value == 1
+        
+        pin.direction = In
+        with pytest.raises(ValueError):
+            pin.value = 0
+
+
+def test_bank_cannot_write_the_value_of_an_input_pin(gpio):
+    bank = gpio.bank()
+    with bank.pin(3, Out), bank.pin(4, In):
+        with pytest.raises(ValueError):
+            bank.write(0b11000, 0b11000)
+        
+        assert gpio.line(3).value == 0
+
+
+def content_of(gpio, pin, filename):
+    with open(os.path.join(gpio.root, "gpio%i" % pin, filename)) as f:
+        return f.read()
+
+
+def test_pin_with_open_attribute_files_reads_and_writes_its_value(gpio):
+    with gpio.bank().pin(4, In, keep_attributes_open=True) as pin:
+        gpio.line(4).value = 1
+        assert pin.value == 1
+        
+        pin.direction = Out
+        pin.value = 0
+        assert gpio.line(4).value == 0
+        
+        pin.value = 1
+        assert gpio.line(4).value == 1
+
+
+def test_writing_an_open_attribute_file_replaces_its_contents(gpio):
+    with gpio.bank().pin(4, Out, keep_attributes_open=True) as pin:
+        pin.direction = In
+        assert content_of(gpio, 4, "direction") == "in"
+        
+        pin.interrupt = Rising
+        pin.interrupt = Both
+        assert content_of(gpio, 4, "edge") == "both"
+        assert gpio.line(4).edge == Both
+        
+        pin.active_low = True
+        assert gpio.line(4).active_low
+
+
+def test_setting_interrupt_to_none_through_an_open_attribute_file(gpio):
+    with gpio.bank().pin(4, In, interrupt=Falling, keep_attributes_open=True) as pin:
+        pin.interrupt = None
+        
+        assert pin.interrupt is None
+        assert gpio.line(4).edge == "none"
+
+
+def test_attribute_files_are_closed_when_the_pin_is_closed(gpio):
+    pin = gpio.bank().pin(4, Out, keep_attributes_open=True)
+    fds_before = len(os.listdir("/proc/self/fd"))
+    
+    with pin:
+        assert len(pin._attribute_fds) == 3
+    
+    assert pin._attribute_fds == {}
+    assert len(os.listdir("/proc/self/fd")) == fds_before
+
+
+def test_attribute_files_already_opened_are_closed_if_one_cannot_be_opened(gpio):
+    gpio.export(4)
+    os.remove(os.path.join(gpio.root, "gpio4", "active_low"))
+    pin = gpio.bank().pin(4, keep_attributes_open=True)
+    fds_before = len(os.listdir("/proc/self/fd"))
+    
+    with pytest.raises(OSError):
+        pin._open_attributes()
+    
+    assert pin._attribute_fds == {}
+    assert len(os.listdir("/proc/self/fd")) == fds_before
+
+
+class BrokenGPIO(SimulatedGPIO):
+    """Exports a pin without its active_low file, so that it cannot be opened with its attribute files kept open."""
+    
+    def __init__(self, broken_pin):
+        super(BrokenGPIO,self).__init__()
+        self.broken_pin = broken_pin
+    
+    def export(self, pin, pull=None):
+        super(BrokenGPIO,self).export(pin, pull)
+        if pin == self.broken_pin:
+            os.remove(os.path.join(self.root, "gpio%i" % pin, "active_low"))
+
+
+def open_fd_count():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_open_all_unexports_pins_it_exported_if_it_cannot_export_them_all(gpio):
+    bank = gpio.bank()
+    ps = [bank.pin(i, Out) for i in range(3, 7)]
+    gpio.export(5)
+    
+    with pytest.raises(OSError):
+        bank.open_all(ps)
+    
+    assert gpio.exported == {5}
+    assert all(p.closed for p in ps)
+
+
+def test_open_all_closes_and_unexports_pins_if_it_cannot_open_them_all():
+    with BrokenGPIO(broken_pin=5) as gpio:
+        bank = gpio.bank()
+        ps = [bank.pin(i, In, keep_attributes_open=True) for i in range(3, 7)]
+        fds_before = open_fd_count()
+        
+        with pytest.raises(OSError):
+            bank.open_all(ps)
+        
+        assert gpio.exported == set()
+        assert all(p.closed for p in ps)
+        assert bank.read() == 0
+        assert open_fd_count() == fds_before
+
+
+def test_pin_is_unexported_if_it_cannot_be_opened():
+    with BrokenGPIO(broken_pin=4) as gpio:
+        pin = gpio.bank().pin(4, keep_attributes_open=True)
+        fds_before = open_fd_count()
+        
+        with pytest.raises(OSError):
+            pin.open()
+        
+        assert gpio.exported == set()
+        assert pin.closed
+        assert open_fd_count() == fds_before
+
+
+def test_close_all_unexports_the_pins_it_closes(gpio):
+    bank = gpio.bank()
+    ps = [bank.pin(i, Out) for i in range(3, 7)]
+    bank.open_all(ps)
+    assert gpio.exported == {3, 4, 5, 6}
+    
+    bank.close_all(ps[:2])
+    assert gpio.exported == {5, 6}
+    assert [p.closed for p in ps] == [True, True, False, False]
+    
+    bank.close_all(ps)
+    assert gpio.exported == set()
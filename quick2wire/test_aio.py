@@ -0,0 +1,107 @@
+
+import asyncio
+import threading
+import time
+from quick2wire.gpio import In, Both
+from quick2wire.eventfd import Semaphore
+from quick2wire.timerfd import Timer, CLOCK_MONOTONIC
+from quick2wire.simulator.gpio import SimulatedGPIO
+from quick2wire.aio import ready, _dispatcher
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=5))
+
+
+def test_can_acquire_a_semaphore_signalled_from_another_task():
+    async def scenario():
+        with Semaphore(blocking=False) as s:
+            asyncio.get_running_loop().call_soon(s.signal)
+            return await s.acquire()
+    
+    assert run(scenario()) == True
+
+
+def test_each_signal_of_a_semaphore_is_acquired_by_one_waiter():
+    async def scenario():
+        with Semaphore(blocking=False) as s:
+            waiters = [asyncio.ensure_future(s.acquire()) for i in range(3)]
+            await asyncio.sleep(0)
+            s.signal()
+            s.signal()
+            await asyncio.sleep(0.05)
+            done = [w.done() for w in waiters]
+            s.signal()
+            await asyncio.gather(*waiters)
+            return done
+    
+    assert sorted(run(scenario())) == [False, True, True]
+
+
+def test_can_wait_for_a_timer_to_tick():
+    async def scenario():
+        with Timer(offset=0.01, clock=CLOCK_MONOTONIC) as timer:
+            timer.start()
+            return await timer.tick()
+    
+    assert run(scenario()) == 1
+
+
+def test_can_await_an_edge_of_a_pin():
+    async def scenario():
+        with SimulatedGPIO() as gpio:
+            with gpio.bank().pin(4, direction=In, interrupt=Both) as pin:
+                asyncio.get_running_loop().call_later(0.01, setattr, gpio.line(4), "value", 1)
+                return await pin.edge()
+    
+    assert run(scenario()) == 1
+
+
+def test_a_cancelled_waiter_does_not_prevent_others_from_being_woken():
+    async def scenario():
+        with Semaphore(blocking=False) as s:
+            cancelled = asyncio.ensure_future(ready(s))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            
+            asyncio.get_running_loop().call_soon(s.signal)
+            return await s.acquire()
+    
+    assert run(scenario()) == True
+
+
+def test_waiters_that_lose_the_race_for_a_blocking_semaphore_do_not_block_the_event_loop():
+    async def scenario():
+        with Semaphore() as s:
+            # Unblocks the event loop if a waiter does block it
+            rescue = threading.Timer(2, lambda: (s.signal(), s.signal()))
+            rescue.start()
+            try:
+                waiters = [asyncio.ensure_future(s.acquire()) for i in range(2)]
+                await asyncio.sleep(0)
+                s.signal()
+                
+                start = time.monotonic()
+                await asyncio.sleep(0.2)
+                elapsed = time.monotonic() - start
+                
+                assert sum(w.done() for w in waiters) == 1
+                for w in waiters:
+                    w.cancel()
+                return elapsed
+            finally:
+                rescue.cancel()
+    
+    assert run(scenario()) < 1
+
+
+def test_cancelled_waiters_are_forgotten():
+    async def scenario():
+        with Semaphore(blocking=False) as s:
+            waiter = asyncio.ensure_future(ready(s))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.sleep(0)
+            return _dispatcher(asyncio.get_running_loop())._waiters
+    
+    assert run(scenario()) == {}
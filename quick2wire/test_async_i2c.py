@@ -0,0 +1,193 @@
+
+import asyncio
+import threading
+import pytest
+from quick2wire.async_i2c import AsyncI2CMaster
+
+
+class FakeMaster:
+    fd = 99
+    
+    def __init__(self):
+        self.registers = {}
+        self.threads = set()
+        self.closed = False
+        self.blocked = threading.Event()
+        self.blocked.set()
+    
+    def read_byte_data(self, addr, register):
+        self.blocked.wait()
+        self.threads.add(threading.current_thread())
+        return self.registers.get((addr, register), 0)
+    
+    def write_byte_data(self, addr, register, value):
+        self.blocked.wait()
+        self.threads.add(threading.current_thread())
+        self.registers[(addr, register)] = value
+    
+    def fail(self):
+        raise OSError(121, "Remote I/O error")
+    
+    def close(self):
+        self.closed = True
+
+
+def test_performs_requests_on_a_worker_thread_and_returns_futures():
+    master = FakeMaster()
+    
+    with AsyncI2CMaster(master=master) as bus:
+        writes = [bus.write_byte_data(0x20, n, n*2) for n in range(10)]
+        reads = [bus.read_byte_data(0x20, n) for n in range(10)]
+        
+        assert [f.result(timeout=5) for f in reads] == [n*2 for n in range(10)]
+        assert all(f.done() for f in writes)
+    
+    assert master.threads and threading.current_thread() not in master.threads
+
+
+def test_reports_errors_through_the_future():
+    with AsyncI2CMaster(master=FakeMaster()) as bus:
+        future = bus.submit(FakeMaster.fail)
+        
+        with pytest.raises(OSError):
+            future.result(timeout=5)
+
+
+def test_functions_are_called_with_the_master():
+    master = FakeMaster()
+    
+    with AsyncI2CMaster(master=master) as bus:
+        assert bus.submit(lambda m, x: (m, x), 1).result(timeout=5) == (master, 1)
+
+
+def test_submitting_waits_when_the_queue_is_full():
+    master = FakeMaster()
+    master.blocked.clear()
+    
+    with AsyncI2CMaster(master=master, queue_size=2) as bus:
+        first = bus.read_byte_data(0x20, 0)
+        while bus.pending:
+            pass
+        
+        bus.read_byte_data(0x20, 1)
+        bus.read_byte_data(0x20, 2)
+        assert bus.pending == 2
+        
+        submitted = threading.Event()
+        def submit():
+            bus.read_byte_data(0x20, 3)
+            submitted.set()
+        threading.Thread(target=submit).start()
+        
+        assert not submitted.wait(0.05)
+        
+        master.blocked.set()
+        assert submitted.wait(5)
+        assert first.result(timeout=5) == 0
+
+
+def test_can_be_awaited_in_a_coroutine_without_blocking_the_event_loop():
+    master = FakeMaster()
+    master.registers[(0x20, 0x12)] = 0xA5
+    
+    async def main():
+        with AsyncI2CMaster(master=master, queue_size=1) as bus:
+            results = await asyncio.gather(*[bus.call(FakeMaster.read_byte_data, 0x20, 0x12) for i in range(5)])
+            return results
+    
+    assert asyncio.run(asyncio.wait_for(main(), 5)) == [0xA5] * 5
+
+
+def test_closing_performs_pending_requests_but_does_not_close_a_master_it_was_given():
+    master = FakeMaster()
+    bus = AsyncI2CMaster(master=master)
+    futures = [bus.write_byte_data(0x20, n, 1) for n in range(5)]
+    
+    bus.close()
+    
+    assert all(f.done() for f in futures)
+    assert not master.closed
+    with pytest.raises(ValueError):
+        bus.read_byte_data(0x20, 0)
+
+
+def test_requests_racing_close_are_either_performed_or_rejected():
+    for attempt in range(20):
+        bus = AsyncI2CMaster(master=FakeMaster(), queue_size=2)
+        futures = []
+        rejected = []
+        
+        def submit():
+            for n in range(50):
+                try:
+                    futures.append(bus.read_byte_data(0x20, n))
+                except ValueError:
+                    rejected.append(n)
+        
+        submitters = [threading.Thread(target=submit) for i in range(4)]
+        for t in submitters:
+            t.start()
+        bus.close()
+        for t in submitters:
+            t.join(5)
+            assert not t.is_alive()
+        
+        assert all(f.done() for f in futures)
+        assert len(futures) + len(rejected) == 200
+
+
+def test_coroutines_racing_close_do_not_hang():
+    master = FakeMaster()
+    
+    async def main():
+        bus = AsyncI2CMaster(master=master, queue_size=1)
+        calls = [asyncio.ensure_future(bus.call(FakeMaster.read_byte_data, 0x20, n)) for n in range(20)]
+        await asyncio.sleep(0)
+        await asyncio.get_running_loop().run_in_executor(None, bus.close)
+        return await asyncio.gather(*calls, return_exceptions=True)
+    
+    results = asyncio.run(asyncio.wait_for(main(), 5))
+    
+    assert len(results) == 20
+    assert all(r == 0 or isinstance(r, ValueError) for r in results)
+
+
+def test_closing_is_not_blocked_by_a_submitter_waiting_for_room():
+    master = FakeMaster()
+    master.blocked.clear()
+    bus = AsyncI2CMaster(master=master, queue_size=1)
+    
+    bus.read_byte_data(0x20, 0)
+    while bus.pending:
+        pass
+    bus.read_byte_data(0x20, 1)
+    
+    errors = []
+    def submit():
+        try:
+            bus.read_byte_data(0x20, 2)
+        except ValueError as e:
+            errors.append(e)
+    waiting = threading.Thread(target=submit)
+    waiting.start()
+    waiting.join(0.05)
+    assert waiting.is_alive()
+    
+    closer = threading.Thread(target=bus.close)
+    closer.start()
+    waiting.join(5)
+    assert not waiting.is_alive() and len(errors) == 1
+    
+    master.blocked.set()
+    closer.join(5)
+    assert not closer.is_alive()
+
+
+def test_requests_can_submit_further_requests_when_the_queue_is_full():
+    with AsyncI2CMaster(master=FakeMaster(), queue_size=1) as bus:
+        def chain(master):
+            return [bus.read_byte_data(0x20, n) for n in range(3)]
+        
+        inner = bus.submit(chain).result(timeout=5)
+        
+        assert [f.result(timeout=5) for f in inner] == [0, 0, 0]
@@ -0,0 +1,66 @@
+
+import pytest
+import quick2wire.board_revision as board_revision
+from quick2wire.board_revision import revision, set_revision, revision_from_code, ENVIRONMENT_VARIABLE
+
+
+def setup_function(f):
+    set_revision(None)
+
+def teardown_function(f):
+    set_revision(None)
+
+
+def test_first_model_b_boards_are_revision_1():
+    assert revision_from_code("0002") == 1
+    assert revision_from_code("0003") == 1
+
+def test_warranty_bit_of_old_style_codes_is_ignored():
+    assert revision_from_code("1000002") == 1
+    assert revision_from_code("100000e") == 2
+
+def test_later_old_style_boards_are_revision_2():
+    for code in ["0004", "0006", "000d", "000f", "0010", "0012", "0013", "0015"]:
+        assert revision_from_code(code) == 2
+
+def test_new_style_codes_are_revision_2_whatever_their_last_digit():
+    for code in ["a02082", "a22082", "900092", "900093", "a020d3", "c03112", "2a02082"]:
+        assert revision_from_code(code) == 2
+
+def test_unparseable_codes_are_not_a_pi():
+    assert revision_from_code("") == 0
+    assert revision_from_code("not-hex") == 0
+
+
+def test_revision_can_be_overridden_by_the_environment(monkeypatch):
+    monkeypatch.setenv(ENVIRONMENT_VARIABLE, "1")
+
+    assert revision() == 1
+
+def test_invalid_revision_in_the_environment_is_reported(monkeypatch):
+    monkeypatch.setenv(ENVIRONMENT_VARIABLE, "7")
+
+    with pytest.raises(ValueError):
+        revision()
+
+def test_revision_is_detected_only_once(monkeypatch):
+    detections = []
+    def detect():
+        detections.append(1)
+        return 2
+    monkeypatch.setattr(board_revision, "_detect_revision", detect)
+
+    assert revision() == 2
+    assert revision() == 2
+    assert len(detections) == 1
+
+def test_revision_can_be_set_explicitly(monkeypatch):
+    monkeypatch.setenv(ENVIRONMENT_VARIABLE, "2")
+
+    set_revision(1)
+
+    assert revision() == 1
+
+def test_cannot_set_an_invalid_revision():
+    with pytest.raises(ValueError):
+        set_revision(3)
@@ -0,0 +1,149 @@
+
+import threading
+import time
+from quick2wire.buslock import BusLock, AddressStatistics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+    
+    def __call__(self):
+        return self.now
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def start_thread(fn):
+    thread = threading.Thread(target=fn)
+    thread.start()
+    return thread
+
+
+def test_records_wait_and_hold_times_per_address():
+    clock = FakeClock()
+    lock = BusLock(clock=clock)
+    
+    lock.acquire(0x20)
+    clock.now = 1000
+    lock.release()
+    
+    clock.now = 2000
+    lock.acquire(0x20)
+    clock.now = 5000
+    lock.release()
+    
+    lock.acquire(0x48)
+    lock.release()
+    
+    stats = lock.statistics()
+    assert set(stats) == {0x20, 0x48}
+    assert stats[0x20].transactions == 2
+    assert stats[0x20].total_hold_ns == 4000
+    assert stats[0x20].max_hold_ns == 3000
+    assert stats[0x20].mean_hold_ns == 2000
+    assert stats[0x20].total_wait_ns == 0
+    assert stats[0x48].transactions == 1
+
+
+def test_statistics_are_a_snapshot():
+    lock = BusLock()
+    lock.acquire(0x20)
+    lock.release()
+    
+    stats = lock.statistics()
+    lock.acquire(0x20)
+    lock.release()
+    
+    assert stats[0x20].transactions == 1
+    assert lock.statistics()[0x20].transactions == 2
+
+
+def test_statistics_can_be_reset():
+    lock = BusLock()
+    lock.acquire(0x20)
+    lock.release()
+    
+    lock.reset_statistics()
+    
+    assert lock.statistics() == {}
+
+
+def test_means_are_none_before_any_transactions():
+    stats = AddressStatistics()
+    
+    assert stats.mean_wait_ns is None
+    assert stats.mean_hold_ns is None
+    assert stats.mean_queue_depth is None
+
+
+def test_records_the_number_of_threads_already_waiting():
+    for fair in (False, True):
+        lock = BusLock(fair=fair)
+        lock.acquire(0x20)
+        
+        threads = []
+        for i in range(3):
+            threads.append(start_thread(lambda: (lock.acquire(0x21), lock.release())))
+            wait_until(lambda: lock.queue_depth == i+1)
+        
+        lock.release()
+        for thread in threads:
+            thread.join()
+        
+        stats = lock.statistics()[0x21]
+        assert stats.transactions == 3
+        assert stats.max_queue_depth == 2
+        assert stats.total_queue_depth == 0 + 1 + 2
+        assert stats.total_wait_ns > 0
+        assert lock.queue_depth == 0
+
+
+def test_fair_lock_grants_the_bus_in_the_order_it_was_asked_for():
+    lock = BusLock(fair=True)
+    order = []
+    
+    def transaction(name):
+        lock.acquire(0x20)
+        order.append(name)
+        lock.release()
+    
+    lock.acquire(0x20)
+    threads = []
+    for name in "abcde":
+        threads.append(start_thread(lambda name=name: transaction(name)))
+        wait_until(lambda: lock.queue_depth == len(threads))
+    lock.release()
+    
+    for thread in threads:
+        thread.join()
+    
+    assert order == list("abcde")
+
+
+def test_excludes_other_threads_while_held():
+    for fair in (False, True):
+        lock = BusLock(fair=fair)
+        holders = []
+        overlaps = []
+        
+        def transactions():
+            for i in range(200):
+                lock.acquire(0x20)
+                holders.append(1)
+                if len(holders) > 1:
+                    overlaps.append(1)
+                holders.pop()
+                lock.release()
+        
+        threads = [start_thread(transactions) for i in range(4)]
+        for thread in threads:
+            thread.join()
+        
+        assert overlaps == []
+        assert lock.statistics()[0x20].transactions == 800
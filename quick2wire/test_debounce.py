@@ -0,0 +1,98 @@
+
+from quick2wire.debounce import Debouncer
+from quick2wire.selector import Selector, Semaphore
+
+
+class FakePin:
+    """Signals an edge through a semaphore.  Reading the value consumes the signals, like reading a sysfs GPIO value file."""
+    
+    def __init__(self, value=0):
+        self.value = value
+        self.semaphore = Semaphore(blocking=False)
+    
+    def edge(self, value):
+        self.value = value
+        self.semaphore.signal()
+    
+    def get(self):
+        while self.semaphore.wait():
+            pass
+        return self.value
+    
+    def fileno(self):
+        return self.semaphore.fileno()
+    
+    def close(self):
+        self.semaphore.close()
+
+
+def setup_function(f):
+    global pin, debouncer, selector
+    pin = FakePin()
+    debouncer = Debouncer(pin, settle_time=0.02)
+    selector = Selector()
+    selector.add(debouncer)
+
+def teardown_function(f):
+    selector.close()
+    debouncer.close()
+    pin.close()
+
+
+def wait_for_update(timeout=1):
+    selector.wait(timeout)
+    assert selector.ready is debouncer
+    return debouncer.update()
+
+
+def test_reports_initial_value_of_pin_as_stable():
+    assert debouncer.value == 0
+
+
+def test_reports_change_only_after_settle_time():
+    pin.edge(1)
+    assert wait_for_update() == False
+    assert debouncer.value == 0
+    
+    assert wait_for_update() == True
+    assert debouncer.value == 1
+
+
+def test_collapses_burst_of_edges_into_one_change():
+    for v in [1, 0, 1, 0, 1]:
+        pin.edge(v)
+    
+    wakeups = 0
+    changed = False
+    while not changed:
+        changed = wait_for_update()
+        wakeups += 1
+    
+    assert debouncer.value == 1
+    assert wakeups == 2
+    assert debouncer.bursts == 1
+    assert debouncer.changes == 1
+
+
+def test_edges_during_settle_time_restart_the_settle_time():
+    pin.edge(1)
+    assert wait_for_update() == False
+    
+    pin.edge(0)
+    pin.edge(1)
+    assert wait_for_update() == False
+    assert wait_for_update() == True
+    assert debouncer.bursts == 1
+
+
+def test_does_not_report_a_burst_that_returns_to_the_stable_value():
+    pin.edge(1)
+    pin.edge(0)
+    
+    assert wait_for_update() == False
+    assert wait_for_update() == False
+    assert debouncer.value == 0
+    assert debouncer.changes == 0
+    
+    selector.wait(timeout=0.05)
+    assert selector.ready is None
@@ -0,0 +1,106 @@
+
+from array import array
+from quick2wire.edgecapture import EdgeCapture
+from quick2wire.selector import Selector, Semaphore, EDGE
+
+
+class FakePin:
+    __trigger__ = EDGE
+    
+    def __init__(self):
+        self.value = 0
+        self.semaphore = Semaphore(blocking=False)
+    
+    def get(self):
+        return self.value
+    
+    def fileno(self):
+        return self.semaphore.fileno()
+
+
+class FakeLineEvents:
+    def __init__(self):
+        self.events = []
+    
+    def read_events(self):
+        events, self.events = self.events, []
+        return events
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+    
+    def __call__(self):
+        self.now += 10
+        return self.now
+
+
+def test_records_time_and_value_of_each_capture():
+    pin = FakePin()
+    capture = EdgeCapture(pin, clock=FakeClock())
+    
+    pin.value = 1
+    capture.capture()
+    pin.value = 0
+    capture.capture()
+    
+    assert len(capture) == 2
+    assert capture.drain() == [(10, 1), (20, 0)]
+    assert len(capture) == 0
+
+
+def test_records_kernel_timestamps_of_line_events():
+    events = FakeLineEvents()
+    capture = EdgeCapture(events)
+    
+    events.events = [(1000, 1), (1500, 0)]
+    capture.capture()
+    
+    assert capture.drain() == [(1000, 1), (1500, 0)]
+
+
+def test_overwrites_oldest_events_and_counts_overflows_when_full():
+    capture = EdgeCapture(FakePin(), capacity=4)
+    
+    for t in range(6):
+        capture.record(t, t % 2)
+    
+    assert capture.overflows == 2
+    assert capture.drain() == [(2, 0), (3, 1), (4, 0), (5, 1)]
+
+
+def test_can_drain_in_batches_into_preallocated_buffers():
+    capture = EdgeCapture(FakePin(), capacity=8)
+    timestamps = array('q', [0]*3)
+    values = bytearray(3)
+    
+    for t in range(10, 15):
+        capture.record(t, 1)
+    
+    assert capture.drain_into(timestamps, values) == 3
+    assert list(timestamps) == [10, 11, 12]
+    assert capture.drain_into(timestamps, values) == 2
+    assert list(timestamps[:2]) == [13, 14]
+    assert capture.drain_into(timestamps, values) == 0
+
+
+def test_can_drain_a_limited_number_of_events():
+    capture = EdgeCapture(FakePin())
+    for t in range(5):
+        capture.record(t, 0)
+    
+    assert len(capture.drain(2)) == 2
+    assert len(capture) == 3
+
+
+def test_can_be_added_to_a_selector_in_place_of_its_pin():
+    pin = FakePin()
+    capture = EdgeCapture(pin)
+    
+    with Selector() as selector, pin.semaphore:
+        selector.add(capture)
+        pin.semaphore.signal()
+        
+        selector.wait(timeout=0)
+        assert selector.ready is capture
@@ -0,0 +1,99 @@
+
+from quick2wire.gpio import In, Both
+from quick2wire.selector import Selector
+from quick2wire.simulator.gpio import SimulatedGPIO
+from quick2wire.encoder import RotaryEncoder
+
+
+forward_sequence = [0b01, 0b11, 0b10, 0b00]
+backward_sequence = [0b10, 0b11, 0b01, 0b00]
+
+
+def setup_function(f):
+    global gpio, bank, a, b, encoder
+    gpio = SimulatedGPIO()
+    bank = gpio.bank()
+    a = bank.pin(5, direction=In, interrupt=Both)
+    b = bank.pin(6, direction=In, interrupt=Both)
+    bank.open_all([a, b])
+    encoder = RotaryEncoder(a, b)
+
+def teardown_function(f):
+    encoder.close()
+    gpio.close()
+
+
+def turn(states):
+    for state in states:
+        gpio.line(5).value = state & 1
+        gpio.line(6).value = (state >> 1) & 1
+        encoder.update()
+
+
+def test_counts_steps_forward():
+    turn(forward_sequence * 2)
+    
+    assert encoder.position == 8
+    assert encoder.detents == 2
+    assert encoder.direction == 1
+    assert encoder.forward == 8
+    assert encoder.backward == 0
+
+
+def test_counts_steps_backward():
+    turn(backward_sequence)
+    
+    assert encoder.position == -4
+    assert encoder.detents == -1
+    assert encoder.direction == -1
+    assert encoder.backward == 4
+
+
+def test_ignores_contact_bounce_within_a_step():
+    turn([0b01, 0b00, 0b01, 0b11, 0b01, 0b11, 0b10, 0b00])
+    
+    assert encoder.position == 4
+
+
+def test_counts_skipped_states_as_invalid_and_assumes_the_same_direction():
+    turn([0b01, 0b11])
+    encoder.step(0b00)
+    
+    assert encoder.invalid == 1
+    assert encoder.position == 4
+
+
+def test_is_ready_in_a_selector_when_a_channel_changes():
+    with Selector() as selector:
+        selector.add(encoder)
+        
+        selector.wait(timeout=0)
+        assert selector.ready is None
+        
+        gpio.line(5).value = 1
+        selector.wait(timeout=0)
+        assert selector.ready is encoder
+        
+        assert encoder.update() == 1
+        
+        selector.wait(timeout=0)
+        assert selector.ready is None
+
+
+def test_reset_sets_position_to_zero():
+    turn(forward_sequence)
+    
+    encoder.reset()
+    
+    assert encoder.position == 0
+    assert encoder.forward == 0
+
+
+def test_does_not_acknowledge_the_edges_of_other_pins_of_the_bank():
+    other = bank.pin(7, direction=In, interrupt=Both)
+    with other:
+        gpio.line(7).value = 1
+        turn(forward_sequence)
+        
+        assert gpio.line(7).pending
+        assert encoder.position == 4
@@ -1,6 +1,9 @@
 
 import os
-from quick2wire.gpio import pins, In, Out, PullDown, gpio_admin
+import subprocess
+import quick2wire.gpio
+from quick2wire.gpio import pins, PinBank, PinBankAPI, PinAPI, PinGroup, SysfsExporter, BatchedGPIOAdminExporter, In, Out, Both, PullDown, gpio_admin, lookup, map_with
+from quick2wire.simulator.gpio import SimulatedGPIO
 import pytest
 
 
@@ -40,6 +43,22 @@ class TestGPIO:
         assert not os.path.exists('/sys/class/gpio/gpio17/value')
     
     
+    def test_can_open_and_close_many_pins_of_a_bank_together(self):
+        p0, p1 = pins.pin(0), pins.pin(1)
+        
+        pins.open_all([p0, p1])
+        try:
+            assert os.path.exists('/sys/class/gpio/gpio17/value')
+            assert os.path.exists('/sys/class/gpio/gpio18/value')
+            p0.value
+            p1.value
+        finally:
+            pins.close_all([p0, p1])
+        
+        assert not os.path.exists('/sys/class/gpio/gpio17/value')
+        assert not os.path.exists('/sys/class/gpio/gpio18/value')
+    
+    
     def test_can_set_and_query_direction_of_pin_when_open(self):
         with pins.pin(0) as pin:
             pin.direction = Out
@@ -95,6 +114,215 @@ class TestGPIO:
         with pytest.raises(IndexError):
             pins.pin(len(pins))
 
+
+
+def test_pin_bank_looks_up_soc_pin_numbers_in_a_sequence():
+    bank = PinBank([17, 18, 27])
+    
+    assert bank.pin(0).soc_pin_number == 17
+    assert bank.pin(2).soc_pin_number == 27
+    
+    with pytest.raises(IndexError):
+        bank.pin(-1)
+    
+    with pytest.raises(IndexError):
+        bank.pin(3)
+
+
+def test_pin_bank_looks_up_soc_pin_numbers_in_a_sparse_dict():
+    bank = PinBank({3: 2, 5: 3, 7: 4})
+    
+    assert bank.pin(3).soc_pin_number == 2
+    assert bank.pin(7).soc_pin_number == 4
+    
+    for invalid_index in [-1, 0, 4, 8]:
+        with pytest.raises(IndexError):
+            bank.pin(invalid_index)
+
+
+def test_pin_bank_maps_indices_with_a_function():
+    bank = PinBank(lambda i: i + 100)
+    
+    assert bank.pin(5).soc_pin_number == 105
+
+
+def test_looks_up_soc_pin_numbers_with_map_with_and_lookup():
+    header = {3: 2, 5: 3, 7: 4}
+    
+    assert lookup(header, 5) == 3
+    assert map_with(header)(7) == 4
+    assert map_with([17, 18])(1) == 18
+    
+    for invalid_index in [-1, 0, 4, 8]:
+        with pytest.raises(IndexError):
+            lookup(header, invalid_index)
+        with pytest.raises(IndexError):
+            map_with(header)(invalid_index)
+
+
+def test_pin_builds_sysfs_paths_from_its_soc_pin_number():
+    pin = PinBank([17]).pin(0)
+    
+    assert pin._pin_path("value") == "/sys/devices/virtual/gpio/gpio17/value"
+    assert pin._pin_path("direction") == "/sys/devices/virtual/gpio/gpio17/direction"
+
+
+def test_pins_are_found_in_the_sysfs_root_of_the_bank_exporter():
+    pin = PinBank([17], exporter=SysfsExporter("/tmp/gpio")).pin(0)
+    
+    assert pin._pin_path("value") == "/tmp/gpio/gpio17/value"
+
+
+def test_sysfs_exporter_unexports_pins_it_exported_if_it_cannot_export_them_all(tmp_path):
+    exporter = SysfsExporter(str(tmp_path))
+    
+    with pytest.raises(ValueError):
+        exporter.export_all([(4, None), (5, PullDown)])
+    
+    assert (tmp_path / "export").read_text() == "4"
+    assert (tmp_path / "unexport").read_text() == "4"
+
+
+def test_batched_exporter_unexports_pins_it_exported_if_it_cannot_export_them_all(monkeypatch):
+    commands = []
+    def fake_command(subcommand, pin, pull=None):
+        commands.append((subcommand, pin))
+        return ["sh", "-c", "exit 1" if pin == 5 else "exit 0"]
+    monkeypatch.setattr(quick2wire.gpio, "_gpio_admin_command", fake_command)
+    
+    with pytest.raises(subprocess.CalledProcessError):
+        BatchedGPIOAdminExporter().export_all([(4, None), (5, None), (6, None)])
+    
+    assert sorted(c for c in commands if c[0] == "unexport") == [("unexport", 4), ("unexport", 6)]
+
+
+
+class FakeBank(PinBankAPI):
+    single_read = True
+    
+    def __init__(self):
+        self.values = 0
+        self.writes = []
+        self.reads = 0
+    
+    def pin(self, n):
+        return FakePin(self, n)
+    
+    def read(self):
+        self.reads += 1
+        return self.values
+    
+    def write(self, mask, values):
+        self.writes.append((mask, values))
+        self.values = (self.values & ~mask) | (values & mask)
+
+
+class FakePin(PinAPI):
+    def __init__(self, bank, index):
+        super(FakePin,self).__init__(bank, index)
+        self.sets = []
+    
+    def open(self):
+        pass
+    
+    def close(self):
+        pass
+    
+    def get(self):
+        return (self.bank.values >> self.index) & 1
+    
+    def set(self, new_value):
+        self.sets.append(new_value)
+
+
+def test_pin_group_writes_each_bank_once_with_the_pins_mapped_to_bank_bits():
+    a, b = FakeBank(), FakeBank()
+    group = PinGroup([a.pin(4), a.pin(5), b.pin(0), a.pin(1)])
+    
+    group.value = 0b1011
+    
+    assert a.writes == [(0b110010, 0b110010)]
+    assert b.writes == [(0b1, 0b0)]
+
+
+def test_pin_group_only_writes_pins_that_have_changed():
+    bank = FakeBank()
+    group = PinGroup([bank.pin(i) for i in range(8)])
+    
+    group.value = 0b10101010
+    group.value = 0b10101011
+    group.value = 0b10101011
+    
+    assert bank.writes == [(0xFF, 0b10101010), (0b1, 0b1)]
+
+
+def test_pin_group_can_write_selected_pins():
+    bank = FakeBank()
+    group = PinGroup([bank.pin(i) for i in range(4)])
+    
+    group.value = 0
+    group.write(0b0110, 0b1111)
+    group.write(0b0011, 0b0001)
+    
+    assert bank.writes == [(0b1111, 0), (0b0110, 0b0110), (0b0011, 0b0001)]
+    assert bank.values == 0b0101
+
+
+def test_pin_group_writes_every_pin_after_forgetting_the_last_value():
+    bank = FakeBank()
+    group = PinGroup([bank.pin(i) for i in range(2)])
+    
+    group.value = 0b11
+    group.forget()
+    group.value = 0b11
+    
+    assert bank.writes == [(0b11, 0b11), (0b11, 0b11)]
+
+
+def test_pin_group_reads_each_bank_once():
+    a, b = FakeBank(), FakeBank()
+    a.values = 0b100
+    b.values = 0b011
+    group = PinGroup([b.pin(1), a.pin(2), a.pin(3), b.pin(0)])
+    
+    assert group.value == 0b1011
+    assert a.reads == 1
+    assert b.reads == 1
+
+
+def test_pin_group_reads_only_its_own_pins_of_a_sysfs_bank():
+    with SimulatedGPIO() as gpio:
+        bank = gpio.bank()
+        with bank.pin(3, In) as p3, bank.pin(4, In) as p4, bank.pin(5, In, interrupt=Both) as other:
+            gpio.line(5).value = 1
+            gpio.line(4).value = 1
+            
+            assert PinGroup([p3, p4]).value == 0b10
+            assert gpio.line(5).pending
+
+
+def test_pin_group_sets_pins_of_banks_without_bulk_writes_individually():
+    class PinsOnly(PinBankAPI):
+        pass
+    
+    p0, p1 = FakePin(PinsOnly(), 0), FakePin(None, 7)
+    group = PinGroup([p0, p1])
+    
+    group.value = 0b10
+    
+    assert p0.sets == [0]
+    assert p1.sets == [1]
+
+
+def test_pin_group_drives_pi_pins():
+    with SimulatedGPIO() as gpio:
+        bank = gpio.bank()
+        with PinGroup([bank.pin(i, Out) for i in (22, 23, 24)]) as group:
+            group.value = 0b101
+            
+            assert [gpio.line(i).value for i in (22, 23, 24)] == [1, 0, 1]
+            assert group.value == 0b101
+
         
 def content_of(filename):
     with open(filename, 'r') as f:
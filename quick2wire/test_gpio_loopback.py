@@ -29,6 +29,22 @@ def test_gpio_loopback_by_header_pin():
     assert_outputs_seen_at_corresponding_inputs(pi_header_1, [(11,12), (13,15), (16,18)])
 
 
+@pytest.mark.loopback
+@pytest.mark.gpio
+def test_gpio_loopback_by_bank():
+    outputs = [pins.pin(i, direction=Out) for i in (0, 2, 4)]
+    inputs = [pins.pin(i, direction=In) for i in (1, 3, 5)]
+    output_mask = 0b010101
+    
+    pins.open_all(outputs + inputs)
+    try:
+        for values in [0b010101, 0b000000, 0b010001, 0b000100]:
+            pins.write(output_mask, values)
+            assert pins.read() == values | (values << 1)
+    finally:
+        pins.close_all(outputs + inputs)
+
+
 def assert_outputs_seen_at_corresponding_inputs(pin_bank, topology):
     for (op, ip) in topology:
         assert_output_seen_at_input(pin_bank, op, ip)
@@ -0,0 +1,165 @@
+
+import os
+from quick2wire.gpio import In, Out, Rising, Both, PullUp
+from quick2wire.gpiochip import GPIOChip
+from quick2wire.gpiochip_ctypes import *
+from quick2wire.selector import Selector
+import pytest
+
+
+class FakeGPIOChipDevice:
+    """Stands in for the kernel side of /dev/gpiochipN."""
+    
+    def __init__(self, line_count=54):
+        self.line_count = line_count
+        self.levels = [0]*line_count
+        self.requests = []
+        self.handles = {}
+        self.event_writers = {}
+        self.ioctl_count = 0
+    
+    def ioctl(self, fd, request, arg):
+        self.ioctl_count += 1
+        
+        if request == GPIO_GET_CHIPINFO_IOCTL:
+            arg.name = b"gpiochip0"
+            arg.label = b"fake"
+            arg.lines = self.line_count
+        
+        elif request == GPIO_GET_LINEHANDLE_IOCTL:
+            self.requests.append(arg)
+            offsets = list(arg.lineoffsets[:arg.lines])
+            if arg.flags & GPIOHANDLE_REQUEST_OUTPUT:
+                for i, offset in enumerate(offsets):
+                    self.levels[offset] = arg.default_values[i]
+            arg.fd = self._new_fd(offsets)
+        
+        elif request == GPIO_GET_LINEEVENT_IOCTL:
+            self.requests.append(arg)
+            r, w = os.pipe()
+            self.handles[r] = [arg.lineoffset]
+            self.event_writers[arg.lineoffset] = w
+            arg.fd = r
+        
+        elif request == GPIOHANDLE_GET_LINE_VALUES_IOCTL:
+            for i, offset in enumerate(self.handles[fd]):
+                arg.values[i] = self.levels[offset]
+        
+        elif request == GPIOHANDLE_SET_LINE_VALUES_IOCTL:
+            for i, offset in enumerate(self.handles[fd]):
+                self.levels[offset] = arg.values[i]
+        
+        else:
+            raise OSError("unexpected ioctl " + hex(request))
+    
+    def _new_fd(self, offsets):
+        fd = os.open("/dev/null", os.O_RDONLY)
+        self.handles[fd] = offsets
+        return fd
+    
+    def edge(self, offset, timestamp, value):
+        self.levels[offset] = value
+        event = gpioevent_data(timestamp=timestamp, id=GPIOEVENT_EVENT_RISING_EDGE if value else GPIOEVENT_EVENT_FALLING_EDGE)
+        os.write(self.event_writers[offset], bytes(event))
+    
+    def close(self):
+        for w in self.event_writers.values():
+            os.close(w)
+
+
+def setup_function(f):
+    global device, chip
+    device = FakeGPIOChipDevice()
+    chip = GPIOChip(path="/dev/null", ioctl=device.ioctl)
+
+def teardown_function(f):
+    chip.close()
+    device.close()
+
+
+def test_reports_chip_info():
+    info = chip.info()
+    
+    assert info.name == b"gpiochip0"
+    assert info.lines == 54
+
+
+def test_requests_many_lines_in_one_handle():
+    with chip.request_lines([17, 18, 27], Out, values=0b101, pull=PullUp, label="test") as lines:
+        request = device.requests[0]
+        assert request.lines == 3
+        assert list(request.lineoffsets[:3]) == [17, 18, 27]
+        assert request.flags == GPIOHANDLE_REQUEST_OUTPUT|GPIOHANDLE_REQUEST_BIAS_PULL_UP
+        assert list(request.default_values[:3]) == [1, 0, 1]
+        assert request.consumer_label == b"test"
+        
+        assert len(lines) == 3
+        assert lines.offsets == (17, 18, 27)
+
+
+def test_reads_all_lines_with_one_ioctl():
+    with chip.request_lines([4, 5, 6, 7], In) as lines:
+        device.levels[5] = 1
+        device.levels[7] = 1
+        
+        count_before = device.ioctl_count
+        assert lines.read() == 0b1010
+        assert device.ioctl_count == count_before + 1
+
+
+def test_writes_selected_lines_with_one_ioctl_and_leaves_others_unchanged():
+    with chip.request_lines([4, 5, 6], Out, values=0b001) as lines:
+        count_before = device.ioctl_count
+        lines.write(0b110, 0b010)
+        
+        assert device.ioctl_count == count_before + 1
+        assert device.levels[4:7] == [1, 1, 0]
+
+
+def test_cannot_write_to_input_lines():
+    with chip.request_lines([4], In) as lines:
+        with pytest.raises(ValueError):
+            lines.write(1, 1)
+
+
+def test_cannot_use_closed_handle():
+    lines = chip.request_lines([4], In)
+    lines.close()
+    
+    with pytest.raises(IOError):
+        lines.read()
+
+
+def test_lines_of_a_handle_can_be_used_as_pins():
+    with chip.request_lines([4, 5], Out) as lines:
+        lines.pin(1).value = 1
+        assert device.levels[4:6] == [0, 1]
+        assert lines.pin(1).value == 1
+        assert lines.pin(0).value == 0
+        assert lines.pin(1).direction == Out
+
+
+def test_reads_timestamped_edge_events():
+    with chip.request_events(17, Both) as events:
+        assert device.requests[0].eventflags == GPIOEVENT_REQUEST_BOTH_EDGES
+        
+        device.edge(17, 1000, 1)
+        device.edge(17, 2500, 0)
+        device.edge(17, 4000, 1)
+        
+        assert events.read_event() == (1000, 1)
+        assert events.read_events() == [(2500, 0), (4000, 1)]
+        assert events.value == 1
+
+
+def test_edge_events_can_be_added_to_a_selector():
+    with chip.request_events(17, Rising) as events, Selector() as selector:
+        selector.add(events)
+        
+        selector.wait(timeout=0)
+        assert selector.ready is None
+        
+        device.edge(17, 1000, 1)
+        
+        selector.wait(timeout=0)
+        assert selector.ready is events
@@ -0,0 +1,140 @@
+
+import os
+import struct
+from tempfile import NamedTemporaryFile
+from quick2wire.gpio import In, Out
+from quick2wire.gpiomem import MemoryMappedPinBank, GPIORegisters, GPFSEL0, GPSET0, GPCLR0, GPLEV0
+import pytest
+
+
+def setup_function(f):
+    global register_file, bank
+    
+    register_file = NamedTemporaryFile()
+    register_file.write(bytes(4096))
+    register_file.flush()
+    
+    bank = MemoryMappedPinBank(lambda p: p, path=register_file.name)
+
+def teardown_function(f):
+    register_file.close()
+
+
+def register(offset):
+    with open(register_file.name, "rb") as f:
+        f.seek(offset)
+        return struct.unpack("I", f.read(4))[0]
+
+def set_register(offset, value):
+    with open(register_file.name, "r+b") as f:
+        f.seek(offset)
+        f.write(struct.pack("I", value))
+
+
+def test_pin_must_be_opened_before_use_and_is_unusable_after_being_closed():
+    pin = bank.pin(17)
+    
+    with pytest.raises(IOError):
+        pin.value
+    
+    with pin:
+        pin.value
+    
+    with pytest.raises(IOError):
+        pin.value
+
+
+def test_selects_pin_function_from_direction_when_opened():
+    with bank.pin(17, direction=Out):
+        assert register(GPFSEL0 + 4) == 0b001 << 21
+    
+    assert register(GPFSEL0 + 4) == 0
+
+
+def test_can_change_direction_of_open_pin():
+    with bank.pin(4, direction=In) as pin:
+        assert register(GPFSEL0) == 0
+        
+        pin.direction = Out
+        assert pin.direction == Out
+        assert register(GPFSEL0) == 0b001 << 12
+
+
+def test_setting_value_writes_to_set_and_clear_registers():
+    with bank.pin(35, direction=Out) as pin:
+        pin.value = 1
+        assert register(GPSET0 + 4) == 1 << 3
+        
+        pin.value = 0
+        assert register(GPCLR0 + 4) == 1 << 3
+
+
+def test_cannot_set_value_of_input_pin():
+    with bank.pin(17, direction=In) as pin:
+        with pytest.raises(ValueError):
+            pin.value = 1
+
+
+def test_reads_value_from_level_register():
+    with bank.pin(17) as pin:
+        assert pin.value == 0
+        
+        set_register(GPLEV0, 1 << 17)
+        assert pin.value == 1
+
+
+def test_does_not_support_interrupts_or_pull():
+    with pytest.raises(ValueError):
+        bank.pin(17, interrupt="both")
+    
+    with pytest.raises(ValueError):
+        bank.pin(17, pull="pullup")
+
+
+def test_registers_are_mapped_while_any_pin_is_open():
+    p1 = bank.pin(17)
+    p2 = bank.pin(18)
+    
+    p1.open()
+    p2.open()
+    
+    p1.close()
+    assert not bank._registers.closed
+    
+    p2.close()
+    assert bank._registers.closed
+
+
+def test_reads_values_of_all_open_pins_as_a_bitmask():
+    with bank.pin(2) as p2, bank.pin(3) as p3, bank.pin(40) as p40:
+        set_register(GPLEV0, (1 << 3) | (1 << 5))
+        set_register(GPLEV0 + 4, 1 << 8)
+        
+        assert bank.read() == (1 << 3) | (1 << 40)
+
+
+def test_writes_values_of_many_output_pins_with_one_write_to_each_register():
+    with bank.pin(2, Out), bank.pin(3, Out), bank.pin(4, Out), bank.pin(33, Out):
+        bank.write((1 << 2)|(1 << 3)|(1 << 33), (1 << 2)|(1 << 33))
+        
+        assert register(GPSET0) == 1 << 2
+        assert register(GPSET0 + 4) == 1 << 1
+        assert register(GPCLR0) == 1 << 3
+        assert register(GPCLR0 + 4) == 0
+
+
+def test_cannot_bulk_write_to_pins_that_are_not_open_outputs():
+    with bank.pin(2, In):
+        with pytest.raises(ValueError):
+            bank.write(1 << 2, 1 << 2)
+        
+        with pytest.raises(IOError):
+            bank.write(1 << 3, 1 << 3)
+
+
+def test_can_read_and_write_registers_directly():
+    with GPIORegisters(register_file.name) as registers:
+        registers.write(GPSET0, 0xF0)
+        assert registers.read(GPSET0) == 0xF0
+    
+    assert register(GPSET0) == 0xF0
@@ -0,0 +1,550 @@
+
+import errno
+import os
+import threading
+import pytest
+from array import array
+from ctypes import create_string_buffer, memmove
+import quick2wire.i2c as i2c
+from quick2wire.i2c import I2CMaster, reading, reading_into, writing_bytes
+from quick2wire.i2c_retry import RetryPolicy
+from quick2wire.i2c_ctypes import *
+
+
+class FakeBus:
+    """Records the messages of each I2C_RDWR ioctl and fills read buffers with the next reply.
+    
+    SMBus ioctls access the registers of the fake devices in the
+    registers dictionary, which maps an address to a bytearray.
+    """
+    
+    O_RDWR = os.O_RDWR
+    
+    def __init__(self):
+        self.transactions = []
+        self.replies = []
+        self.registers = {}
+        self.ioctls = []
+        self.failures = []
+        self.settings = {}
+    
+    def open(self, path, flags):
+        self.path = path
+        return 99
+    
+    def close(self, fd):
+        pass
+    
+    def ioctl(self, fd, request, arg):
+        self.ioctls.append(request)
+        
+        if request == I2C_SLAVE:
+            self.address = arg
+            return 0
+        elif request in (I2C_RETRIES, I2C_TIMEOUT):
+            self.settings[request] = arg
+            return 0
+        elif self.failures:
+            error = self.failures.pop(0)
+            raise OSError(error, os.strerror(error))
+        elif request == I2C_SMBUS:
+            return self.smbus(arg)
+        
+        assert request == I2C_RDWR
+        
+        msgs = []
+        for i in range(arg.nmsgs):
+            m = arg.msgs[i]
+            if m.flags & I2C_M_RD:
+                reply = self.replies.pop(0)
+                memmove(m.buf, reply, m.len)
+                msgs.append((m.addr, "read", m.len))
+            else:
+                msgs.append((m.addr, "write", i2c.string_at(m.buf, m.len)))
+        self.transactions.append(msgs)
+        return 0
+    
+    def smbus(self, arg):
+        registers = self.registers[self.address]
+        data = arg.data.contents
+        reading = arg.read_write == I2C_SMBUS_READ
+        
+        if arg.size == I2C_SMBUS_QUICK:
+            pass
+        elif arg.size == I2C_SMBUS_BYTE:
+            if reading:
+                data.byte = registers[0]
+            else:
+                registers[0] = arg.command
+        elif arg.size == I2C_SMBUS_BYTE_DATA:
+            if reading:
+                data.byte = registers[arg.command]
+            else:
+                registers[arg.command] = data.byte
+        elif arg.size == I2C_SMBUS_WORD_DATA:
+            if reading:
+                data.word = registers[arg.command] | (registers[arg.command+1] << 8)
+            else:
+                registers[arg.command:arg.command+2] = data.word.to_bytes(2, "little")
+        elif arg.size == I2C_SMBUS_I2C_BLOCK_DATA and reading:
+            n = data.block[0]
+            data.block[1:n+1] = registers[arg.command:arg.command+n]
+        else:
+            raise OSError(95, "unsupported SMBus transaction")
+        return 0
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    fake = FakeBus()
+    monkeypatch.setattr(i2c, "posix", fake)
+    monkeypatch.setattr(i2c, "ioctl", fake.ioctl)
+    return fake
+
+
+def test_transaction_returns_the_data_read(bus):
+    bus.replies = [b"\x12\x34"]
+    
+    with I2CMaster(1) as master:
+        results = master.transaction(
+            writing_bytes(0x20, 0x09),
+            reading(0x20, 2))
+    
+    assert results == [b"\x12\x34"]
+    assert bus.transactions == [[(0x20, "write", b"\x09"), (0x20, "read", 2)]]
+
+
+def test_transaction_can_return_the_data_read_without_copying_it(bus):
+    bus.replies = [b"\x12\x34\x56"]
+    buf = bytearray(3)
+    
+    with I2CMaster(1) as master:
+        results = master.transaction(
+            writing_bytes(0x50, 0x00),
+            reading_into(0x50, buf),
+            copy=False)
+    
+    assert buf == bytearray(b"\x12\x34\x56")
+    assert isinstance(results[0], memoryview)
+    assert results[0].obj is buf
+    assert results[0] == b"\x12\x34\x56"
+
+
+def test_data_read_without_copying_it_is_viewed_as_bytes(bus):
+    bus.replies = [b"\x01\x02"]
+    
+    with I2CMaster(1) as master:
+        results = master.transaction(reading(0x50, 2), copy=False)
+    
+    assert results[0].format == "B"
+    assert results[0].tolist() == [1, 2]
+
+
+def test_can_read_into_any_writable_buffer(bus):
+    bus.replies = [bytes([1, 0, 2, 0])]
+    words = array("H", [0, 0])
+    
+    with I2CMaster(1) as master:
+        master.transaction(reading_into(0x50, words))
+    
+    assert bus.transactions == [[(0x50, "read", 4)]]
+    assert words.tobytes() == bytes([1, 0, 2, 0])
+
+
+def test_cannot_read_into_a_read_only_buffer(bus):
+    with pytest.raises(TypeError):
+        reading_into(0x50, bytes(4))
+
+
+def test_compiled_transaction_can_be_performed_repeatedly(bus):
+    bus.replies = [b"\x01", b"\x02"]
+    
+    with I2CMaster(1) as master:
+        read_register = master.compile(
+            writing_bytes(0x20, 0x09),
+            reading(0x20, 1))
+        
+        assert list(read_register()[0]) == [0x01]
+        assert list(read_register()[0]) == [0x02]
+    
+    assert len(bus.transactions) == 2
+    assert bus.transactions[0] == bus.transactions[1]
+
+
+def test_compiled_transaction_returns_the_same_buffers_every_time(bus):
+    bus.replies = [b"\x01\x02", b"\x03\x04"]
+    
+    with I2CMaster(1) as master:
+        transaction = master.compile(reading(0x20, 2))
+        
+        first = transaction()
+        second = transaction()
+    
+    assert first is second
+    assert first[0] == bytearray(b"\x03\x04")
+
+
+def test_data_written_by_a_compiled_transaction_can_be_patched_in_place(bus):
+    bus.replies = [b"\x00", b"\x00"]
+    
+    with I2CMaster(1) as master:
+        read_register = master.compile(
+            writing_bytes(0x20, 0x09),
+            reading(0x20, 1))
+        
+        read_register()
+        read_register.buffers[0][0] = 0x13
+        read_register()
+    
+    assert bus.transactions[0][0] == (0x20, "write", b"\x09")
+    assert bus.transactions[1][0] == (0x20, "write", b"\x13")
+
+
+def test_compiled_transaction_reads_into_a_ctypes_buffer(bus):
+    bus.replies = [b"\x01\x02", b"\x03\x04"]
+    buf = create_string_buffer(2)
+    
+    with I2CMaster(1) as master:
+        transaction = master.compile(reading_into(0x50, buf))
+        
+        assert transaction()[0] is buf
+        assert buf.raw == b"\x01\x02"
+        
+        transaction()
+        assert buf.raw == b"\x03\x04"
+
+
+def test_buffers_of_a_compiled_transaction_cannot_be_resized(bus):
+    with I2CMaster(1) as master:
+        transaction = master.compile(writing_bytes(0x20, 0x09))
+        
+        with pytest.raises(BufferError):
+            transaction.buffers[0].append(0)
+
+
+def test_reads_and_writes_registers_with_smbus_transactions(bus):
+    bus.registers[0x20] = bytearray(range(16))
+    
+    with I2CMaster(1) as master:
+        assert master.read_byte_data(0x20, 0x05) == 0x05
+        master.write_byte_data(0x20, 0x05, 0xAA)
+        assert master.read_byte_data(0x20, 0x05) == 0xAA
+        
+        assert master.read_word_data(0x20, 0x02) == 0x0302
+        master.write_word_data(0x20, 0x02, 0x1234)
+        assert bus.registers[0x20][2:4] == b"\x34\x12"
+        
+        assert master.read_i2c_block_data(0x20, 0x08, 4) == bytes([8, 9, 10, 11])
+    
+    assert bus.transactions == []
+
+
+def test_sends_and_receives_bytes_with_smbus_transactions(bus):
+    bus.registers[0x48] = bytearray(1)
+    
+    with I2CMaster(1) as master:
+        master.write_byte(0x48, 0x42)
+        assert master.read_byte(0x48) == 0x42
+        master.write_quick(0x48)
+
+
+def test_selects_the_slave_address_only_when_it_changes(bus):
+    bus.registers[0x20] = bytearray(16)
+    bus.registers[0x21] = bytearray(16)
+    
+    with I2CMaster(1) as master:
+        master.read_byte_data(0x20, 0)
+        master.read_byte_data(0x20, 1)
+        master.read_byte_data(0x21, 0)
+        master.read_byte_data(0x21, 1)
+    
+    assert bus.ioctls == [I2C_SLAVE, I2C_SMBUS, I2C_SMBUS, I2C_SLAVE, I2C_SMBUS, I2C_SMBUS]
+
+
+def test_block_reads_are_limited_to_the_smbus_block_size(bus):
+    with I2CMaster(1) as master:
+        with pytest.raises(ValueError):
+            master.read_i2c_block_data(0x20, 0, I2C_SMBUS_BLOCK_MAX+1)
+
+
+def test_batch_routes_register_reads_to_their_callers(bus):
+    bus.replies = [b"\x01", b"\x02\x03", b"\x04"]
+    
+    with I2CMaster(1) as master:
+        batch = master.batch()
+        a = batch.read_register(0x20, 0x12)
+        b = batch.read_register(0x21, 0x12, 2)
+        c = batch.read_register(0x48, 0x00)
+        
+        batch()
+    
+    assert (a, b, c) == (b"\x01", b"\x02\x03", b"\x04")
+    assert bus.transactions == [[
+        (0x20, "write", b"\x12"), (0x20, "read", 1),
+        (0x21, "write", b"\x12"), (0x21, "read", 2),
+        (0x48, "write", b"\x00"), (0x48, "read", 1)]]
+
+
+def test_batch_packs_reads_into_as_few_ioctls_as_the_message_limit_allows(bus):
+    bus.replies = [bytes([n]) for n in range(30)]
+    
+    with I2CMaster(1) as master:
+        batch = master.batch()
+        results = [batch.read_register(0x20 + n, 0) for n in range(30)]
+        
+        assert batch.ioctl_count == 2
+        batch()
+    
+    assert [len(t) for t in bus.transactions] == [I2C_RDWR_IOCTL_MAX_MSGS, 60 - I2C_RDWR_IOCTL_MAX_MSGS]
+    assert [r[0] for r in results] == list(range(30))
+
+
+def test_batch_does_not_split_the_messages_of_a_read(bus):
+    bus.replies = [b"\x00"] * 3
+    
+    with I2CMaster(1) as master:
+        batch = master.batch(max_msgs=5)
+        for n in range(3):
+            batch.read_register(0x20, n)
+        
+        batch()
+    
+    assert [len(t) for t in bus.transactions] == [4, 2]
+
+
+def test_batch_calls_callbacks_after_performing_the_reads(bus):
+    bus.replies = [b"\x01", b"\x02", b"\x03", b"\x04"]
+    received = []
+    
+    with I2CMaster(1) as master:
+        batch = master.batch()
+        batch.read_register(0x20, 0, callback=lambda buf: received.append(("a", buf[0])))
+        batch.read_register(0x21, 0, callback=lambda buf: received.append(("b", buf[0])))
+        
+        batch()
+        batch()
+    
+    assert received == [("a", 1), ("b", 2), ("a", 3), ("b", 4)]
+
+
+def test_batch_can_perform_arbitrary_groups_of_messages(bus):
+    bus.replies = [b"\x7F"]
+    buf = bytearray(1)
+    
+    with I2CMaster(1) as master:
+        batch = master.batch()
+        batch.add(writing_bytes(0x20, 0x00, 0xFF))
+        batch.add(writing_bytes(0x48, 0x40), reading_into(0x48, buf))
+        
+        batch()
+    
+    assert buf == b"\x7F"
+    assert len(bus.transactions) == 1
+
+
+def test_batch_rejects_groups_larger_than_the_message_limit(bus):
+    with I2CMaster(1) as master:
+        batch = master.batch(max_msgs=2)
+        
+        with pytest.raises(ValueError):
+            batch.add(*[writing_bytes(0x20, n) for n in range(3)])
+
+
+def test_thread_safe_master_records_statistics_per_address(bus):
+    bus.replies = [b"\x00"]
+    bus.registers[0x48] = bytearray(4)
+    
+    with I2CMaster(1, thread_safe=True, fair=True) as master:
+        master.transaction(writing_bytes(0x20, 0x00), reading(0x20, 1))
+        master.write_byte_data(0x48, 1, 2)
+        master.read_byte_data(0x48, 1)
+        
+        stats = master.statistics()
+    
+    assert stats[0x20].transactions == 1
+    assert stats[0x48].transactions == 2
+
+
+def test_thread_safe_master_serialises_transactions_from_many_threads(bus, monkeypatch):
+    import threading
+    
+    active = []
+    overlaps = []
+    real_ioctl = bus.ioctl
+    
+    def checked_ioctl(fd, request, arg):
+        active.append(request)
+        if len(active) > 1:
+            overlaps.append(request)
+        result = real_ioctl(fd, request, arg)
+        active.pop()
+        return result
+    
+    monkeypatch.setattr(i2c, "ioctl", checked_ioctl)
+    bus.registers[0x20] = bytearray(16)
+    bus.registers[0x21] = bytearray(16)
+    
+    with I2CMaster(1, thread_safe=True) as master:
+        def poll(addr):
+            for n in range(200):
+                master.write_byte_data(addr, 1, n & 0xFF)
+                assert master.read_byte_data(addr, 1) == n & 0xFF
+        
+        threads = [threading.Thread(target=poll, args=(addr,)) for addr in (0x20, 0x21)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        stats = master.statistics()
+    
+    assert overlaps == []
+    assert stats[0x20].transactions == 400
+    assert stats[0x21].transactions == 400
+
+
+def test_only_a_thread_safe_master_records_statistics(bus):
+    with I2CMaster(1) as master:
+        with pytest.raises(ValueError):
+            master.statistics()
+
+
+def test_only_a_thread_safe_master_can_be_fair(bus):
+    with pytest.raises(ValueError):
+        I2CMaster(1, fair=True)
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+    
+    def clock(self):
+        return self.now
+    
+    def sleep(self, t):
+        self.sleeps.append(t)
+        self.now += t
+
+
+def retry_policy(time, **kwargs):
+    return RetryPolicy(clock=time.clock, sleep=time.sleep, random=lambda: 1.0, **kwargs)
+
+
+def test_counts_errors_per_address_without_a_retry_policy(bus):
+    bus.failures = [errno.EREMOTEIO]
+    
+    with I2CMaster(1) as master:
+        with pytest.raises(OSError):
+            master.transaction(writing_bytes(0x20, 0x00))
+        
+        errors = master.errors()
+    
+    assert errors[0x20].errors == {errno.EREMOTEIO: 1}
+    assert errors[0x20].retries == 0
+    assert errors[0x20].failures == 1
+
+
+def test_retries_transient_errors_with_increasing_jittered_delays(bus):
+    time = FakeTime()
+    bus.failures = [errno.EREMOTEIO, errno.EAGAIN, errno.EAGAIN]
+    bus.replies = [b"\x42"]
+    
+    with I2CMaster(1, retry_policy=retry_policy(time, retries={errno.EREMOTEIO: 1, errno.EAGAIN: 3}, base_delay=0.001, jitter=0.5)) as master:
+        assert master.transaction(writing_bytes(0x20, 0x00), reading(0x20, 1)) == [b"\x42"]
+        errors = master.errors()
+    
+    assert time.sleeps == [0.0005, 0.001, 0.002]
+    assert errors[0x20].errors == {errno.EREMOTEIO: 1, errno.EAGAIN: 2}
+    assert errors[0x20].retries == 3
+    assert errors[0x20].failures == 0
+
+
+def test_raises_errors_that_have_no_retry_rule(bus):
+    time = FakeTime()
+    bus.failures = [errno.EINVAL]
+    
+    with I2CMaster(1, retry_policy=retry_policy(time)) as master:
+        with pytest.raises(OSError) as e:
+            master.transaction(writing_bytes(0x20, 0x00))
+    
+    assert e.value.errno == errno.EINVAL
+    assert time.sleeps == []
+
+
+def test_gives_up_after_the_allowed_number_of_retries(bus):
+    time = FakeTime()
+    bus.failures = [errno.ETIMEDOUT] * 3
+    
+    with I2CMaster(1, retry_policy=retry_policy(time, retries={errno.ETIMEDOUT: 2})) as master:
+        with pytest.raises(OSError):
+            master.transaction(writing_bytes(0x20, 0x00))
+        
+        errors = master.errors()[0x20]
+    
+    assert len(time.sleeps) == 2
+    assert errors.retries == 2
+    assert errors.failures == 1
+
+
+def test_does_not_retry_beyond_the_deadline(bus):
+    time = FakeTime()
+    bus.failures = [errno.EREMOTEIO] * 10
+    
+    policy = retry_policy(time, retries={errno.EREMOTEIO: 10}, base_delay=0.004, max_delay=0.004, jitter=0, deadline=0.01)
+    with I2CMaster(1, retry_policy=policy) as master:
+        with pytest.raises(OSError):
+            master.transaction(writing_bytes(0x20, 0x00))
+    
+    assert time.sleeps == [0.004, 0.004]
+
+
+def test_retries_smbus_transactions(bus):
+    time = FakeTime()
+    bus.registers[0x48] = bytearray([0x17])
+    bus.failures = [errno.EREMOTEIO]
+    
+    with I2CMaster(1, retry_policy=retry_policy(time), thread_safe=True) as master:
+        assert master.read_byte_data(0x48, 0) == 0x17
+        assert master.errors()[0x48].retries == 1
+        assert master.statistics()[0x48].transactions == 2
+
+
+def test_applies_kernel_retry_and_timeout_settings_of_the_policy(bus):
+    policy = RetryPolicy(kernel_retries=5, kernel_timeout=0.25)
+    
+    with I2CMaster(1, retry_policy=policy) as master:
+        pass
+    
+    assert bus.settings == {I2C_RETRIES: 5, I2C_TIMEOUT: 25}
+    assert errno.EAGAIN not in policy.retries
+
+
+def test_error_counts_can_be_reset(bus):
+    bus.failures = [errno.EREMOTEIO]
+    
+    with I2CMaster(1) as master:
+        with pytest.raises(OSError):
+            master.transaction(writing_bytes(0x20, 0x00))
+        
+        master.reset_errors()
+        
+        assert master.errors() == {}
+
+
+def test_thread_safe_master_copies_error_counts_under_the_statistics_lock(bus):
+    bus.failures = [errno.EREMOTEIO]
+    
+    with I2CMaster(1, thread_safe=True) as master:
+        with pytest.raises(OSError):
+            master.transaction(writing_bytes(0x20, 0x00))
+        
+        snapshots = []
+        with master._bus_lock.statistics_lock:
+            reader = threading.Thread(target=lambda: snapshots.append(master.errors()))
+            reader.start()
+            reader.join(0.05)
+            assert reader.is_alive()
+        
+        reader.join(5)
+        assert snapshots[0][0x20].failures == 1
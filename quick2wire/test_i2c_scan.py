@@ -0,0 +1,195 @@
+
+import errno
+import os
+import json
+import stat
+import pytest
+import quick2wire.i2c as i2c
+from quick2wire.i2c_ctypes import *
+from quick2wire.i2c_scan import scan_buses, inventory, bus_numbers, DEFAULT_ADDRESSES
+
+
+class FakeBuses:
+    """Simulates buses with devices at some addresses, recording every SMBus probe."""
+    
+    O_RDWR = os.O_RDWR
+    
+    def __init__(self, devices, claimed=(), funcs=I2C_FUNC_I2C|I2C_FUNC_SMBUS_QUICK|I2C_FUNC_SMBUS_READ_BYTE):
+        self.devices = devices
+        self.claimed = claimed
+        self.funcs = funcs
+        self.addresses = {}
+        self.probes = []
+    
+    def open(self, path, flags):
+        return 100 + int(path[len("/dev/i2c-"):])
+    
+    def close(self, fd):
+        pass
+    
+    def ioctl(self, fd, request, arg):
+        bus = fd - 100
+        if request == I2C_FUNCS:
+            arg.value = self.funcs
+        elif request == I2C_SLAVE:
+            if (bus, arg) in self.claimed:
+                raise OSError(errno.EBUSY, "Device or resource busy")
+            self.addresses[fd] = arg
+        elif request == I2C_SMBUS:
+            addr = self.addresses[fd]
+            self.probes.append((bus, addr, arg.size))
+            if addr not in self.devices.get(bus, ()):
+                raise OSError(errno.ENXIO, "No such device or address")
+        else:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        return 0
+
+
+@pytest.fixture
+def buses(monkeypatch):
+    fake = FakeBuses({0: [0x20, 0x48], 1: [0x21, 0x50]})
+    monkeypatch.setattr(i2c, "posix", fake)
+    monkeypatch.setattr(i2c, "ioctl", fake.ioctl)
+    return fake
+
+
+def test_scans_several_buses(buses):
+    assert scan_buses([0, 1]) == {0: [0x20, 0x48], 1: [0x21, 0x50]}
+
+
+def test_probes_eeprom_addresses_by_reading_and_others_with_quick_writes(buses):
+    scan_buses([1])
+    
+    sizes = {addr: size for bus, addr, size in buses.probes}
+    assert set(sizes) == set(DEFAULT_ADDRESSES)
+    assert sizes[0x21] == I2C_SMBUS_QUICK
+    assert sizes[0x50] == I2C_SMBUS_BYTE
+    assert sizes[0x36] == I2C_SMBUS_BYTE
+
+
+def test_probes_by_reading_if_the_adapter_cannot_quick_write(buses):
+    buses.funcs = I2C_FUNC_I2C|I2C_FUNC_SMBUS_READ_BYTE
+    
+    scan_buses([0])
+    
+    assert all(size == I2C_SMBUS_BYTE for bus, addr, size in buses.probes)
+
+
+def test_reports_addresses_claimed_by_a_kernel_driver_as_present_without_probing_them(buses):
+    buses.claimed = [(0, 0x68)]
+    
+    assert scan_buses([0]) == {0: [0x20, 0x48, 0x68]}
+    assert (0, 0x68, I2C_SMBUS_QUICK) not in buses.probes
+
+
+def test_inventory_scans_and_caches_the_devices(buses, tmpdir):
+    cache = str(tmpdir.join("cache", "i2c.json"))
+    
+    assert inventory(cache, [0, 1]) == {0: [0x20, 0x48], 1: [0x21, 0x50]}
+    
+    with open(cache) as f:
+        assert json.load(f)["buses"] == {"0": [0x20, 0x48], "1": [0x21, 0x50]}
+
+
+def test_inventory_creates_the_cache_with_the_mode_allowed_by_the_umask(buses, tmpdir):
+    cache = str(tmpdir.join("i2c.json"))
+    
+    umask = os.umask(0o022)
+    try:
+        inventory(cache, [0])
+    finally:
+        os.umask(umask)
+    
+    assert stat.S_IMODE(os.stat(cache).st_mode) == 0o644
+
+
+def test_inventory_keeps_the_mode_of_the_cache_it_replaces(buses, tmpdir):
+    cache = str(tmpdir.join("i2c.json"))
+    inventory(cache, [0])
+    os.chmod(cache, 0o664)
+    
+    inventory(cache, [1])
+    
+    assert stat.S_IMODE(os.stat(cache).st_mode) == 0o664
+
+
+def test_inventory_revalidates_the_cache_by_probing_only_cached_devices(buses, tmpdir):
+    cache = str(tmpdir.join("i2c.json"))
+    inventory(cache, [0, 1])
+    buses.probes = []
+    
+    assert inventory(cache, [0, 1]) == {0: [0x20, 0x48], 1: [0x21, 0x50]}
+    assert sorted((bus, addr) for bus, addr, size in buses.probes) == [(0, 0x20), (0, 0x48), (1, 0x21), (1, 0x50)]
+
+
+def test_inventory_rescans_a_bus_whose_cached_devices_have_gone(buses, tmpdir):
+    cache = str(tmpdir.join("i2c.json"))
+    inventory(cache, [0, 1])
+    
+    buses.devices[0] = [0x20, 0x22]
+    buses.probes = []
+    
+    assert inventory(cache, [0, 1]) == {0: [0x20, 0x22], 1: [0x21, 0x50]}
+    assert len([p for p in buses.probes if p[0] == 1]) == 2
+    assert inventory(cache, [0, 1])[0] == [0x20, 0x22]
+
+
+def test_inventory_scans_buses_that_are_not_in_the_cache(buses, tmpdir):
+    cache = str(tmpdir.join("i2c.json"))
+    inventory(cache, [0])
+    
+    assert inventory(cache, [0, 1]) == {0: [0x20, 0x48], 1: [0x21, 0x50]}
+
+
+def test_inventory_keeps_the_cached_devices_of_buses_it_does_not_scan(buses, tmpdir):
+    cache = str(tmpdir.join("i2c.json"))
+    inventory(cache, [0, 1])
+    
+    buses.devices[0] = [0x20]
+    assert inventory(cache, [0]) == {0: [0x20]}
+    
+    with open(cache) as f:
+        assert json.load(f)["buses"] == {"0": [0x20], "1": [0x21, 0x50]}
+    
+    buses.probes = []
+    assert inventory(cache, [1]) == {1: [0x21, 0x50]}
+    assert sorted((bus, addr) for bus, addr, size in buses.probes) == [(1, 0x21), (1, 0x50)]
+
+
+def test_inventory_leaves_the_cache_intact_if_it_cannot_be_written(buses, tmpdir, monkeypatch):
+    cache = str(tmpdir.join("i2c.json"))
+    inventory(cache, [0])
+    
+    def fail(*args, **kwargs):
+        raise OSError(errno.ENOSPC, "No space left on device")
+    monkeypatch.setattr(json, "dump", fail)
+    
+    with pytest.raises(OSError):
+        inventory(cache, [1])
+    
+    with open(cache) as f:
+        assert json.load(f)["buses"] == {"0": [0x20, 0x48]}
+    assert tmpdir.listdir() == [tmpdir.join("i2c.json")]
+
+
+def test_inventory_ignores_an_unreadable_cache(buses, tmpdir):
+    cache = tmpdir.join("i2c.json")
+    cache.write("not json")
+    
+    assert inventory(str(cache), [0]) == {0: [0x20, 0x48]}
+
+
+def test_inventory_can_be_forced_to_rescan(buses, tmpdir):
+    cache = str(tmpdir.join("i2c.json"))
+    inventory(cache, [0])
+    buses.devices[0] = [0x20, 0x48, 0x49]
+    
+    assert inventory(cache, [0]) == {0: [0x20, 0x48]}
+    assert inventory(cache, [0], rescan=True) == {0: [0x20, 0x48, 0x49]}
+
+
+def test_finds_bus_device_numbers(tmpdir):
+    for name in ["i2c-0", "i2c-10", "i2c-1", "i2c-x", "spidev0.0"]:
+        tmpdir.join(name).write("")
+    
+    assert bus_numbers(str(tmpdir)) == [0, 1, 10]
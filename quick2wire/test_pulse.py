@@ -0,0 +1,110 @@
+
+from quick2wire.gpio import Rising
+from quick2wire.pulse import PulseMeter
+import pytest
+
+
+class FakeLineEvents:
+    def __init__(self):
+        self.events = []
+    
+    def read_events(self):
+        events, self.events = self.events, []
+        return events
+
+
+def square_wave(start, period, high_time, count):
+    events = []
+    for i in range(count):
+        t = start + i*period
+        events.append((t, 1))
+        events.append((t + high_time, 0))
+    return events
+
+
+def captured(meter, events):
+    meter.pin.events = events
+    meter.capture()
+
+
+def test_measures_period_frequency_and_duty_cycle_of_a_square_wave():
+    meter = PulseMeter(FakeLineEvents())
+    
+    captured(meter, square_wave(1000, 1000000, 250000, 11))
+    
+    assert meter.periods == 10
+    assert meter.period == 1000000
+    assert meter.frequency == 1000
+    assert meter.duty_cycle == 0.25
+    assert meter.reliable
+    assert meter.lost_edges == 0
+
+
+def test_statistics_cover_only_the_most_recent_periods():
+    meter = PulseMeter(FakeLineEvents(), window=4)
+    
+    captured(meter, square_wave(0, 1000, 500, 10))
+    captured(meter, square_wave(10000, 2000, 500, 5)[:-1])
+    
+    assert meter.periods == 4
+    assert meter.period == 2000
+    assert meter.min_period == 2000
+    assert meter.max_period == 2000
+    assert meter.duty_cycle == 0.25
+
+
+def test_reports_edges_lost_when_the_same_value_is_seen_twice():
+    meter = PulseMeter(FakeLineEvents(), window=4)
+    
+    captured(meter, [(0, 1), (500, 0), (1000, 1), (1500, 0),
+                     (3000, 0),
+                     (4000, 1), (4500, 0), (5000, 1)])
+    
+    assert meter.lost_edges == 1
+    assert meter.periods == 2
+    assert meter.period == 1000
+    assert not meter.reliable
+    
+    captured(meter, [(5500, 0), (6000, 1), (6500, 0), (7000, 1)])
+    
+    assert not meter.reliable
+    
+    captured(meter, [(7500, 0), (8000, 1)])
+    
+    assert meter.reliable
+
+
+def test_reports_edges_lost_when_capture_buffer_overflows():
+    meter = PulseMeter(FakeLineEvents(), capacity=4)
+    
+    captured(meter, square_wave(0, 1000, 500, 3))
+    
+    assert meter.lost_edges == 2
+
+
+def test_measures_period_of_a_pin_that_signals_only_rising_edges():
+    meter = PulseMeter(FakeLineEvents(), interrupt=Rising)
+    
+    captured(meter, [(0, 1), (1000, 1), (2000, 1), (2900, 0), (3000, 1), (4000, 1)])
+    
+    assert meter.lost_edges == 1
+    assert meter.periods == 3
+    assert meter.period == 1000
+    assert meter.duty_cycle is None
+
+
+def test_reset_discards_statistics():
+    meter = PulseMeter(FakeLineEvents())
+    captured(meter, square_wave(0, 1000, 500, 3))
+    
+    meter.reset()
+    
+    assert meter.periods == 0
+    assert meter.period is None
+    assert meter.frequency is None
+    assert not meter.reliable
+
+
+def test_cannot_measure_a_pin_without_edge_interrupts():
+    with pytest.raises(ValueError):
+        PulseMeter(FakeLineEvents(), interrupt=None)
@@ -0,0 +1,126 @@
+
+from quick2wire.pwm import SoftwarePWM
+import pytest
+
+
+class FakeBank:
+    def __init__(self):
+        self.writes = []
+        self.values = 0
+    
+    def write(self, mask, values):
+        self.writes.append((mask, values))
+        self.values = (self.values & ~mask) | (values & mask)
+
+
+def test_switches_pins_on_at_start_of_period_and_off_at_their_duty_cycle():
+    bank = FakeBank()
+    with SoftwarePWM(bank, frequency=100, resolution=10) as pwm:
+        pwm.set_duty_cycle(0, 0.3)
+        pwm.set_duty_cycle(1, 0.6)
+        
+        pwm.start()
+        for i in range(3):
+            pwm.step()
+        
+        assert bank.writes == [(0b11, 0b11), (0b01, 0), (0b10, 0)]
+
+
+def test_groups_pins_that_switch_on_the_same_tick_into_one_write():
+    bank = FakeBank()
+    with SoftwarePWM(bank, frequency=100, resolution=10) as pwm:
+        pwm.set_duty_cycle(0, 0.5)
+        pwm.set_duty_cycle(2, 0.5)
+        pwm.set_duty_cycle(3, 0.8)
+        
+        pwm.start()
+        for i in range(3):
+            pwm.step()
+        
+        assert bank.writes == [(0b1101, 0b1101), (0b0101, 0), (0b1000, 0)]
+
+
+def test_pins_always_on_or_off_are_only_written_at_start_of_period():
+    bank = FakeBank()
+    with SoftwarePWM(bank, frequency=100, resolution=10) as pwm:
+        pwm.set_duty_cycle(0, 1)
+        pwm.set_duty_cycle(1, 0)
+        
+        pwm.start()
+        pwm.step()
+        pwm.step()
+        
+        assert bank.writes == [(0b11, 0b01), (0b11, 0b01)]
+
+
+def test_duty_cycle_changes_take_effect_at_start_of_next_period():
+    bank = FakeBank()
+    with SoftwarePWM(bank, frequency=100, resolution=10) as pwm:
+        pwm.set_duty_cycle(0, 0.5)
+        
+        pwm.start()
+        pwm.step()
+        pwm.set_duty_cycle(0, 1)
+        pwm.step()
+        pwm.step()
+        
+        assert bank.writes == [(0b1, 0b1), (0b1, 0), (0b1, 0b1)]
+
+
+def test_switches_off_all_pins_when_stopped():
+    bank = FakeBank()
+    with SoftwarePWM(bank, frequency=100, resolution=10) as pwm:
+        pwm.set_duty_cycle(0, 1)
+        pwm.set_duty_cycle(4, 1)
+        pwm.start()
+        pwm.step()
+        
+        pwm.stop()
+        
+        assert bank.values == 0
+
+
+def test_cannot_set_invalid_duty_cycle():
+    with SoftwarePWM(FakeBank(), frequency=100) as pwm:
+        with pytest.raises(ValueError):
+            pwm.set_duty_cycle(0, 1.5)
+
+
+def test_rejects_pins_that_it_does_not_drive():
+    with SoftwarePWM(FakeBank(), frequency=100, resolution=10) as pwm:
+        pwm.set_duty_cycle(0, 0.5)
+        pwm.remove(0)
+        
+        with pytest.raises(ValueError):
+            pwm.duty_cycle(0)
+        with pytest.raises(ValueError):
+            pwm.duty_cycle_error(0)
+        with pytest.raises(ValueError):
+            pwm.remove(0)
+
+
+def test_duty_cycle_error_of_a_removed_pin_is_rejected_after_it_has_been_measured():
+    with SoftwarePWM(FakeBank(), frequency=100, resolution=10) as pwm:
+        pwm.set_duty_cycle(0, 0.5)
+        pwm.set_duty_cycle(1, 0.5)
+        
+        pwm.start()
+        for i in range(5):
+            pwm.step()
+        pwm.remove(1)
+        
+        with pytest.raises(ValueError):
+            pwm.duty_cycle_error(1)
+
+
+@pytest.mark.loopback
+@pytest.mark.timer
+def test_reports_achieved_frequency_and_duty_cycle_error():
+    with SoftwarePWM(FakeBank(), frequency=200, resolution=10) as pwm:
+        pwm.set_duty_cycle(0, 0.5)
+        pwm.run(0.25)
+        pwm.stop()
+        
+        assert pwm.periods >= 40
+        assert abs(pwm.achieved_frequency - 200) < 20
+        assert abs(pwm.duty_cycle_error(0)) < 0.1
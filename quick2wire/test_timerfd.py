@@ -1,6 +1,6 @@
 
-from time import time, sleep
-from quick2wire.timerfd import Timer, timespec, itimerspec
+from time import time, sleep, clock_gettime, clock_gettime_ns
+from quick2wire.timerfd import Timer, timespec, itimerspec, CLOCK_MONOTONIC
 import pytest
 
 
@@ -67,6 +67,40 @@ def test_timer_can_repeat_with_interval_after_offset():
         assert duration >= 0.5
 
 
+@pytest.mark.loopback
+@pytest.mark.timer
+def test_timer_can_be_started_at_an_absolute_time():
+    with Timer(clock=CLOCK_MONOTONIC) as timer:
+        deadline = clock_gettime(CLOCK_MONOTONIC) + 0.125
+        
+        timer.start_at(deadline)
+        timer.wait()
+        
+        assert clock_gettime(CLOCK_MONOTONIC) >= deadline
+
+
+@pytest.mark.loopback
+@pytest.mark.timer
+def test_timer_can_be_started_at_an_absolute_time_in_nanoseconds():
+    with Timer(clock=CLOCK_MONOTONIC) as timer:
+        for i in range(3):
+            deadline = clock_gettime_ns(CLOCK_MONOTONIC) + 12500000
+            
+            timer.start_at_ns(deadline)
+            timer.wait()
+            
+            assert clock_gettime_ns(CLOCK_MONOTONIC) >= deadline
+
+
+@pytest.mark.loopback
+@pytest.mark.timer
+def test_non_blocking_timer_reports_zero_if_not_expired():
+    with Timer(offset=1.0, blocking=False) as timer:
+        timer.start()
+        
+        assert timer.wait() == 0
+
+
 @pytest.mark.loopback
 @pytest.mark.timer
 def test_can_change_offset_while_timer_is_running():
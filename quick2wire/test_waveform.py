@@ -0,0 +1,93 @@
+
+from time import clock_gettime_ns
+from quick2wire.timerfd import CLOCK_MONOTONIC
+from quick2wire.waveform import Waveform, WaveformPlayer
+import pytest
+
+
+class FakeBank:
+    def __init__(self):
+        self.writes = []
+        self.times = []
+    
+    def write(self, mask, values):
+        self.times.append(clock_gettime_ns(CLOCK_MONOTONIC))
+        self.writes.append((mask, values))
+
+
+def test_compiles_steps_into_offsets_from_the_start_of_playback():
+    waveform = Waveform([(0, 0b11, 0b01), (1000, 0b10, 0b10), (500, 0b11, 0)])
+    
+    assert len(waveform) == 3
+    assert waveform.duration == 1500
+    assert waveform.mask == 0b11
+    assert list(waveform) == [(0, 0b11, 0b01), (1000, 0b10, 0b10), (500, 0b11, 0)]
+
+
+def test_values_outside_the_mask_of_a_step_are_ignored():
+    waveform = Waveform([(0, 0b01, 0b11)])
+    
+    assert list(waveform) == [(0, 0b01, 0b01)]
+
+
+def test_cannot_compile_a_negative_delay():
+    with pytest.raises(ValueError):
+        Waveform([(-1, 1, 1)])
+
+
+def test_samples_are_only_written_when_they_change():
+    waveform = Waveform.from_samples(100, 0b11, [0b01, 0b01, 0b10, 0b11, 0b11, 0b11])
+    
+    assert list(waveform) == [(0, 0b11, 0b01), (200, 0b11, 0b10), (100, 0b11, 0b11)]
+    assert waveform.duration == 600
+
+
+def test_plays_steps_in_order_no_earlier_than_scheduled():
+    bank = FakeBank()
+    waveform = Waveform([(0, 1, 1), (20000, 1, 0), (20000, 1, 1), (20000, 1, 0)])
+    
+    with WaveformPlayer(bank) as player:
+        start = clock_gettime_ns(CLOCK_MONOTONIC)
+        end = player.play(waveform, start)
+    
+    assert bank.writes == [(1, 1), (1, 0), (1, 1), (1, 0)]
+    assert end == start + 60000
+    for time, (delay, mask, values), offset in zip(bank.times, waveform, [0, 20000, 40000, 60000]):
+        assert time >= start + offset
+    
+    assert len(player.drift) == 4
+    assert min(player.drift) >= 0
+    assert player.max_drift == max(player.drift)
+
+
+def test_waits_for_long_steps_with_the_timer():
+    bank = FakeBank()
+    waveform = Waveform([(0, 1, 1), (2000000, 1, 0)])
+    
+    with WaveformPlayer(bank, busy_wait_threshold=100000) as player:
+        start = clock_gettime_ns(CLOCK_MONOTONIC)
+        player.play(waveform, start)
+    
+    assert bank.times[1] >= start + 2000000
+
+
+def test_calibration_measures_clock_overhead_and_timer_latency():
+    with WaveformPlayer(FakeBank()) as player:
+        clock_overhead, wakeup_latency = player.calibrate(samples=5, timer_offset=100000)
+        
+        assert clock_overhead == player.clock_overhead >= 0
+        assert wakeup_latency == player.wakeup_latency >= 0
+
+
+@pytest.mark.loopback
+@pytest.mark.timer
+def test_calibrated_player_follows_schedule_closely():
+    bank = FakeBank()
+    waveform = Waveform.from_samples(50000, 1, [i % 2 for i in range(200)])
+    
+    with WaveformPlayer(bank) as player:
+        player.calibrate()
+        player.play(waveform)
+        
+        assert len(bank.writes) == 200
+        assert player.late_steps(50000) < 10
@@ -1,5 +1,6 @@
 
 
+import errno
 import math
 import os
 from ctypes import *
@@ -125,6 +126,7 @@ class Timer(syscall.SelfClosing):
         self._offset = offset
         self._interval = interval
         self._started = False
+        self._deadline_spec = None
     
     def close(self):
         """Closes the Timer and releases its file descriptor."""
@@ -175,11 +177,51 @@ class Timer(syscall.SelfClosing):
         self._apply_schedule()
         self._started = True
         
+    def start_at(self, deadline):
+        """Starts the timer running, first expiring at an absolute time.
+        
+        Arguments:
+        deadline -- the time of the first expiration, in seconds, as
+                    measured by the timer's clock.  If the deadline 
+                    has already passed the timer expires immediately.
+                    If the timer has a non-zero interval, it then 
+                    repeats at that interval from the deadline.
+        """
+        spec = itimerspec.from_seconds(deadline, self._interval)
+        timerfd_settime(self.fileno(), TFD_TIMER_ABSTIME, byref(spec), None)
+        self._started = True
+    
+    def start_at_ns(self, deadline):
+        """Starts the timer running, first expiring at an absolute time given in integer nanoseconds.
+        
+        Behaves like start_at, but does not lose precision converting
+        the deadline to and from floating point and reuses the same
+        itimerspec every time it is called, so is suitable for rearming
+        the timer in a tight loop.
+        """
+        spec = self._deadline_spec
+        if spec is None:
+            spec = self._deadline_spec = itimerspec()
+        spec.value.sec = deadline // 1000000000
+        spec.value.nsec = deadline % 1000000000
+        spec.interval.seconds = self._interval
+        timerfd_settime(self.fileno(), TFD_TIMER_ABSTIME, spec, None)
+        self._started = True
+    
     def stop(self):
         """Stops the timer running. Any scheduled timer events will not fire."""
         self._schedule(0, 0)
         self._started = False
     
+    def tick(self):
+        """Returns an awaitable that waits in an asyncio event loop for the timer to expire.
+        
+        The result of the awaitable is the number of expirations, as
+        returned by wait().  See quick2wire.aio.
+        """
+        from quick2wire.aio import tick
+        return tick(self)
+    
     def wait(self):
         """Receives timer events.
         
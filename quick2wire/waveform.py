@@ -0,0 +1,236 @@
+"""Playing precompiled bit patterns on the output pins of a PinBank.
+
+A Waveform is a sequence of steps, each a (delay_ns, mask, values)
+triple: delay_ns nanoseconds after the previous step (or after the
+start of playback, for the first step), the pins of the bank selected
+by the bit-mask are set to the corresponding bits of values with a
+single call to the bank's write method.  The steps are compiled into
+absolute offsets from the start of playback when the Waveform is
+created, so that playing it does not build any new tuples, lists or
+ctypes structures and timing errors do not accumulate from one step
+to the next.
+
+A WaveformPlayer waits for each step either by arming a timer with
+the step's absolute deadline or, for steps shorter than its busy-wait
+threshold, by polling the clock.  The player can be calibrated to
+measure the cost of reading the clock and the latency with which the
+timer wakes it, and then wakes early and busy-waits the remainder of
+each timed step.
+
+For example, to send a clock and data signal on pins 0 and 1 of a bank:
+
+    with pins.pin(0, Out) as clock, pins.pin(1, Out) as data, WaveformPlayer(pins) as player:
+        waveform = Waveform.from_samples(50000, 0b11, [0b10, 0b11, 0b00, 0b01, 0b10, 0b11])
+        player.calibrate()
+        player.play(waveform)
+        print("worst drift:", player.max_drift, "ns")
+
+After each play the player reports how far each step drifted from its
+scheduled time.
+"""
+
+from array import array
+from time import clock_gettime_ns
+from quick2wire.syscall import SelfClosing
+from quick2wire.timerfd import Timer, CLOCK_MONOTONIC
+
+
+class Waveform(object):
+    """A precompiled sequence of writes to a PinBank, each at an offset from the start of playback."""
+    
+    def __init__(self, steps):
+        """Compiles a Waveform.
+        
+        Parameters:
+        steps -- a sequence of (delay_ns, mask, values) triples.
+                 delay_ns is the time to wait, in nanoseconds, after
+                 the previous step.  mask selects the pins of the bank
+                 to be written and values gives their new values, as
+                 for PinBankAPI.write.
+        """
+        compiled = []
+        offset = 0
+        for delay, mask, values in steps:
+            if delay < 0:
+                raise ValueError("step delay cannot be negative")
+            offset += int(delay)
+            compiled.append((offset, int(mask), int(values) & int(mask), int(delay)))
+        
+        self._steps = tuple(compiled)
+        self._duration = offset
+    
+    @classmethod
+    def from_samples(cls, interval_ns, mask, samples):
+        """Compiles a Waveform from values sampled at a regular interval.
+        
+        Writes the first sample immediately and then each sample
+        that differs from the one before it, interval_ns nanoseconds
+        after the previous sample, so consecutive identical samples
+        do not cost a write each.  The duration of the waveform is
+        len(samples) * interval_ns.
+        """
+        steps = []
+        delay = 0
+        previous = None
+        for sample in samples:
+            sample &= mask
+            if sample != previous:
+                steps.append((delay, mask, sample))
+                previous = sample
+                delay = 0
+            delay += interval_ns
+        
+        waveform = cls(steps)
+        waveform._duration += delay
+        return waveform
+    
+    @property
+    def duration(self):
+        """The time, in nanoseconds, from the start of playback to the end of the waveform."""
+        return self._duration
+    
+    @property
+    def mask(self):
+        """The bit-mask of all the pins written by the waveform."""
+        mask = 0
+        for offset, step_mask, values, delay in self._steps:
+            mask |= step_mask
+        return mask
+    
+    def __len__(self):
+        """The number of steps in the waveform."""
+        return len(self._steps)
+    
+    def __iter__(self):
+        """Iterates over the steps as (delay_ns, mask, values) triples."""
+        for offset, mask, values, delay in self._steps:
+            yield (delay, mask, values)
+
+
+class WaveformPlayer(SelfClosing):
+    """Plays Waveforms on the output pins of a PinBank."""
+    
+    def __init__(self, bank, busy_wait_threshold=100000, clock=CLOCK_MONOTONIC):
+        """Creates a WaveformPlayer.
+        
+        Parameters:
+        bank                -- the PinBank to write.  The pins must be
+                               opened by the application.
+        busy_wait_threshold -- (optional) steps with a delay shorter
+                               than this, in nanoseconds, are timed by
+                               polling the clock rather than waiting
+                               for a timer. (default = 100000)
+        clock               -- (optional) the clock used to schedule
+                               the steps. (default = CLOCK_MONOTONIC)
+        """
+        self._bank = bank
+        self._clock = clock
+        self.busy_wait_threshold = busy_wait_threshold
+        self._timer = Timer(clock=clock)
+        self.clock_overhead = 0
+        self.wakeup_latency = 0
+        self.drift = array('q')
+    
+    def fileno(self):
+        """Returns the file descriptor of the timer."""
+        return self._timer.fileno()
+    
+    def close(self):
+        """Releases the timer."""
+        self._timer.close()
+    
+    def calibrate(self, samples=20, timer_offset=1000000):
+        """Measures the cost of reading the clock and the latency of waking from the timer.
+        
+        Afterwards, timed steps wake early by the measured latency and
+        busy-wait for the rest of the delay, and busy-waits stop
+        polling early by the cost of reading the clock.
+        
+        Parameters:
+        samples      -- (optional) the number of measurements to take
+                        of each. (default = 20)
+        timer_offset -- (optional) how far ahead, in nanoseconds, to
+                        arm the timer when measuring its latency.
+                        (default = 1000000)
+        
+        Returns: (clock_overhead, wakeup_latency) in nanoseconds.
+        """
+        clock = self._clock
+        
+        overheads = []
+        for i in range(samples):
+            t0 = clock_gettime_ns(clock)
+            t1 = clock_gettime_ns(clock)
+            overheads.append(t1 - t0)
+        
+        latencies = []
+        for i in range(samples):
+            deadline = clock_gettime_ns(clock) + timer_offset
+            self._timer.start_at_ns(deadline)
+            self._timer.wait()
+            latencies.append(clock_gettime_ns(clock) - deadline)
+        
+        self.clock_overhead = min(overheads)
+        self.wakeup_latency = sorted(latencies)[len(latencies)//2]
+        return self.clock_overhead, self.wakeup_latency
+    
+    def play(self, waveform, start=None):
+        """Plays a waveform, blocking the calling thread until its last step has been written.
+        
+        Parameters:
+        waveform -- the Waveform to play.
+        start    -- (optional) the time, in nanoseconds on the player's
+                    clock, at which playback starts.  Pass the value
+                    returned by the previous call to play to follow
+                    one waveform with another without a gap.
+                    Default: now.
+        
+        Returns: the time at which the waveform ends, in nanoseconds on
+                 the player's clock.
+        """
+        clock = self._clock
+        bank_write = self._bank.write
+        timer = self._timer
+        threshold = self.busy_wait_threshold
+        spin_margin = self.clock_overhead
+        wake_margin = self.wakeup_latency
+        
+        if len(self.drift) != len(waveform):
+            self.drift = array('q', bytes(8*len(waveform)))
+        drift = self.drift
+        
+        if start is None:
+            start = clock_gettime_ns(clock)
+        
+        i = 0
+        for offset, mask, values, delay in waveform._steps:
+            deadline = start + offset
+            now = clock_gettime_ns(clock)
+            if delay >= threshold and deadline - now > wake_margin:
+                timer.start_at_ns(deadline - wake_margin)
+                timer.wait()
+                now = clock_gettime_ns(clock)
+            
+            target = deadline - spin_margin
+            while now < target:
+                now = clock_gettime_ns(clock)
+            
+            bank_write(mask, values)
+            drift[i] = now - deadline
+            i += 1
+        
+        return start + waveform.duration
+    
+    @property
+    def max_drift(self):
+        """The latest that a step of the last waveform played was written after its scheduled time, in nanoseconds."""
+        return max(self.drift) if self.drift else None
+    
+    @property
+    def mean_drift(self):
+        """The average drift of the steps of the last waveform played, in nanoseconds."""
+        return sum(self.drift) / len(self.drift) if self.drift else None
+    
+    def late_steps(self, tolerance):
+        """The number of steps of the last waveform played that were written more than tolerance nanoseconds late."""
+        return sum(1 for d in self.drift if d > tolerance)
@@ -61,7 +61,7 @@ setup(name='quick2wire-api',
       
       provides=[package],
       
-      packages=[package, package+'.parts'],
+      packages=[package, package+'.parts', package+'.simulator'],
       scripts=[],
       
       tests_require=['pytest==2.3.4', 'factcheck==1.1.0.0'],